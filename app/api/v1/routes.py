@@ -1,14 +1,148 @@
-from typing import Optional
+import hashlib
+import json
+from datetime import datetime
+from typing import AsyncIterator, Literal, Optional
 
-from fastapi import APIRouter, Depends, Query, status, BackgroundTasks
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Response,
+    status,
+    BackgroundTasks,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.v1.schemas import TaoDividendResponse
+from app.api.v1.schemas import (
+    CacheStatsResponse,
+    DividendHistoryPoint,
+    StakeAdjustmentResponse,
+    StakeTotalsResponse,
+    TaoDividendResponse,
+)
 from app.auth.auth import verify_token
-from app.services.bittensor import get_dividends
-from app.tasks.bittensor import perform_trade_task
+from app.cache.redis import redis_cache
+from app.db.models import get_db
+from app.config import settings
+from app.db.service import (
+    AdjustmentCursor,
+    find_stake_adjustments,
+    get_dividend_history,
+    get_stake_totals,
+    page_stake_adjustments,
+)
+from app.metrics import timed
+from app.services.bittensor import (
+    BlockNotFound,
+    DividendCursor,
+    SubnetTimeout,
+    get_dividends,
+    get_dividends_page,
+    is_block_hash,
+    iter_dividends,
+    resolve_block,
+    resolve_read_block,
+)
+from app.tasks.bittensor import queue_trade
 
 router = APIRouter()
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+PARTIAL_NETUIDS_HEADER = "X-Partial-Netuids"
+DEFAULT_PAGE_SIZE = 1000
+
+dividend_rows = TypeAdapter(list[TaoDividendResponse])
+
+
+def requested_version(
+    block_hash: Optional[str], cursor: Optional[DividendCursor]
+) -> Optional[str]:
+    """Identify the block hash a dividends request names, or None for latest reads."""
+    if cursor is not None:
+        return cursor.block_hash
+    return block_hash or None
+
+
+async def latest_version() -> str:
+    """Look up the block latest reads are served at: the snapshot or latest pointer."""
+    return (await resolve_read_block()).block_hash
+
+
+def rows_version(rows: list[TaoDividendResponse]) -> Optional[str]:
+    """
+    Identify the block rows were read at, if they say.
+
+    The hash is used whenever it is known, since a reorg can put different
+    dividends at the same block number.
+    """
+    if not rows:
+        return None
+    if rows[0].block_hash is not None:
+        return rows[0].block_hash
+    if rows[0].block_number is not None:
+        return f"#{rows[0].block_number}"
+    return None
+
+
+def dividends_etag(version: str, **params) -> str:
+    """Build a strong ETag from the block version and the query shaping the body."""
+    payload = json.dumps([version, params], sort_keys=True, default=str)
+    return '"' + hashlib.sha256(payload.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header, which may list several (weak) tags, or be *."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def cache_headers(etag: Optional[str], pinned: bool) -> dict[str, str]:
+    """ETag and caching headers for a dividends response."""
+    scope = "public" if settings.dividends_cache_public else "private"
+    if pinned:
+        cache_control = (
+            f"{scope}, max-age={settings.dividends_pinned_max_age}, immutable"
+        )
+    else:
+        cache_control = f"{scope}, max-age={settings.dividends_latest_max_age}"
+    headers = {"Cache-Control": cache_control, "Vary": "Authorization, Accept"}
+    if etag:
+        headers["ETag"] = etag
+    return headers
+
+
+def json_rows(
+    rows: list[TaoDividendResponse], headers: Optional[dict[str, str]] = None
+) -> Response:
+    """Serialize rows to a JSON response, timing it as the serialize stage."""
+    with timed("serialize"):
+        body = dividend_rows.dump_json(rows)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+async def stream_ndjson(
+    subnets: AsyncIterator[list[TaoDividendResponse]],
+) -> AsyncIterator[str]:
+    """Encode each subnet's rows as newline-delimited JSON as soon as it is ready."""
+    async for rows in subnets:
+        with timed("serialize"):
+            chunk = "".join(row.model_dump_json() + "\n" for row in rows)
+        yield chunk
+
+
+async def single_page(
+    rows: list[TaoDividendResponse],
+) -> AsyncIterator[list[TaoDividendResponse]]:
+    """Wrap an already fetched page so it can be streamed like a subnet listing."""
+    yield rows
+
 
 @router.get(
     "/tao_dividends",
@@ -17,7 +151,12 @@ router = APIRouter()
     summary="Fetch Tao Dividends",
     description=(
         "Fetch Tao Dividends for a given netuid and hotkey. "
-        "Optionally trigger sentiment-based stake/unstake if trade is enabled."
+        "Optionally trigger sentiment-based stake/unstake if trade is enabled. "
+        "All rows are read at one block: the latest by default, or the requested "
+        "block_hash/block_number. Use format=ndjson or `Accept: application/x-ndjson` "
+        "to stream rows subnet by subnet. Pass `limit` to page through the results; "
+        "the next page's cursor is returned in the X-Next-Cursor header. Subnets "
+        "that time out are listed in the X-Partial-Netuids header and left out."
     ),
 )
 async def tao_dividends(
@@ -31,15 +170,344 @@ async def tao_dividends(
     trade: bool = Query(
         default=False, description="Whether to perform stake/unstake based on sentiment"
     ),
+    block_hash: Optional[str] = Query(
+        default=None, description="Block hash to read dividends at (optional)"
+    ),
+    block_number: Optional[int] = Query(
+        default=None, ge=0, description="Block number to read dividends at (optional)"
+    ),
+    response_format: Literal["json", "ndjson"] = Query(
+        default="json",
+        alias="format",
+        description="Response format; ndjson streams one row per line",
+    ),
+    limit: Optional[int] = Query(
+        default=None, ge=1, le=10_000, description="Maximum rows per page (optional)"
+    ),
+    cursor: Optional[str] = Query(
+        default=None,
+        description="Cursor from a previous page's X-Next-Cursor header (optional)",
+    ),
+    accept: Optional[str] = Header(default=None),
+    if_none_match: Optional[str] = Header(default=None),
     _: None = Depends(verify_token),
-) -> list[TaoDividendResponse]:
+) -> Response:
     """
     Fetch Tao dividends from the Bittensor blockchain. Optionally triggers sentiment analysis
     and automated stake/unstake via background task if `trade=true`.
+
+    Responses carry an ETag for the block they were read at and the query, and a
+    matching If-None-Match is answered with 304 after only looking up that block.
+    Requests with `trade=true` are never cached, and neither are responses missing
+    a subnet that timed out. A page ends before such a subnet, or fails with 503
+    if it is the first one, and a stream is cut off at it.
     """
-    results = await get_dividends(netuid, hotkey, trade)
+    if block_hash and block_number is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide either block_hash or block_number, not both",
+        )
+
+    if block_hash and not is_block_hash(block_hash):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="block_hash must be a 0x-prefixed 32-byte hex string",
+        )
+
+    try:
+        page_cursor = DividendCursor.decode(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # Block numbers can be reorged onto another block, so only hashes are immutable.
+    pinned = page_cursor is not None or bool(block_hash)
+
+    # Resolved before any body is sent, so a block past the head is a 404 even
+    # for streams, and every later read is keyed by a real block hash.
+    if block_number is not None and page_cursor is None:
+        try:
+            block_hash = (await resolve_block(block_number=block_number)).block_hash
+        except BlockNotFound as e:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
 
     if trade:
-        background_tasks.add_task(perform_trade_task.delay, netuid, hotkey)
+        background_tasks.add_task(queue_trade, netuid, hotkey)
+
+    stream = response_format == "ndjson" or NDJSON_MEDIA_TYPE in (accept or "")
 
-    return results
+    params = {
+        "netuid": netuid,
+        "hotkey": hotkey,
+        "stream": stream,
+        "limit": limit,
+        "cursor": cursor,
+    }
+    version = requested_version(block_hash, page_cursor)
+    if not trade and if_none_match:
+        etag = dividends_etag(version or await latest_version(), **params)
+        if etag_matches(if_none_match, etag):
+            return Response(
+                status_code=status.HTTP_304_NOT_MODIFIED,
+                headers=cache_headers(etag, pinned),
+            )
+
+    def response_headers(rows: Optional[list[TaoDividendResponse]]) -> dict[str, str]:
+        """Caching headers for a body of `rows`, or of a stream when None."""
+        if trade:
+            return {"Cache-Control": "no-store"}
+        body_version = version or (rows_version(rows) if rows is not None else None)
+        etag = dividends_etag(body_version, **params) if body_version else None
+        return cache_headers(etag, pinned)
+
+    if limit is not None or page_cursor is not None:
+        try:
+            rows, next_cursor = await get_dividends_page(
+                netuid,
+                hotkey,
+                trade,
+                limit or DEFAULT_PAGE_SIZE,
+                page_cursor,
+                block_hash,
+                block_number,
+            )
+        except SubnetTimeout as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)
+            )
+        headers = response_headers(rows)
+        if next_cursor:
+            headers[NEXT_CURSOR_HEADER] = next_cursor.encode()
+        if stream:
+            return StreamingResponse(
+                stream_ndjson(single_page(rows)),
+                media_type=NDJSON_MEDIA_TYPE,
+                headers=headers,
+            )
+        return json_rows(rows, headers)
+
+    if stream:
+        subnets = iter_dividends(netuid, hotkey, trade, block_hash, block_number)
+        return StreamingResponse(
+            stream_ndjson(subnets),
+            media_type=NDJSON_MEDIA_TYPE,
+            headers=response_headers(None),
+        )
+
+    missing: list[int] = []
+    rows = await get_dividends(
+        netuid, hotkey, trade, block_hash, block_number, missing=missing
+    )
+    if missing:
+        return json_rows(
+            rows,
+            {
+                "Cache-Control": "no-store",
+                PARTIAL_NETUIDS_HEADER: ",".join(map(str, missing)),
+            },
+        )
+    return json_rows(rows, response_headers(rows))
+
+
+@router.get(
+    "/tao_dividends/history",
+    response_model=list[DividendHistoryPoint],
+    status_code=status.HTTP_200_OK,
+    summary="Tao Dividends History",
+    description=(
+        "Recorded Tao dividends for a subnet and/or hotkey over a time range, one "
+        "series per subnet and hotkey. With resolution=hour or day, each series is "
+        "downsampled to one point per bucket holding the last, average or maximum "
+        "value. Samples are recorded by the indexer once per history interval."
+    ),
+)
+async def tao_dividends_history(
+    netuid: Optional[int] = Query(
+        default=None, description="Subnet netuid ID (optional)"
+    ),
+    hotkey: Optional[str] = Query(
+        default=None, description="Hotkey SS58 address (optional)"
+    ),
+    start: Optional[datetime] = Query(
+        default=None, description="Earliest sample time (optional)"
+    ),
+    end: Optional[datetime] = Query(
+        default=None, description="Sample time to stop before (optional)"
+    ),
+    resolution: Literal["sample", "hour", "day"] = Query(
+        default="hour", description="Bucket size, or every recorded sample"
+    ),
+    aggregate: Literal["last", "avg", "max"] = Query(
+        default="last", description="How the samples in a bucket are reduced"
+    ),
+    limit: int = Query(
+        default=10_000, ge=1, le=100_000, description="Maximum points returned"
+    ),
+    db: AsyncSession = Depends(get_db),
+    _: None = Depends(verify_token),
+) -> list[DividendHistoryPoint]:
+    """Return the dividend history of a subnet and/or hotkey."""
+    if netuid is None and hotkey is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide a netuid or a hotkey",
+        )
+    points = await get_dividend_history(
+        db,
+        netuid=netuid,
+        hotkey=hotkey,
+        start=start,
+        end=end,
+        interval=None if resolution == "sample" else resolution,
+        aggregate=aggregate,
+        limit=limit,
+    )
+    return [DividendHistoryPoint(**point) for point in points]
+
+
+@router.get(
+    "/cache_stats",
+    response_model=CacheStatsResponse,
+    status_code=status.HTTP_200_OK,
+    summary="Cache Statistics",
+    description="L1 (in-process) and L2 (Redis) cache counters for this worker.",
+)
+async def cache_stats(_: None = Depends(verify_token)) -> CacheStatsResponse:
+    """Return cache hit, miss and eviction counters for this worker process."""
+    return CacheStatsResponse(**redis_cache.get_stats())
+
+
+@router.get(
+    "/trade_status",
+    response_model=list[StakeAdjustmentResponse],
+    status_code=status.HTTP_200_OK,
+    summary="Trade Status",
+    description=(
+        "Status of submitted stake adjustments, newest first: pending until the "
+        "extrinsic is included in a block, then included, finalized or failed. "
+        "Look them up by extrinsic hash or by hotkey."
+    ),
+)
+async def trade_status(
+    extrinsic_hash: Optional[str] = Query(
+        default=None, description="Extrinsic hash of a submitted batch (optional)"
+    ),
+    hotkey: Optional[str] = Query(
+        default=None, description="Hotkey SS58 address (optional)"
+    ),
+    netuid: Optional[int] = Query(
+        default=None, description="Subnet netuid ID (optional)"
+    ),
+    limit: int = Query(default=50, ge=1, le=1000, description="Maximum rows"),
+    db: AsyncSession = Depends(get_db),
+    _: None = Depends(verify_token),
+) -> list[StakeAdjustmentResponse]:
+    """Return the stake adjustments matching an extrinsic hash or hotkey."""
+    if extrinsic_hash is None and hotkey is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide an extrinsic_hash or a hotkey",
+        )
+    adjustments = await find_stake_adjustments(
+        db, extrinsic_hash=extrinsic_hash, hotkey=hotkey, netuid=netuid, limit=limit
+    )
+    return [StakeAdjustmentResponse.model_validate(row) for row in adjustments]
+
+
+@router.get(
+    "/stake_adjustments",
+    response_model=list[StakeAdjustmentResponse],
+    status_code=status.HTTP_200_OK,
+    summary="Stake Adjustment History",
+    description=(
+        "Recorded stake adjustments, newest first, filtered by subnet, hotkey, "
+        "action and creation time (start inclusive, end exclusive). Results are "
+        "paged; the next page's cursor is returned in the X-Next-Cursor header."
+    ),
+)
+async def stake_adjustments(
+    response: Response,
+    netuid: Optional[int] = Query(
+        default=None, description="Subnet netuid ID (optional)"
+    ),
+    hotkey: Optional[str] = Query(
+        default=None, description="Hotkey SS58 address (optional)"
+    ),
+    action: Optional[Literal["stake", "unstake"]] = Query(
+        default=None, description="Only stakes or only unstakes (optional)"
+    ),
+    start: Optional[datetime] = Query(
+        default=None, description="Earliest creation time (optional)"
+    ),
+    end: Optional[datetime] = Query(
+        default=None, description="Creation time to stop before (optional)"
+    ),
+    limit: int = Query(default=100, ge=1, le=1000, description="Maximum rows per page"),
+    cursor: Optional[str] = Query(
+        default=None,
+        description="Cursor from a previous page's X-Next-Cursor header (optional)",
+    ),
+    db: AsyncSession = Depends(get_db),
+    _: None = Depends(verify_token),
+) -> list[StakeAdjustmentResponse]:
+    """Return one page of the stake adjustment history."""
+    try:
+        page_cursor = AdjustmentCursor.decode(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    adjustments, next_cursor = await page_stake_adjustments(
+        db,
+        netuid=netuid,
+        hotkey=hotkey,
+        action=action,
+        start=start,
+        end=end,
+        limit=limit,
+        cursor=page_cursor,
+    )
+    if next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor.encode()
+    return [StakeAdjustmentResponse.model_validate(row) for row in adjustments]
+
+
+@router.get(
+    "/stake_adjustments/totals",
+    response_model=list[StakeTotalsResponse],
+    status_code=status.HTTP_200_OK,
+    summary="Stake Adjustment Totals",
+    description=(
+        "Tao staked, unstaked and net staked per subnet and hour or day, oldest "
+        "first, counting adjustments that have not failed. Without a hotkey the "
+        "totals come from the hourly rollup, so start and end apply to whole hours."
+    ),
+)
+async def stake_totals(
+    interval: Literal["hour", "day"] = Query(
+        default="hour", description="Time bucket size"
+    ),
+    netuid: Optional[int] = Query(
+        default=None, description="Subnet netuid ID (optional)"
+    ),
+    hotkey: Optional[str] = Query(
+        default=None, description="Hotkey SS58 address (optional)"
+    ),
+    start: Optional[datetime] = Query(
+        default=None, description="Earliest creation time (optional)"
+    ),
+    end: Optional[datetime] = Query(
+        default=None, description="Creation time to stop before (optional)"
+    ),
+    db: AsyncSession = Depends(get_db),
+    _: None = Depends(verify_token),
+) -> list[StakeTotalsResponse]:
+    """Return time-bucketed stake totals per subnet."""
+    totals = await get_stake_totals(
+        db,
+        interval=interval,
+        netuid=netuid,
+        hotkey=hotkey,
+        start=start,
+        end=end,
+        use_rollup=settings.stake_rollup_enabled,
+    )
+    return [StakeTotalsResponse(**entry) for entry in totals]
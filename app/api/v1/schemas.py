@@ -1,4 +1,22 @@
-from pydantic import BaseModel, Field
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class CacheStatsResponse(BaseModel):
+    l1_hits: int = Field(..., description="Reads served from the in-process cache.")
+    l2_hits: int = Field(..., description="Reads served from Redis.")
+    misses: int = Field(..., description="Reads not found in either cache layer.")
+    evictions: int = Field(..., description="Entries evicted from the L1 size cap.")
+    invalidations: int = Field(
+        ..., description="Invalidation messages received over pub/sub."
+    )
+    coalesced: int = Field(
+        ..., description="Cache misses that joined another caller's in-flight load."
+    )
+    l1_entries: int = Field(..., description="Entries currently held in L1.")
+    l1_bytes: int = Field(..., description="Size of the values currently held in L1.")
 
 
 class TaoDividendResponse(BaseModel):
@@ -13,3 +31,65 @@ class TaoDividendResponse(BaseModel):
     stake_tx_triggered: bool = Field(
         ..., description="Whether a stake/unstake transaction was triggered."
     )
+    block_number: Optional[int] = Field(
+        default=None, description="Block the dividend was read at, when known."
+    )
+    block_hash: Optional[str] = Field(
+        default=None, description="Hash of the block the dividend was read at."
+    )
+    age_seconds: Optional[float] = Field(
+        default=None,
+        description=(
+            "Seconds since the latest block was resolved. Null for reads pinned "
+            "to an explicit block."
+        ),
+    )
+
+
+class StakeAdjustmentResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int = Field(..., description="Stake adjustment identifier.")
+    created_at: datetime = Field(..., description="When the adjustment was submitted.")
+    netuid: int = Field(..., description="Subnet netuid identifier.")
+    hotkey: str = Field(..., description="SS58 address of the hotkey.")
+    sentiment_score: int = Field(..., description="Sentiment score traded on.")
+    action: str = Field(..., description="Either 'stake' or 'unstake'.")
+    amount_tao: float = Field(..., description="Amount of Tao staked or unstaked.")
+    status: str = Field(
+        ..., description="One of 'pending', 'included', 'finalized' or 'failed'."
+    )
+    extrinsic_hash: Optional[str] = Field(
+        default=None, description="Hash of the extrinsic carrying the adjustment."
+    )
+    block_hash: Optional[str] = Field(
+        default=None, description="Block the extrinsic was included in, when known."
+    )
+    error: Optional[str] = Field(
+        default=None, description="Why the adjustment failed, if it did."
+    )
+
+
+class StakeTotalsResponse(BaseModel):
+    bucket: datetime = Field(..., description="Start of the time bucket (UTC).")
+    netuid: int = Field(..., description="Subnet netuid identifier.")
+    adjustments: int = Field(
+        ..., description="Stake adjustments in the bucket that have not failed."
+    )
+    stake_tao: float = Field(..., description="Tao staked in the bucket.")
+    unstake_tao: float = Field(..., description="Tao unstaked in the bucket.")
+    net_tao: float = Field(..., description="Tao staked minus Tao unstaked.")
+
+
+class DividendHistoryPoint(BaseModel):
+    time: datetime = Field(
+        ..., description="Block time of the sample, or start of its bucket (UTC)."
+    )
+    netuid: int = Field(..., description="Subnet netuid identifier.")
+    hotkey: str = Field(..., description="SS58 address of the hotkey.")
+    block_number: int = Field(
+        ..., description="Block the value was read at; the last one in its bucket."
+    )
+    dividend: int = Field(
+        ..., description="Tao dividends (in raw units), reduced over the bucket."
+    )
@@ -1,19 +1,175 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any
+
 import redis.asyncio as redis
+from prometheus_client import REGISTRY
+
 from app.config import settings
+from app.metrics import CacheStatsCollector, timed
+
+logger = logging.getLogger(__name__)
 
 CACHE_TTL = 120  # Time-to-live for cache entries in seconds (2 minutes)
+BLOCK_CACHE_TTL = (
+    settings.block_cache_ttl
+)  # Block-keyed entries are immutable, but bounded
+INVALIDATION_CHANNEL = "cache:invalidate"
+INVALIDATE_ALL = "*"
+
+# Deletes a lock only if it still holds our token, so an expired lock that another
+# worker has since taken is never released by mistake.
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def hash_size(fields: dict[str, str]) -> int:
+    """Approximate the memory a decoded Redis hash takes in the L1 cache."""
+    return sum(len(field) + len(value) for field, value in fields.items())
+
+
+def wrap_with_timestamp(value: str) -> str:
+    """Wrap a cache value with the time it was written."""
+    return json.dumps({"value": value, "stored_at": time.time()})
+
+
+def unwrap_with_age(cached: str) -> tuple[str, float]:
+    """Unwrap a value written by `wrap_with_timestamp` and return it with its age."""
+    envelope = json.loads(cached)
+    return envelope["value"], max(0.0, time.time() - envelope["stored_at"])
+
+
+@dataclass
+class CacheStats:
+    """Counters for the two cache layers."""
+
+    l1_hits: int = 0
+    l2_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+    coalesced: int = 0
+    l1_entries: int = 0
+    l1_bytes: int = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU cache with a per-entry TTL.
+
+    The cache is capped both by entry count and by the total size of stored values,
+    evicting least recently used entries once either limit is exceeded. Values are
+    strings, or decoded Redis hashes stored with an explicit size.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, stats: CacheStats):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stats = stats
+        self._entries: OrderedDict[str, tuple[Any, float, int]] = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float, size: int | None = None) -> None:
+        size = len(value) if size is None else size
+        if ttl <= 0 or size > self.max_bytes:
+            self.discard(key)
+            return
+        self._remove(key)
+        self._entries[key] = (value, time.monotonic() + ttl, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+        self._update_size()
+
+    def discard(self, key: str) -> None:
+        self._remove(key)
+        self._update_size()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+        self._update_size()
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def _update_size(self) -> None:
+        self.stats.l1_entries = len(self._entries)
+        self.stats.l1_bytes = self._bytes
 
 
 class RedisCache:
-    """Asynchronous Redis cache handler."""
+    """
+    Asynchronous Redis cache handler.
+
+    Reads go through a bounded in-process L1 cache before hitting Redis (L2). Writers
+    publish invalidations over Redis pub/sub so every worker drops stale L1 entries.
+    """
 
-    def __init__(self, redis_url: str):
+    def __init__(
+        self,
+        redis_url: str,
+        l1_enabled: bool = settings.l1_cache_enabled,
+        l1_ttl: float = settings.l1_cache_ttl,
+        l1_max_entries: int = settings.l1_cache_max_entries,
+        l1_max_bytes: int = settings.l1_cache_max_bytes,
+    ):
         self.redis_url = redis_url
         self.redis: redis.Redis | None = None
+        self.stats = CacheStats()
+        self.l1_ttl = l1_ttl
+        self.l1 = (
+            LocalCache(l1_max_entries, l1_max_bytes, self.stats) if l1_enabled else None
+        )
+        self._listener: asyncio.Task | None = None
 
     async def connect(self) -> None:
-        """Establish a connection to Redis."""
+        """Establish a connection to Redis and listen for L1 invalidations."""
         self.redis = await redis.from_url(self.redis_url, decode_responses=True)
+        if self.l1 is not None and self._listener is None:
+            self._listener = asyncio.create_task(self._listen_for_invalidations())
+
+    async def close(self) -> None:
+        """Stop the invalidation listener and close the Redis connection."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self.redis is not None:
+            await self.redis.aclose()
+            self.redis = None
+        if self.l1 is not None:
+            self.l1.clear()
 
     async def _ensure_connected(self) -> None:
         """Ensure Redis connection is established before any operation."""
@@ -21,14 +177,303 @@ class RedisCache:
             await self.connect()
 
     async def get(self, key: str) -> str | None:
-        """Retrieve a value from Redis by key."""
+        """Retrieve a value by key from L1, falling back to Redis."""
+        if self.l1 is not None:
+            value = self.l1.get(key)
+            if value is not None:
+                self.stats.l1_hits += 1
+                return value
+
+        await self._ensure_connected()
+        with timed("redis_get"):
+            value = await self.redis.get(key)
+        self._record_l2(key, value)
+        return value
+
+    async def get_many(self, keys: list[str]) -> list[str | None]:
+        """Retrieve multiple values in the order of `keys`, with one MGET for L1 misses."""
+        if not keys:
+            return []
+
+        values: list[str | None] = [None] * len(keys)
+        missing = list(range(len(keys)))
+        if self.l1 is not None:
+            missing = []
+            for i, key in enumerate(keys):
+                values[i] = self.l1.get(key)
+                if values[i] is None:
+                    missing.append(i)
+            self.stats.l1_hits += len(keys) - len(missing)
+
+        if missing:
+            await self._ensure_connected()
+            with timed("redis_mget"):
+                fetched = await self.redis.mget([keys[i] for i in missing])
+            for i, value in zip(missing, fetched):
+                values[i] = value
+                self._record_l2(keys[i], value)
+        return values
+
+    async def get_fields(self, key: str, fields: list[str]) -> list[str | None]:
+        """
+        Retrieve some fields of a Redis hash with one HMGET.
+
+        Served from L1 when the whole hash is cached there.
+        """
+        if self.l1 is not None:
+            cached = self.l1.get(key)
+            if cached is not None:
+                self.stats.l1_hits += 1
+                return [cached.get(field) for field in fields]
+
+        await self._ensure_connected()
+        with timed("redis_hmget"):
+            values = await self.redis.hmget(key, fields)
+        if all(value is None for value in values):
+            self.stats.misses += 1
+        else:
+            self.stats.l2_hits += 1
+        return values
+
+    async def get_hashes(self, keys: list[str]) -> list[dict[str, str] | None]:
+        """
+        Retrieve whole Redis hashes in the order of `keys`, None for missing ones.
+
+        L1 misses are read with pipelined HGETALLs in a single round-trip.
+        """
+        if not keys:
+            return []
+
+        values: list[dict[str, str] | None] = [None] * len(keys)
+        missing = list(range(len(keys)))
+        if self.l1 is not None:
+            missing = []
+            for i, key in enumerate(keys):
+                values[i] = self.l1.get(key)
+                if values[i] is None:
+                    missing.append(i)
+            self.stats.l1_hits += len(keys) - len(missing)
+
+        if missing:
+            await self._ensure_connected()
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for i in missing:
+                    pipe.hgetall(keys[i])
+                with timed("redis_hgetall"):
+                    fetched = await pipe.execute()
+            for i, fields in zip(missing, fetched):
+                values[i] = fields or None
+                self._record_l2(keys[i], values[i], size=hash_size(fields))
+        return values
+
+    async def set(self, key: str, value: str, ttl: int | None = CACHE_TTL) -> None:
+        """Set a value in Redis with an optional TTL (None keeps it until evicted)."""
+        await self._ensure_connected()
+        with timed("redis_set"):
+            await self.redis.set(key, value, ex=ttl)
+        self._store_l1(key, value, ttl)
+
+    async def set_many(
+        self,
+        mapping: dict[str, str],
+        ttl: int | None = CACHE_TTL,
+        atomic: bool = False,
+        hashes: dict[str, dict[str, str]] | None = None,
+    ) -> None:
+        """
+        Set multiple values in Redis with a shared TTL in a single pipeline.
+
+        `hashes` are written as Redis hashes, replacing any existing hash at each
+        key. With `atomic=True` the pipeline runs as a MULTI/EXEC transaction, so
+        readers never observe a partially written batch.
+        """
+        hashes = hashes or {}
+        if not mapping and not hashes:
+            return
+        await self._ensure_connected()
+        async with self.redis.pipeline(transaction=atomic) as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, value, ex=ttl)
+            for key, fields in hashes.items():
+                pipe.delete(key)
+                pipe.hset(key, mapping=fields)
+                if ttl is not None:
+                    pipe.expire(key, ttl)
+            with timed("redis_set_many"):
+                await pipe.execute()
+        for key, value in mapping.items():
+            self._store_l1(key, value, ttl)
+        for key, fields in hashes.items():
+            self._store_l1(key, fields, ttl, size=hash_size(fields))
+
+    async def copy_with_updates(
+        self,
+        copies: dict[str, str],
+        fields: dict[str, dict[str, str]],
+        ttl: int | None = CACHE_TTL,
+    ) -> bool:
+        """
+        Create keys as server-side copies of others, then set fields of the copies.
+
+        `copies` maps each new key to the key it is copied from, and `fields` holds
+        the hash fields to change in the new keys, so only those cross the network
+        however large the copied hashes are. Runs as one MULTI/EXEC transaction.
+
+        Returns:
+            bool: False, with the new keys deleted again, if a source key no longer
+                exists (expired or evicted), so the copies would be incomplete.
+        """
+        await self._ensure_connected()
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for key, source in copies.items():
+                pipe.copy(source, key, replace=True)
+            for key, values in fields.items():
+                pipe.hset(key, mapping=values)
+            if ttl is not None:
+                for key in copies:
+                    pipe.expire(key, ttl)
+            with timed("redis_copy"):
+                results = await pipe.execute()
+        if all(results[: len(copies)]):
+            return True
+        await self.redis.delete(*copies)
+        return False
+
+    async def expire_many(self, keys: list[str], ttl: int) -> None:
+        """Reset the TTL of several keys in a single pipeline."""
+        if not keys:
+            return
         await self._ensure_connected()
-        return await self.redis.get(key)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.expire(key, ttl)
+            with timed("redis_expire_many"):
+                await pipe.execute()
+
+    async def set_with_age(self, key: str, value: str, ttl: int | None) -> str:
+        """
+        Set a value wrapped with its write time, so readers can tell how old it is.
+
+        Used for stale-while-revalidate entries: `ttl` is the hard TTL, while readers
+        compare the age from `unwrap_with_age` against their own soft TTL.
+
+        Returns:
+            str: The wrapped value as stored in Redis.
+        """
+        cached = wrap_with_timestamp(value)
+        await self.set(key, cached, ttl=ttl)
+        return cached
+
+    async def invalidate(self, keys: list[str] | None = None) -> None:
+        """
+        Tell every worker to drop `keys` from its L1 cache (all entries if None).
 
-    async def set(self, key: str, value: str, ttl: int = CACHE_TTL) -> None:
-        """Set a value in Redis with an optional TTL."""
+        Call this after overwriting a mutable key so other processes stop serving
+        the old value before their L1 TTL runs out.
+        """
         await self._ensure_connected()
-        await self.redis.set(key, value, ex=ttl)
+        await self.redis.publish(
+            INVALIDATION_CHANNEL, json.dumps(keys if keys else INVALIDATE_ALL)
+        )
+
+    async def acquire_lock(self, name: str, ttl: float) -> str | None:
+        """Try to take a short-lived lock, returning its token if acquired."""
+        await self._ensure_connected()
+        token = uuid.uuid4().hex
+        acquired = await self.redis.set(
+            f"lock:{name}", token, nx=True, px=int(ttl * 1000)
+        )
+        return token if acquired else None
+
+    async def release_lock(self, name: str, token: str) -> None:
+        """Release a lock previously taken with `acquire_lock`."""
+        await self._ensure_connected()
+        await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, f"lock:{name}", token)
+
+    async def push(self, key: str, *values: str) -> int:
+        """Append values to the Redis list at `key`, returning its new length."""
+        await self._ensure_connected()
+        return await self.redis.rpush(key, *values)
+
+    async def pop_many(self, key: str, count: int) -> list[str]:
+        """Atomically pop up to `count` values from the head of a Redis list."""
+        await self._ensure_connected()
+        return await self.redis.lpop(key, count) or []
+
+    async def length(self, key: str) -> int:
+        """Return the length of the Redis list at `key`."""
+        await self._ensure_connected()
+        return await self.redis.llen(key)
+
+    async def wait_for(
+        self, key: str, timeout: float, interval: float = 0.05, is_hash: bool = False
+    ) -> str | dict[str, str] | None:
+        """Poll Redis until `key` is set or `timeout` seconds pass."""
+        await self._ensure_connected()
+        deadline = time.monotonic() + timeout
+        while True:
+            if is_hash:
+                value = await self.redis.hgetall(key) or None
+            else:
+                value = await self.redis.get(key)
+            if value is not None or time.monotonic() >= deadline:
+                return value
+            await asyncio.sleep(interval)
+
+    def _record_l2(self, key: str, value: Any, size: int | None = None) -> None:
+        if value is None:
+            self.stats.misses += 1
+            return
+        self.stats.l2_hits += 1
+        self._store_l1(key, value, self.l1_ttl, size)
+
+    def _store_l1(
+        self, key: str, value: Any, ttl: float | None, size: int | None = None
+    ) -> None:
+        if self.l1 is not None:
+            self.l1.set(
+                key,
+                value,
+                self.l1_ttl if ttl is None else min(ttl, self.l1_ttl),
+                size,
+            )
+
+    def _apply_invalidation(self, payload: str) -> None:
+        keys = json.loads(payload)
+        self.stats.invalidations += 1
+        if keys == INVALIDATE_ALL:
+            self.l1.clear()
+        else:
+            for key in keys:
+                self.l1.discard(key)
+
+    async def _listen_for_invalidations(self, max_backoff: float = 30.0) -> None:
+        """Apply invalidation messages to L1, resubscribing with backoff on errors."""
+        backoff = 1.0
+        while True:
+            try:
+                async with self.redis.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    backoff = 1.0
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            self._apply_invalidation(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Entries published while disconnected were missed, so start clean.
+                self.l1.clear()
+                logger.warning(
+                    f"Cache invalidation listener failed: {e}. "
+                    f"Retrying in {backoff:.0f}s"
+                )
+                await asyncio.sleep(backoff)
+                backoff = min(max_backoff, backoff * 2)
+
+    def get_stats(self) -> dict:
+        """Return L1/L2 hit, miss and eviction counters."""
+        return self.stats.as_dict()
 
 
 redis_cache = RedisCache(settings.redis_url)
+REGISTRY.register(CacheStatsCollector(redis_cache.stats))
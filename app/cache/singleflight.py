@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, TypeVar
+
+from app.cache.redis import CacheStats, redis_cache
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key onto one in-flight task."""
+
+    def __init__(self, stats: CacheStats):
+        self.stats = stats
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `fn` for `key`, or join the call already in flight for it.
+
+        The shared task is shielded, so a cancelled caller does not cancel the load
+        for everyone else waiting on the same key.
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(fn())
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+
+single_flight = SingleFlight(redis_cache.stats)
+
+
+async def coalesce(
+    key: str,
+    loader: Callable[[], Awaitable[T]],
+    is_hash: bool = False,
+    load_timeout: float = 0.0,
+) -> T:
+    """
+    Load the cache entry `key` once, however many callers miss on it at the same time.
+
+    Within a process, concurrent callers share one in-flight load. Across processes,
+    a short Redis lock lets one worker run `loader` (which must write `key`) while
+    the others wait for the value to appear. The lock is held, and waited on, for
+    `load_timeout` seconds longer than `refresh_lock_ttl` and `refresh_lock_wait`,
+    so a slow load neither loses its lock nor makes waiters give up and load too.
+
+    Args:
+        key (str): Cache key being loaded.
+        loader (Callable[[], Awaitable[T]]): Fetches the value, writes it to the
+            cache and returns it.
+        is_hash (bool): Whether `key` holds a Redis hash rather than a string.
+        load_timeout (float): Longest `loader` is expected to run, in seconds.
+
+    Returns:
+        T: The cached representation of the value.
+    """
+
+    async def load() -> T:
+        token = await redis_cache.acquire_lock(
+            key, settings.refresh_lock_ttl + load_timeout
+        )
+        if token is None:
+            value = await redis_cache.wait_for(
+                key, settings.refresh_lock_wait + load_timeout, is_hash=is_hash
+            )
+            if value is not None:
+                redis_cache.stats.coalesced += 1
+                return value
+            logger.warning(f"Timed out waiting for another worker to load {key}")
+            return await loader()
+
+        try:
+            return await loader()
+        finally:
+            await redis_cache.release_lock(key, token)
+
+    return await single_flight.do(key, load)
+
+
+_background_refreshes: set[asyncio.Task] = set()
+
+
+def revalidate_in_background(key: str, loader: Callable[[], Awaitable[str]]) -> None:
+    """
+    Schedule a coalesced refresh of `key` without waiting for it.
+
+    Used to serve a stale value immediately while it is being refreshed.
+    """
+
+    async def refresh() -> None:
+        try:
+            await coalesce(key, loader)
+        except Exception as e:
+            logger.warning(f"Background refresh of {key} failed: {e}")
+
+    task = asyncio.create_task(refresh())
+    _background_refreshes.add(task)
+    task.add_done_callback(_background_refreshes.discard)
@@ -1,10 +1,56 @@
+import logging
+
 from celery import Celery
+from celery.signals import (
+    worker_init,
+    worker_process_init,
+    worker_process_shutdown,
+    worker_shutdown,
+)
 from app.config import settings
+from app.metrics import mark_process_dead, start_metrics_server
+from app.tasks.worker_loop import warm_up, worker_loop
 
+logger = logging.getLogger(__name__)
 
 celery_app = Celery("bittensor_worker")
 celery_app.conf.broker_url = settings.redis_url
 celery_app.conf.result_backend = settings.redis_url
 celery_app.conf.task_routes = {"app.celery.background.*": {"queue": "default"}}
 
-celery_app.autodiscover_tasks(["app.tasks.bittensor"])
+if settings.indexer_beat_enabled:
+    celery_app.conf.beat_schedule = {
+        "index-finalized-head": {
+            "task": "app.tasks.indexer.index_finalized_head_task",
+            "schedule": settings.indexer_interval_seconds,
+        },
+    }
+
+celery_app.autodiscover_tasks(["app.tasks.bittensor", "app.tasks.indexer"])
+
+
+@worker_init.connect
+def serve_worker_metrics(**kwargs) -> None:
+    """Expose the trade task metrics of this worker for Prometheus to scrape."""
+    if settings.worker_metrics_port is not None:
+        start_metrics_server(settings.worker_metrics_port)
+
+
+@worker_process_init.connect
+def start_worker_loop(**kwargs) -> None:
+    """Start this worker process's event loop and open its connections up front."""
+    try:
+        worker_loop.run(warm_up())
+    except Exception as e:
+        logger.warning(f"Worker warm-up failed, connecting on first use: {e}")
+
+
+@worker_process_shutdown.connect
+def forget_worker_process(pid: int, **kwargs) -> None:
+    worker_loop.stop()
+    mark_process_dead(pid)
+
+
+@worker_shutdown.connect
+def stop_worker_loop(**kwargs) -> None:
+    worker_loop.stop()
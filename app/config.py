@@ -9,6 +9,103 @@ class Settings(BaseSettings):
     datura_api_key: str = "dummy"
     auth_token: str = "test"
     postgres_dsn: str = "postgresql+asyncpg://postgres:postgres@db:5432/postgres"
+    # Database connection pool per process.
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    # Stake adjustments are buffered and inserted together once this many are
+    # waiting, or after the flush interval.
+    db_write_batch_size: int = 500
+    db_flush_interval: float = 1.0
+    # Keep hourly stake totals per subnet up to date as adjustments are written,
+    # so aggregate queries without a hotkey read them instead of raw rows.
+    stake_rollup_enabled: bool = True
+    subtensor_network: str = "finney"
+    substrate_pool_size: int = 4
+    substrate_pool_timeout: float = 10.0
+    substrate_keepalive_interval: float = 20.0
+    # Chain requests in flight per process, across all connections in the pool.
+    substrate_max_inflight_rpcs: int = 32
+    # Subnets read concurrently per request, and how long one may take before it
+    # is left out of the response.
+    subnet_concurrency: int = 8
+    subnet_timeout: float = 30.0
+    # Block-keyed dividends never change, but expire after this long so Redis
+    # (volatile-lru) can evict them without touching keys that have no TTL.
+    block_cache_ttl: int = 3600
+    # Serve from the indexer snapshot while it is at most this many blocks behind.
+    snapshot_max_lag_blocks: int = 5
+    # Move the snapshot to the current block once its own block is this old, even
+    # if no dividend changed, well before non-archive nodes prune it (256 blocks).
+    snapshot_max_block_age: int = 128
+    # The indexer process subscribes to TaoDividendsPerSubnet storage changes and
+    # writes only what changed, instead of rescanning every finalized head. Only
+    # the watched subnets (all if empty) are kept current, in netuid order until
+    # their hotkeys would exceed `dividend_watch_max_hotkeys`, the keys of a single
+    # subscription. They are rescanned in full on every reconnect and every
+    # `dividend_resync_blocks` blocks, and each subnet after its epoch, so hotkeys
+    # paid for the first time show up.
+    dividend_subscriptions_enabled: bool = True
+    dividend_watch_netuids: list[int] = []
+    dividend_watch_max_hotkeys: int = 4096
+    dividend_resync_blocks: int = 360
+    # Index from Celery beat instead of the standalone indexer process; run only one.
+    indexer_beat_enabled: bool = False
+    indexer_interval_seconds: float = 12.0
+    l1_cache_enabled: bool = True
+    l1_cache_ttl: float = 5.0
+    l1_cache_max_entries: int = 10_000
+    l1_cache_max_bytes: int = 64 * 1024 * 1024
+    # Cross-worker refresh lock: how long it is held and how long others wait on it.
+    refresh_lock_ttl: float = 10.0
+    refresh_lock_wait: float = 5.0
+    # The "latest" block is served as-is up to the soft TTL, then served while a
+    # refresh runs in the background, and waited on once it passes the hard TTL.
+    latest_block_soft_ttl: float = 12.0
+    latest_block_hard_ttl: int = 120
+    # Shared HTTP clients for Chutes and Datura.
+    http_timeout: float = 15.0
+    http_max_connections: int = 20
+    http_max_keepalive_connections: int = 10
+    http_keepalive_expiry: float = 60.0
+    http_max_retries: int = 3
+    http_backoff_base: float = 0.5
+    http_backoff_max: float = 10.0
+    # Client-side request rate limits, in requests per second.
+    chutes_rate_limit: float = 2.0
+    datura_rate_limit: float = 5.0
+    # Tweets and sentiment are shared by every trade on a subnet and date window.
+    tweet_cache_ttl: int = 900
+    sentiment_cache_ttl: int = 3600
+    # Trade requests are batched per subnet: a batch is flushed after the window,
+    # or as soon as it holds `trade_batch_size` requests.
+    trade_batch_window: float = 5.0
+    trade_batch_size: int = 100
+    # How long Celery workers keep an unlocked wallet before loading it again.
+    wallet_cache_ttl: float = 600.0
+    # Stake adjustments are submitted in Utility batches of up to this many calls;
+    # atomic batches use batch_all, so one failing call reverts the whole batch.
+    stake_batch_max_calls: int = 32
+    stake_batch_atomic: bool = False
+    # Submit stake batches without waiting for inclusion and let the inclusion
+    # tracker record their outcome. Extrinsics pending for longer are marked failed.
+    track_inclusion: bool = True
+    pending_extrinsic_timeout: float = 900.0
+    # The indexer records a dividends snapshot once per this many blocks into the
+    # DividendSample history table (300 blocks is about an hour).
+    dividend_history_enabled: bool = True
+    dividend_history_interval: int = 300
+    # Cache-Control of tao_dividends responses: latest reads may change with the
+    # next block, reads pinned to a block hash never change. Public responses may
+    # be stored by a CDN or reverse proxy; they vary on Authorization.
+    dividends_cache_public: bool = True
+    dividends_latest_max_age: int = 12
+    dividends_pinned_max_age: int = 86400
+    # Let clients ask for a Server-Timing breakdown with the X-Server-Timing header.
+    server_timing_enabled: bool = False
+    # Port Celery workers serve /metrics on; None disables it.
+    worker_metrics_port: int | None = 9101
 
     class Config:
         env_file = ".env"
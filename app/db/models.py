@@ -3,7 +3,16 @@ from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, declared_attr
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+)
 
 from app.config import settings
 
@@ -11,6 +20,11 @@ engine = create_async_engine(
     settings.postgres_dsn,
     echo=False,
     future=True,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=True,
 )
 
 async_session = sessionmaker(
@@ -33,6 +47,13 @@ class CustomBase:
 
 Base = declarative_base(cls=CustomBase)
 
+# StakeAdjustment.status values. A submitted extrinsic is pending until the
+# inclusion tracker finds it in a block, then finalized once that block is.
+STATUS_PENDING = "pending"
+STATUS_INCLUDED = "included"
+STATUS_FINALIZED = "finalized"
+STATUS_FAILED = "failed"
+
 
 class StakeAdjustment(Base):
     """Model for recording stake/unstake adjustments."""
@@ -42,6 +63,59 @@ class StakeAdjustment(Base):
     sentiment_score = Column(Integer, nullable=False)
     action = Column(String, nullable=False)  # 'stake' or 'unstake'
     amount_tao = Column(Float, nullable=False)
+    error = Column(String, nullable=True)  # Why the call failed; None on success
+    status = Column(String, nullable=False, default=STATUS_INCLUDED, index=True)
+    extrinsic_hash = Column(String, nullable=True, index=True)
+    block_hash = Column(String, nullable=True)  # Block the extrinsic was included in
+
+    __table_args__ = (
+        Index(
+            "ix_stakeadjustment_netuid_hotkey_created_at",
+            "netuid",
+            "hotkey",
+            "created_at",
+        ),
+        Index("ix_stakeadjustment_created_at", "created_at"),
+    )
+
+
+class HourlyStakeTotal(Base):
+    """
+    Rollup of stake adjustments per hour, subnet and action.
+
+    Maintained as adjustments are written, and reduced again when the inclusion
+    tracker fails one, so it only counts adjustments that have not failed.
+    """
+
+    bucket = Column(DateTime, nullable=False)  # Start of the hour
+    netuid = Column(Integer, nullable=False)
+    action = Column(String, nullable=False)
+    adjustments = Column(Integer, nullable=False, default=0)
+    amount_tao = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        UniqueConstraint("bucket", "netuid", "action", name="uq_hourlystaketotal_key"),
+    )
+
+
+class DividendSample(Base):
+    """
+    A hotkey's TaoDividendsPerSubnet value recorded from an indexed block.
+
+    Append-only: the indexer writes a full snapshot of every subnet once per
+    `dividend_history_interval` blocks, and rows are never updated.
+    """
+
+    block_number = Column(Integer, nullable=False)
+    recorded_at = Column(DateTime, nullable=False)  # Block timestamp (UTC)
+    netuid = Column(Integer, nullable=False)
+    hotkey = Column(String, nullable=False)
+    dividend = Column(BigInteger, nullable=False)  # Raw units
+
+    __table_args__ = (
+        Index("ix_dividendsample_netuid_recorded_at", "netuid", "recorded_at"),
+        Index("ix_dividendsample_hotkey_recorded_at", "hotkey", "recorded_at"),
+    )
 
 
 async def get_db() -> AsyncSession:
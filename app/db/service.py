@@ -1,39 +1,458 @@
-from sqlalchemy.ext.asyncio import AsyncSession
+import base64
+import binascii
+import json
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from app.db.models import StakeAdjustment
+from sqlalchemy import func, literal_column, select, tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
 
+from app.db.models import (
+    STATUS_FAILED,
+    DividendSample,
+    HourlyStakeTotal,
+    StakeAdjustment,
+)
 
-async def save_stake_adjustment(
+# Keys of HourlyStakeTotal rows: (bucket, netuid, action).
+RollupKey = Tuple[datetime, int, str]
+
+# Bucket sizes the stake totals and dividend history can be grouped by.
+TOTALS_INTERVALS = ("hour", "day")
+
+# How the dividend history reduces the samples in a bucket to one value.
+HISTORY_AGGREGATES = ("last", "avg", "max")
+
+
+@dataclass(frozen=True)
+class AdjustmentCursor:
+    """Position in the stake adjustment history, after the last row returned."""
+
+    created_at: datetime
+    id: int
+
+    def encode(self) -> str:
+        """Encode the cursor as an opaque URL-safe token."""
+        payload = json.dumps([self.created_at.isoformat(), self.id])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    @classmethod
+    def decode(cls, token: str) -> "AdjustmentCursor":
+        """Decode a token produced by `encode`, raising ValueError if it is invalid."""
+        try:
+            created_at, id_ = json.loads(base64.urlsafe_b64decode(token.encode()))
+            return cls(datetime.fromisoformat(created_at), int(id_))
+        except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+
+
+def utc_naive(moment: datetime) -> datetime:
+    """Convert a datetime to naive UTC, as stored in `created_at`."""
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def hour_bucket(moment: datetime) -> datetime:
+    """Return the start of the hour a moment falls in."""
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+async def get_adjustments_by_status(
+    db: AsyncSession, status: str
+) -> List[StakeAdjustment]:
+    """
+    Load the stake adjustments with a given status, oldest first.
+
+    Adjustments submitted in one batch keep the order of their calls.
+    """
+    result = await db.execute(
+        select(StakeAdjustment)
+        .where(StakeAdjustment.status == status)
+        .order_by(StakeAdjustment.id)
+    )
+    return list(result.scalars())
+
+
+async def find_stake_adjustments(
+    db: AsyncSession,
+    *,
+    extrinsic_hash: Optional[str] = None,
+    hotkey: Optional[str] = None,
+    netuid: Optional[int] = None,
+    limit: int = 50,
+) -> List[StakeAdjustment]:
+    """
+    Look up stake adjustments by extrinsic hash or hotkey, newest first.
+
+    Args:
+        db (AsyncSession): The async SQLAlchemy session.
+        extrinsic_hash (Optional[str]): Only adjustments submitted in this extrinsic.
+        hotkey (Optional[str]): Only adjustments for this hotkey.
+        netuid (Optional[int]): Only adjustments on this subnet.
+        limit (int): Maximum number of adjustments to return.
+
+    Returns:
+        List[StakeAdjustment]: The matching records.
+    """
+    query = select(StakeAdjustment)
+    if extrinsic_hash is not None:
+        query = query.where(StakeAdjustment.extrinsic_hash == extrinsic_hash)
+    if hotkey is not None:
+        query = query.where(StakeAdjustment.hotkey == hotkey)
+    if netuid is not None:
+        query = query.where(StakeAdjustment.netuid == netuid)
+    result = await db.execute(query.order_by(StakeAdjustment.id.desc()).limit(limit))
+    return list(result.scalars())
+
+
+def adjustment_filters(
+    *,
+    netuid: Optional[int] = None,
+    hotkey: Optional[str] = None,
+    action: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> list:
+    """Build the WHERE clauses for a stake adjustment history query."""
+    clauses = []
+    if netuid is not None:
+        clauses.append(StakeAdjustment.netuid == netuid)
+    if hotkey is not None:
+        clauses.append(StakeAdjustment.hotkey == hotkey)
+    if action is not None:
+        clauses.append(StakeAdjustment.action == action)
+    if start is not None:
+        clauses.append(StakeAdjustment.created_at >= utc_naive(start))
+    if end is not None:
+        clauses.append(StakeAdjustment.created_at < utc_naive(end))
+    return clauses
+
+
+async def page_stake_adjustments(
+    db: AsyncSession,
+    *,
+    netuid: Optional[int] = None,
+    hotkey: Optional[str] = None,
+    action: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 100,
+    cursor: Optional[AdjustmentCursor] = None,
+) -> Tuple[List[StakeAdjustment], Optional[AdjustmentCursor]]:
+    """
+    Read one page of the stake adjustment history, newest first.
+
+    Pages are keyed on `(created_at, id)`, so each one starts with an index seek
+    right after the previous page however deep it is, and rows written meanwhile
+    do not shift the pages that follow.
+
+    Args:
+        db (AsyncSession): The async SQLAlchemy session.
+        netuid (Optional[int]): Only adjustments on this subnet.
+        hotkey (Optional[str]): Only adjustments for this hotkey.
+        action (Optional[str]): Only 'stake' or 'unstake' adjustments.
+        start (Optional[datetime]): Only adjustments created at or after this time.
+        end (Optional[datetime]): Only adjustments created before this time.
+        limit (int): Maximum number of adjustments to return.
+        cursor (Optional[AdjustmentCursor]): Position returned with the previous page.
+
+    Returns:
+        Tuple[List[StakeAdjustment], Optional[AdjustmentCursor]]: The page and the
+            cursor of the next one, or None if this is the last page.
+    """
+    query = select(StakeAdjustment).where(
+        *adjustment_filters(
+            netuid=netuid, hotkey=hotkey, action=action, start=start, end=end
+        )
+    )
+    if cursor is not None:
+        query = query.where(
+            tuple_(StakeAdjustment.created_at, StakeAdjustment.id)
+            < tuple_(cursor.created_at, cursor.id)
+        )
+    result = await db.execute(
+        query.order_by(
+            StakeAdjustment.created_at.desc(), StakeAdjustment.id.desc()
+        ).limit(limit + 1)
+    )
+    rows = list(result.scalars())
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, AdjustmentCursor(rows[-1].created_at, rows[-1].id)
+
+
+def fold_stake_totals(
+    rows: Iterable[Tuple[datetime, int, str, int, float]],
+) -> List[dict]:
+    """
+    Fold per-action totals into one entry per bucket and subnet, oldest first.
+
+    Args:
+        rows: (bucket, netuid, action, adjustments, amount_tao) tuples.
+
+    Returns:
+        List[dict]: Entries with the adjustments count and the TAO staked, unstaked
+            and net staked in each bucket and subnet.
+    """
+    totals: Dict[Tuple[datetime, int], dict] = {}
+    for bucket, netuid, action, adjustments, amount_tao in rows:
+        entry = totals.setdefault(
+            (bucket, netuid),
+            {
+                "bucket": bucket,
+                "netuid": netuid,
+                "adjustments": 0,
+                "stake_tao": 0.0,
+                "unstake_tao": 0.0,
+            },
+        )
+        entry["adjustments"] += adjustments
+        entry[f"{action}_tao"] += amount_tao
+    for entry in totals.values():
+        entry["net_tao"] = entry["stake_tao"] - entry["unstake_tao"]
+    return [totals[key] for key in sorted(totals)]
+
+
+async def get_stake_totals(
     db: AsyncSession,
     *,
-    netuid: int,
-    hotkey: str,
-    sentiment_score: int,
-    action: str,
-    amount_tao: float,
-) -> StakeAdjustment:
+    interval: str = "hour",
+    netuid: Optional[int] = None,
+    hotkey: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    use_rollup: bool = True,
+) -> List[dict]:
     """
-    Persist a stake adjustment record into the database.
+    Total the stake adjustments that have not failed per time bucket and subnet.
+
+    Without a hotkey, and with `use_rollup`, the totals are summed from
+    HourlyStakeTotal, so the bounds apply to whole hours. Otherwise the raw
+    adjustments in range are read through the `(netuid, hotkey, created_at)` or
+    `(created_at)` index and grouped in the query.
 
     Args:
         db (AsyncSession): The async SQLAlchemy session.
-        netuid (int): The subnet ID.
-        hotkey (str): The hotkey SS58 address.
-        sentiment_score (int): Sentiment score (-100 to 100).
-        action (str): Type of action, either 'stake' or 'unstake'.
-        amount_tao (float): Amount of Tao tokens involved.
+        interval (str): Bucket size, 'hour' or 'day'.
+        netuid (Optional[int]): Only adjustments on this subnet.
+        hotkey (Optional[str]): Only adjustments for this hotkey.
+        start (Optional[datetime]): Only adjustments created at or after this time.
+        end (Optional[datetime]): Only adjustments created before this time.
+        use_rollup (bool): Whether the rollup may answer the query.
 
     Returns:
-        StakeAdjustment: The saved database record.
-    """
-    adjustment = StakeAdjustment(
-        netuid=netuid,
-        hotkey=hotkey,
-        sentiment_score=sentiment_score,
-        action=action,
-        amount_tao=amount_tao,
+        List[dict]: One entry per bucket and subnet, as built by `fold_stake_totals`.
+    """
+    if interval not in TOTALS_INTERVALS:
+        raise ValueError(f"Unsupported interval: {interval}")
+    # Inlined rather than bound, so the bucket expression in the select list and
+    # in GROUP BY are the same to the database.
+    unit = literal_column(f"'{interval}'")
+    if hotkey is None and use_rollup:
+        bucket = func.date_trunc(unit, HourlyStakeTotal.bucket)
+        query = select(
+            bucket,
+            HourlyStakeTotal.netuid,
+            HourlyStakeTotal.action,
+            func.sum(HourlyStakeTotal.adjustments),
+            func.sum(HourlyStakeTotal.amount_tao),
+        ).where(HourlyStakeTotal.adjustments > 0)
+        if netuid is not None:
+            query = query.where(HourlyStakeTotal.netuid == netuid)
+        if start is not None:
+            query = query.where(
+                HourlyStakeTotal.bucket >= hour_bucket(utc_naive(start))
+            )
+        if end is not None:
+            query = query.where(HourlyStakeTotal.bucket < utc_naive(end))
+        group_by = (bucket, HourlyStakeTotal.netuid, HourlyStakeTotal.action)
+    else:
+        bucket = func.date_trunc(unit, StakeAdjustment.created_at)
+        query = select(
+            bucket,
+            StakeAdjustment.netuid,
+            StakeAdjustment.action,
+            func.count(StakeAdjustment.id),
+            func.sum(StakeAdjustment.amount_tao),
+        ).where(
+            StakeAdjustment.status != STATUS_FAILED,
+            *adjustment_filters(netuid=netuid, hotkey=hotkey, start=start, end=end),
+        )
+        group_by = (bucket, StakeAdjustment.netuid, StakeAdjustment.action)
+
+    result = await db.execute(query.group_by(*group_by))
+    return fold_stake_totals(result.all())
+
+
+def rollup_deltas(rows: Iterable[dict]) -> Dict[RollupKey, Tuple[int, float]]:
+    """Sum adjustment rows into (adjustments, amount_tao) per rollup key."""
+    deltas: Dict[RollupKey, list] = defaultdict(lambda: [0, 0.0])
+    for row in rows:
+        delta = deltas[(hour_bucket(row["created_at"]), row["netuid"], row["action"])]
+        delta[0] += 1
+        delta[1] += row["amount_tao"]
+    return {key: (count, amount) for key, (count, amount) in deltas.items()}
+
+
+async def add_to_hourly_totals(conn: AsyncConnection, rows: List[dict]) -> None:
+    """
+    Add newly written adjustment rows to HourlyStakeTotal in one upsert.
+
+    Rows that already failed are left out. Run it in the transaction that
+    inserts the rows, so the rollup never disagrees with them.
+    """
+    deltas = rollup_deltas(row for row in rows if row["status"] != STATUS_FAILED)
+    if not deltas:
+        return
+    statement = pg_insert(HourlyStakeTotal).values(
+        [
+            {
+                "bucket": bucket,
+                "netuid": netuid,
+                "action": action,
+                "adjustments": count,
+                "amount_tao": amount,
+            }
+            for (bucket, netuid, action), (count, amount) in deltas.items()
+        ]
+    )
+    await conn.execute(
+        statement.on_conflict_do_update(
+            constraint="uq_hourlystaketotal_key",
+            set_={
+                "adjustments": HourlyStakeTotal.adjustments
+                + statement.excluded.adjustments,
+                "amount_tao": HourlyStakeTotal.amount_tao
+                + statement.excluded.amount_tao,
+            },
+        )
+    )
+
+
+async def subtract_from_hourly_totals(
+    db: AsyncSession, adjustments: List[StakeAdjustment]
+) -> None:
+    """Take adjustments that turned out to fail back out of HourlyStakeTotal."""
+    deltas = rollup_deltas(
+        {
+            "created_at": adjustment.created_at,
+            "netuid": adjustment.netuid,
+            "action": adjustment.action,
+            "amount_tao": adjustment.amount_tao,
+        }
+        for adjustment in adjustments
     )
-    db.add(adjustment)
-    await db.commit()
-    await db.refresh(adjustment)
-    return adjustment
+    for (bucket, netuid, action), (count, amount) in deltas.items():
+        await db.execute(
+            update(HourlyStakeTotal)
+            .where(
+                HourlyStakeTotal.bucket == bucket,
+                HourlyStakeTotal.netuid == netuid,
+                HourlyStakeTotal.action == action,
+            )
+            .values(
+                adjustments=HourlyStakeTotal.adjustments - count,
+                amount_tao=HourlyStakeTotal.amount_tao - amount,
+            )
+        )
+
+
+async def get_dividend_history(
+    db: AsyncSession,
+    *,
+    netuid: Optional[int] = None,
+    hotkey: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    interval: Optional[str] = None,
+    aggregate: str = "last",
+    limit: int = 10_000,
+) -> List[dict]:
+    """
+    Read recorded dividends for a subnet and/or hotkey, downsampled in the query.
+
+    Each series is ordered by time. With an `interval`, every series gets one
+    point per bucket: the value of the last sample in it, or the average or the
+    maximum of its samples. The point's block is the last one in the bucket.
+
+    Args:
+        db (AsyncSession): The async SQLAlchemy session.
+        netuid (Optional[int]): Only dividends on this subnet.
+        hotkey (Optional[str]): Only dividends of this hotkey.
+        start (Optional[datetime]): Only samples recorded at or after this time.
+        end (Optional[datetime]): Only samples recorded before this time.
+        interval (Optional[str]): Bucket size, 'hour' or 'day'; None for every sample.
+        aggregate (str): 'last', 'avg' or 'max'.
+        limit (int): Maximum number of points to return.
+
+    Returns:
+        List[dict]: Points with the time, netuid, hotkey, block_number and dividend.
+    """
+    if interval is not None and interval not in TOTALS_INTERVALS:
+        raise ValueError(f"Unsupported interval: {interval}")
+    if aggregate not in HISTORY_AGGREGATES:
+        raise ValueError(f"Unsupported aggregate: {aggregate}")
+
+    clauses = []
+    if netuid is not None:
+        clauses.append(DividendSample.netuid == netuid)
+    if hotkey is not None:
+        clauses.append(DividendSample.hotkey == hotkey)
+    if start is not None:
+        clauses.append(DividendSample.recorded_at >= utc_naive(start))
+    if end is not None:
+        clauses.append(DividendSample.recorded_at < utc_naive(end))
+
+    series = (DividendSample.netuid, DividendSample.hotkey)
+    if interval is None:
+        query = select(
+            DividendSample.recorded_at,
+            *series,
+            DividendSample.block_number,
+            DividendSample.dividend,
+        ).order_by(*series, DividendSample.recorded_at)
+    else:
+        bucket = func.date_trunc(
+            literal_column(f"'{interval}'"), DividendSample.recorded_at
+        )
+        if aggregate == "last":
+            # DISTINCT ON keeps the first row of each bucket in ORDER BY order.
+            query = (
+                select(
+                    bucket,
+                    *series,
+                    DividendSample.block_number,
+                    DividendSample.dividend,
+                )
+                .distinct(*series, bucket)
+                .order_by(*series, bucket, DividendSample.block_number.desc())
+            )
+        else:
+            reduce = func.avg if aggregate == "avg" else func.max
+            query = (
+                select(
+                    bucket,
+                    *series,
+                    func.max(DividendSample.block_number),
+                    reduce(DividendSample.dividend),
+                )
+                .group_by(*series, bucket)
+                .order_by(*series, bucket)
+            )
+
+    result = await db.execute(query.where(*clauses).limit(limit))
+    return [
+        {
+            "time": time,
+            "netuid": netuid,
+            "hotkey": hotkey,
+            "block_number": block_number,
+            "dividend": int(round(dividend)),
+        }
+        for time, netuid, hotkey, block_number, dividend in result.all()
+    ]
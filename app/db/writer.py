@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import insert
+
+from app.config import settings
+from app.db.models import STATUS_INCLUDED, StakeAdjustment, engine
+from app.db.service import add_to_hourly_totals
+from app.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Values of the optional columns, so every buffered row has the same keys: a
+# multi-row INSERT takes its column list from the first row.
+OPTIONAL_COLUMNS = {
+    "error": None,
+    "status": STATUS_INCLUDED,
+    "extrinsic_hash": None,
+    "block_hash": None,
+}
+
+
+class StakeAdjustmentWriter:
+    """
+    Buffer StakeAdjustment rows and insert them in bulk.
+
+    Rows are written with one multi-row INSERT, in a single transaction and
+    without reading them back, once `max_rows` are buffered or `flush_interval`
+    seconds after the first buffered row. A failed flush keeps its rows and is
+    retried every interval. Call `close` on shutdown to write what is left.
+
+    Rows are timestamped when buffered rather than when written, and with
+    `stake_rollup_enabled` the hourly totals are updated in the same transaction.
+    """
+
+    def __init__(self, max_rows: int, flush_interval: float):
+        self.max_rows = max_rows
+        self.flush_interval = flush_interval
+        self._rows: List[dict] = []
+        self._timer: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._rows)
+
+    async def add(self, **row) -> None:
+        """Buffer one adjustment, given as StakeAdjustment column values."""
+        await self.add_many([row])
+
+    async def add_many(self, rows: List[dict]) -> None:
+        """Buffer several adjustments, flushing now if the buffer is full."""
+        now = datetime.utcnow()
+        self._rows.extend(
+            {**OPTIONAL_COLUMNS, "created_at": now, **row} for row in rows
+        )
+        if len(self._rows) >= self.max_rows:
+            try:
+                await self.flush()
+            except Exception:
+                pass  # Logged by flush; the timer retries the rows it kept.
+        if self._rows and (self._timer is None or self._timer.done()):
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def flush(self) -> int:
+        """Insert every buffered row, returning how many were written."""
+        rows, self._rows = self._rows, []
+        if not rows:
+            return 0
+        try:
+            with timed("db_write_stake_adjustments"):
+                async with engine.begin() as conn:
+                    await conn.execute(insert(StakeAdjustment), rows)
+                    if settings.stake_rollup_enabled:
+                        await add_to_hourly_totals(conn, rows)
+        except Exception as e:
+            logger.error(f"Failed to write {len(rows)} stake adjustments: {e}")
+            self._rows[:0] = rows
+            raise
+        logger.debug(f"Wrote {len(rows)} stake adjustments")
+        return len(rows)
+
+    async def close(self) -> None:
+        """Stop the flush timer and write the remaining rows."""
+        if self._timer is not None:
+            self._timer.cancel()
+            try:
+                await self._timer
+            except asyncio.CancelledError:
+                pass
+            self._timer = None
+        await self.flush()
+
+    async def _flush_later(self) -> None:
+        while self._rows:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                pass  # Logged by flush; retried after another interval.
+
+
+stake_writer = StakeAdjustmentWriter(
+    max_rows=settings.db_write_batch_size,
+    flush_interval=settings.db_flush_interval,
+)
@@ -1,21 +1,41 @@
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Depends, Request
+from fastapi import FastAPI, Depends, Request, Response
 from fastapi.responses import JSONResponse
 
 from app.api.v1.routes import router as api_router
 from app.auth.auth import verify_token
 from app.cache.redis import redis_cache
+from app.config import settings
+from app.metrics import (
+    collect_request_timings,
+    format_server_timing,
+    render_metrics,
+    timed,
+)
+from app.services.chutes import chutes_client
+from app.services.datura import datura_client
+from app.services.substrate_pool import substrate_pool
 
 logger = logging.getLogger(__name__)
 
+SERVER_TIMING_REQUEST_HEADER = "X-Server-Timing"
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handles application startup and shutdown."""
-    await redis_cache.connect()
-    yield
+    try:
+        await redis_cache.connect()
+        await substrate_pool.start()
+        yield
+    finally:
+        # Also runs if startup failed, closing whatever was already opened.
+        await substrate_pool.close()
+        await redis_cache.close()
+        await chutes_client.close()
+        await datura_client.close()
 
 
 app = FastAPI(
@@ -31,6 +51,35 @@ app.include_router(
 )
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    """Prometheus scrape endpoint."""
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
+
+
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    """
+    Time each request and, if asked for, add a Server-Timing header per stage.
+
+    Only stages finished before the response starts are included, so streamed
+    responses report the time to their first chunk.
+    """
+    timings = None
+    if settings.server_timing_enabled and request.headers.get(
+        SERVER_TIMING_REQUEST_HEADER
+    ):
+        timings = collect_request_timings()
+
+    with timed("request"):
+        response = await call_next(request)
+
+    if timings is not None:
+        response.headers["Server-Timing"] = format_server_timing(timings)
+    return response
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler to catch unhandled errors."""
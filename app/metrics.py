@@ -0,0 +1,149 @@
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+STAGE_SECONDS = Histogram(
+    "tao_stage_duration_seconds",
+    "Time spent in each stage of serving dividends and trading.",
+    ["stage"],
+)
+CHAIN_REQUESTS = Counter(
+    "tao_chain_requests_total",
+    "Chain reads issued, by substrate method.",
+    ["method"],
+)
+HTTP_RETRIES = Counter(
+    "tao_http_retries_total",
+    "Retried requests to external APIs, by provider.",
+    ["provider"],
+)
+TRADE_TASKS = Counter(
+    "tao_trade_tasks_total",
+    "Trade task runs, by outcome.",
+    ["outcome"],
+)
+TRADE_TASK_SECONDS = Histogram(
+    "tao_trade_task_duration_seconds",
+    "Trade task duration, by outcome.",
+    ["outcome"],
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300),
+)
+
+# Per-request stage totals, set only while a request has asked for Server-Timing.
+_request_timings: ContextVar[Optional[dict[str, float]]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """
+    Observe the duration of a stage in the stage histogram.
+
+    If the current request collects Server-Timing, the duration is also added to
+    its total for the stage, so repeated or concurrent calls are summed.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] += elapsed
+
+
+@contextmanager
+def chain_request(method: str) -> Iterator[None]:
+    """Count a chain read and time it as the `chain_<method>` stage."""
+    CHAIN_REQUESTS.labels(method).inc()
+    with timed(f"chain_{method}"):
+        yield
+
+
+def collect_request_timings() -> dict[str, float]:
+    """Start collecting stage timings for the current request and return them."""
+    timings: dict[str, float] = defaultdict(float)
+    _request_timings.set(timings)
+    return timings
+
+
+def format_server_timing(timings: dict[str, float]) -> str:
+    """Render stage totals as a Server-Timing header value in milliseconds."""
+    return ", ".join(
+        f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()
+    )
+
+
+class CacheStatsCollector:
+    """Expose a `CacheStats` instance as Prometheus counters and gauges."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def collect(self):
+        hits = CounterMetricFamily(
+            "tao_cache_hits", "Cache hits, by layer.", labels=["layer"]
+        )
+        hits.add_metric(["l1"], self.stats.l1_hits)
+        hits.add_metric(["l2"], self.stats.l2_hits)
+        yield hits
+        for name, value, documentation in (
+            ("misses", self.stats.misses, "Lookups missing from both layers."),
+            ("evictions", self.stats.evictions, "L1 entries evicted by its caps."),
+            ("invalidations", self.stats.invalidations, "Invalidations applied."),
+            ("coalesced", self.stats.coalesced, "Loads served by another caller."),
+        ):
+            yield CounterMetricFamily(f"tao_cache_{name}", documentation, value)
+        yield GaugeMetricFamily(
+            "tao_cache_l1_entries", "Entries held in L1.", self.stats.l1_entries
+        )
+        yield GaugeMetricFamily(
+            "tao_cache_l1_bytes", "Bytes held in L1.", self.stats.l1_bytes
+        )
+
+
+def metrics_registry() -> CollectorRegistry:
+    """
+    Return the registry to expose.
+
+    When PROMETHEUS_MULTIPROC_DIR is set, as for prefork Celery workers, the values
+    written by every process in that directory are aggregated.
+    """
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """Render all metrics in the Prometheus text format."""
+    return generate_latest(metrics_registry()), CONTENT_TYPE_LATEST
+
+
+def start_metrics_server(port: int) -> None:
+    """Serve /metrics on `port` from a background thread, for non-HTTP processes."""
+    start_http_server(port, registry=metrics_registry())
+
+
+def mark_process_dead(pid: int) -> None:
+    """Drop a finished worker process's live gauges in multiprocess mode."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
@@ -1,32 +1,302 @@
-import asyncio
+import base64
+import binascii
 import json
 import logging
-from typing import Optional, List
+import re
+import time
+from contextlib import aclosing
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional, List, Tuple
 
 from async_substrate_interface.async_substrate import AsyncSubstrateInterface
 from bittensor import AsyncSubtensor
-from bittensor.core.settings import SS58_FORMAT
-from bittensor.utils.balance import Balance
 from bittensor_wallet import Wallet
 from scalecodec.utils import ss58
 
 from app.api.v1.schemas import TaoDividendResponse
-from app.cache.redis import redis_cache
-from app.db.models import async_session
-from app.db.service import save_stake_adjustment
+from app.cache.redis import redis_cache, BLOCK_CACHE_TTL, unwrap_with_age
+from app.cache.singleflight import coalesce, revalidate_in_background
+from app.config import settings
+from app.metrics import chain_request, timed
+from app.services.fanout import ordered_fanout
+from app.services.substrate_pool import substrate_pool
 
 logger = logging.getLogger(__name__)
 
+# state_getKeysPaged caps a page at 1000 keys, which covers a full subnet in one page.
+SUBNET_SCAN_PAGE_SIZE = 1000
+
+# Points at the block that "latest" reads are pinned to.
+LATEST_BLOCK_KEY = "dividends:latest_block"
+
+# Written by the indexer together with the subnet snapshots it describes.
+SNAPSHOT_KEY = "dividends:snapshot"
+BLOCK_TIME_SECONDS = 12
+
+# Tags each subnet hash with its block, so a subnet without dividends still exists.
+SUBNET_BLOCK_FIELD = "_block"
+
+BLOCK_HASH_PATTERN = re.compile(r"0x[0-9a-fA-F]{64}")
+
+
+def is_block_hash(value: object) -> bool:
+    """Check that a value is a 0x-prefixed 32-byte hex block hash."""
+    return isinstance(value, str) and BLOCK_HASH_PATTERN.fullmatch(value) is not None
+
+
+class BlockNotFound(Exception):
+    """Raised when a requested block number has no block on the chain yet."""
+
+
+class SubnetTimeout(Exception):
+    """Raised when a subnet read times out and the caller needs every subnet."""
+
+    def __init__(self, netuid: int):
+        super().__init__(
+            f"Timed out reading netuid {netuid} after {settings.subnet_timeout}s"
+        )
+        self.netuid = netuid
+
+
+@dataclass
+class BlockRef:
+    """The block a request reads at and how old that choice of block is."""
+
+    block_hash: str
+    block_number: Optional[int] = None
+    age_seconds: Optional[float] = None
+
+
+@dataclass
+class DividendCursor:
+    """Position in a paginated dividends listing, pinned to one block."""
+
+    block_hash: str
+    block_number: Optional[int]
+    netuid: int
+    hotkey: str
+
+    def encode(self) -> str:
+        """Encode the cursor as an opaque URL-safe token."""
+        payload = json.dumps(
+            [self.block_hash, self.block_number, self.netuid, self.hotkey]
+        )
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    @classmethod
+    def decode(cls, token: str) -> "DividendCursor":
+        """Decode a token produced by `encode`, raising ValueError if it is invalid."""
+        try:
+            block_hash, block_number, netuid, hotkey = json.loads(
+                base64.urlsafe_b64decode(token.encode())
+            )
+        except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+            raise ValueError("Invalid cursor")
+        if not (
+            is_block_hash(block_hash)
+            and (block_number is None or type(block_number) is int)
+            and type(netuid) is int
+            and isinstance(hotkey, str)
+        ):
+            raise ValueError("Invalid cursor")
+        return cls(block_hash, block_number, netuid, hotkey)
+
+
+def subnet_cache_key(block_hash: str, netuid: int) -> str:
+    """Build the Redis key for the hash of a subnet's dividends at a given block."""
+    return f"dividends:{block_hash}:{netuid}"
+
+
+def encode_subnet(block_hash: str, pairs: List[Tuple[str, int]]) -> dict[str, str]:
+    """Encode a subnet's (hotkey, dividend) pairs as the fields of its Redis hash."""
+    fields = {hotkey: str(dividend) for hotkey, dividend in pairs}
+    fields[SUBNET_BLOCK_FIELD] = block_hash
+    return fields
+
+
+def decode_subnet(fields: dict[str, str]) -> List[Tuple[str, int]]:
+    """Decode a subnet hash written by `encode_subnet` into (hotkey, dividend) pairs."""
+    return [
+        (hotkey, int(dividend))
+        for hotkey, dividend in fields.items()
+        if hotkey != SUBNET_BLOCK_FIELD
+    ]
+
+
+def netuids_cache_key(block_hash: str) -> str:
+    """Build the Redis key for the list of subnets that exist at a given block."""
+    return f"dividends:{block_hash}:netuids"
+
+
+async def get_fresh_snapshot() -> Optional[dict]:
+    """
+    Return the indexer's snapshot pointer if it is recent enough to serve from.
+
+    The lag is estimated from the time the snapshot was written, so checking
+    freshness never touches the chain.
+    """
+    cached = await redis_cache.get(SNAPSHOT_KEY)
+    if not cached:
+        return None
+
+    snapshot = json.loads(cached)
+    lag_blocks = (time.time() - snapshot["indexed_at"]) / BLOCK_TIME_SECONDS
+    if lag_blocks > settings.snapshot_max_lag_blocks:
+        logger.info(
+            f"Snapshot at block {snapshot['block_number']} is ~{lag_blocks:.0f} "
+            "blocks old. Falling back to chain."
+        )
+        return None
+    return snapshot
+
+
+async def get_snapshot_subnets(
+    snapshot: dict, netuids: List[int]
+) -> Optional[List[dict[str, str]]]:
+    """
+    Read the snapshot entries for `netuids` in one round-trip.
+
+    Returns None if any requested subnet is missing from the snapshot, so the
+    caller can fall back to the chain.
+    """
+    subnets = await redis_cache.get_hashes(
+        [subnet_cache_key(snapshot["block_hash"], uid) for uid in netuids]
+    )
+    if None in subnets:
+        return None
+    return subnets
+
+
+def snapshot_subnet_rows(
+    snapshot: dict, netuid: int, cached: dict[str, str], hotkey: Optional[str] = None
+) -> List[TaoDividendResponse]:
+    """Build the response rows for one subnet's snapshot entry."""
+    dividends = dict(decode_subnet(cached))
+    if hotkey:
+        dividends = {hotkey: dividends.get(hotkey, 0)}
+    age_seconds = time.time() - snapshot["indexed_at"]
+    return [
+        TaoDividendResponse(
+            netuid=netuid,
+            hotkey=h,
+            dividend=dividend,
+            cached=True,
+            stake_tx_triggered=False,
+            block_number=snapshot["block_number"],
+            block_hash=snapshot["block_hash"],
+            age_seconds=age_seconds,
+        )
+        for h, dividend in dividends.items()
+    ]
+
+
+async def resolve_block(
+    block_hash: Optional[str] = None,
+    block_number: Optional[int] = None,
+    substrate: Optional[AsyncSubstrateInterface] = None,
+) -> BlockRef:
+    """
+    Resolve the block a request reads at.
+
+    An explicit block hash wins (a block number passed alongside it is taken as
+    its number), then a block number. Otherwise the request is pinned
+    to the cached "latest" block. Once that pointer is older than the soft TTL it is
+    still served, and a background refresh from the chain head is scheduled. Only
+    once it passes the hard TTL and expires does the caller wait for the chain.
+
+    Args:
+        block_hash (Optional[str]): Explicit block hash requested by the caller.
+        block_number (Optional[int]): Explicit block number requested by the caller.
+        substrate (Optional[AsyncSubstrateInterface]): Connection to use if the chain
+            has to be asked. Borrowed from the pool when omitted.
+
+    Returns:
+        BlockRef: The block every read of the request should use.
+
+    Raises:
+        BlockNotFound: If `block_number` is past the chain head.
+    """
+    if block_hash:
+        return BlockRef(block_hash, block_number)
+
+    if block_number is not None:
+        if substrate is None:
+            async with substrate_pool.connection() as subtensor:
+                with chain_request("get_block_hash"):
+                    block_hash = await subtensor.substrate.get_block_hash(block_number)
+        else:
+            with chain_request("get_block_hash"):
+                block_hash = await substrate.get_block_hash(block_number)
+        if block_hash is None:
+            raise BlockNotFound(f"Block {block_number} not found")
+        return BlockRef(block_hash, block_number)
+
+    cached = await redis_cache.get(LATEST_BLOCK_KEY)
+    if cached:
+        latest = _latest_block_ref(cached)
+        if latest.age_seconds > settings.latest_block_soft_ttl:
+            revalidate_in_background(LATEST_BLOCK_KEY, refresh_latest_block)
+        return latest
+
+    cached = await coalesce(LATEST_BLOCK_KEY, lambda: refresh_latest_block(substrate))
+    return _latest_block_ref(cached)
+
+
+def _latest_block_ref(cached: str) -> BlockRef:
+    value, age_seconds = unwrap_with_age(cached)
+    latest = json.loads(value)
+    return BlockRef(latest["block_hash"], latest["block_number"], age_seconds)
+
+
+async def refresh_latest_block(
+    substrate: Optional[AsyncSubstrateInterface] = None,
+) -> str:
+    """Fetch the chain head and store it as the "latest" block pointer."""
+    if substrate is None:
+        async with substrate_pool.connection() as subtensor:
+            return await refresh_latest_block(subtensor.substrate)
+
+    with chain_request("get_chain_head"):
+        head = await substrate.get_chain_head()
+    with chain_request("get_block_number"):
+        block_number = await substrate.get_block_number(head)
+    cached = await redis_cache.set_with_age(
+        LATEST_BLOCK_KEY,
+        json.dumps({"block_hash": head, "block_number": block_number}),
+        ttl=settings.latest_block_hard_ttl,
+    )
+    await redis_cache.invalidate([LATEST_BLOCK_KEY])
+    return cached
+
+
+# Unlocked wallets by hotkey, with the monotonic time each one expires at.
+_wallets: dict[str, tuple[Wallet, float]] = {}
+
 
 async def get_wallet(hotkey: str) -> Wallet:
-    """Get wallet by hotkey."""
+    """
+    Get wallet by hotkey, with both keys unlocked.
+
+    The coldkey signs stake extrinsics, so it is unlocked here rather than at
+    signing time. Unlocked wallets are kept for `wallet_cache_ttl` seconds, so a
+    long-lived worker does not load and decrypt the keys again for every trade.
+    """
+    now = time.monotonic()
+    cached = _wallets.get(hotkey)
+    if cached is not None and cached[1] > now:
+        return cached[0]
+
     logger.debug(f"Loading wallet for hotkey: {hotkey}")
     wallet = Wallet(
         name="bittensor_test_wallet_",
         path="~/.bittensor_wallet",
         hotkey=hotkey,
     )
+    wallet.unlock_coldkey()
     wallet.unlock_hotkey()
+    for expired in [key for key, (_, expires) in _wallets.items() if expires <= now]:
+        del _wallets[expired]
+    _wallets[hotkey] = (wallet, now + settings.wallet_cache_ttl)
     return wallet
 
 
@@ -36,33 +306,33 @@ async def process_single_query(
     hotkey: str,
     trade: bool,
     substrate: Optional[AsyncSubstrateInterface] = None,
+    block: Optional[BlockRef] = None,
 ) -> TaoDividendResponse:
-    """Process query for netuid, hotkey."""
-    cache_key = f"dividends:{netuid}:{hotkey}"
-    cached = await redis_cache.get(cache_key)
+    """Process query for netuid, hotkey at a block (the latest block by default)."""
+    if block is None:
+        block = await resolve_block(substrate=substrate)
+    block_hash = block.block_hash
 
-    if cached:
+    cached, tag = await redis_cache.get_fields(
+        subnet_cache_key(block_hash, netuid), [hotkey, SUBNET_BLOCK_FIELD]
+    )
+
+    if tag is not None:
         logger.info(f"Cache hit for netuid {netuid}, hotkey {hotkey}")
         return TaoDividendResponse(
             netuid=netuid,
             hotkey=hotkey,
-            dividend=json.loads(cached),
+            dividend=int(cached or 0),
             cached=True,
             stake_tx_triggered=False,
+            block_number=block.block_number,
+            block_hash=block.block_hash,
+            age_seconds=block.age_seconds,
         )
 
-    logger.info(
-        f"Cache miss for netuid {netuid}, hotkey {hotkey}. Fetching from chain..."
-    )
-    if substrate is None:
-        async with AsyncSubstrateInterface(
-            url="wss://entrypoint-finney.opentensor.ai:443", ss58_format=SS58_FORMAT
-        ) as substrate:
-            dividend = await get_tao_dividend_for_hotkey(netuid, hotkey, substrate)
-    else:
-        dividend = await get_tao_dividend_for_hotkey(netuid, hotkey, substrate)
-
-    await redis_cache.set(cache_key, json.dumps(dividend))
+    logger.info(f"Cache miss for netuid {netuid}, hotkey {hotkey}. Scanning subnet...")
+    pairs = await load_subnet_dividends(block_hash, netuid, substrate)
+    dividend = dict(pairs).get(hotkey, 0)
 
     return TaoDividendResponse(
         netuid=netuid,
@@ -70,149 +340,331 @@ async def process_single_query(
         dividend=dividend,
         cached=False,
         stake_tx_triggered=trade,
+        block_number=block.block_number,
+        block_hash=block.block_hash,
+        age_seconds=block.age_seconds,
     )
 
 
-async def get_tao_dividend_for_hotkey(
-    netuid: int, hotkey: str, substrate: AsyncSubstrateInterface
-) -> int:
-    """Get tao dividend for hotkey."""
-    block_hash = await substrate.get_chain_head()
-    result = await substrate.query(
-        module="SubtensorModule",
-        storage_function="TaoDividendsPerSubnet",
-        params=[netuid, hotkey],
-        block_hash=block_hash,
-    )
-    return result.value if result else 0
-
-
-async def get_hotkeys_for_netuid(
-    netuid: int, substrate: AsyncSubstrateInterface
-) -> List[str]:
-    """Get hotkey for netuid."""
-    head = await substrate.get_chain_head()
-    query_result = await substrate.query_map(
-        module="SubtensorModule",
-        storage_function="TaoDividendsPerSubnet",
-        params=[netuid],
-        block_hash=head,
+async def get_subnet_dividends(
+    netuid: int,
+    substrate: AsyncSubstrateInterface,
+    block_hash: Optional[str] = None,
+) -> List[Tuple[str, int]]:
+    """
+    Scan TaoDividendsPerSubnet for a subnet and return (hotkey, dividend) pairs.
+
+    All pairs are read from a single block, so the result is a consistent snapshot
+    of the subnet obtained with one paged map scan instead of a query per hotkey.
+
+    Args:
+        netuid (int): The subnet ID.
+        substrate (AsyncSubstrateInterface): Connected substrate interface.
+        block_hash (Optional[str]): Block to read at. Defaults to the chain head.
+
+    Returns:
+        List[Tuple[str, int]]: SS58 hotkeys paired with their raw dividend.
+    """
+    if block_hash is None:
+        with chain_request("get_chain_head"):
+            block_hash = await substrate.get_chain_head()
+
+    with chain_request("query_map"):
+        query_result = await substrate.query_map(
+            module="SubtensorModule",
+            storage_function="TaoDividendsPerSubnet",
+            params=[netuid],
+            block_hash=block_hash,
+            page_size=SUBNET_SCAN_PAGE_SIZE,
+        )
+        records = [record async for record in query_result]
+
+    with timed("ss58_encode"):
+        pairs = [
+            (
+                ss58.ss58_encode(bytes(key[0])),
+                getattr(value, "value", value) or 0,
+            )
+            for key, value in records
+        ]
+
+    logger.info(f"Found {len(pairs)} hotkeys for netuid {netuid}")
+    return pairs
+
+
+async def cache_subnet_dividends(
+    block_hash: str, netuid: int, pairs: List[Tuple[str, int]]
+) -> None:
+    """
+    Write a subnet's (hotkey, dividend) pairs at a block to the cache as one hash.
+
+    Single-hotkey reads take one field of it and subnet-wide reads the whole hash,
+    so either is one round-trip.
+    """
+    await redis_cache.set_many(
+        {},
+        ttl=BLOCK_CACHE_TTL,
+        hashes={subnet_cache_key(block_hash, netuid): encode_subnet(block_hash, pairs)},
     )
 
-    hotkeys = []
-    async for key, _ in query_result:
-        account_id = bytes(key[0])
-        hotkey = ss58.ss58_encode(account_id)
-        hotkeys.append(hotkey)
 
-    logger.info(f"Found {len(hotkeys)} hotkeys for netuid {netuid}")
-    return hotkeys
+async def load_subnet_dividends(
+    block_hash: str,
+    netuid: int,
+    substrate: Optional[AsyncSubstrateInterface] = None,
+) -> List[Tuple[str, int]]:
+    """
+    Scan a subnet at a block and cache it, coalescing concurrent scans of it.
 
+    Borrows a pooled connection for the scan if `substrate` is not given.
+    """
 
-async def get_all_netuids() -> List[int]:
-    """Get all netuids."""
-    subtensor = AsyncSubtensor()
-    results = await subtensor.all_subnets()
-    netuids = [res.netuid for res in results]
-    logger.info(f"Found netuids: {netuids}")
-    return netuids
+    async def scan() -> dict[str, str]:
+        if substrate is None:
+            async with substrate_pool.connection() as subtensor:
+                async with substrate_pool.rpc_slot():
+                    pairs = await get_subnet_dividends(
+                        netuid, subtensor.substrate, block_hash
+                    )
+        else:
+            async with substrate_pool.rpc_slot():
+                pairs = await get_subnet_dividends(netuid, substrate, block_hash)
+        await cache_subnet_dividends(block_hash, netuid, pairs)
+        return encode_subnet(block_hash, pairs)
+
+    cached = await coalesce(
+        subnet_cache_key(block_hash, netuid),
+        scan,
+        is_hash=True,
+        load_timeout=settings.substrate_pool_timeout + settings.subnet_timeout,
+    )
+    return decode_subnet(cached)
 
 
-async def get_dividends(
-    netuid: Optional[int], hotkey: Optional[str], trade: bool
-) -> List[TaoDividendResponse]:
-    """Get dividends for netuid."""
-    results: List[TaoDividendResponse] = []
+async def load_netuids(block_hash: str) -> List[int]:
+    """
+    Get all netuids at a block, caching the list since it cannot change.
 
-    if netuid and hotkey:
-        result = await process_single_query(netuid, hotkey, trade)
-        return [result]
+    A pooled connection is only borrowed if the list is not cached yet.
+    """
+    cached = await redis_cache.get(netuids_cache_key(block_hash))
+    if cached:
+        return json.loads(cached)
+
+    async with substrate_pool.connection() as subtensor:
+        netuids = await get_all_netuids(subtensor, block_hash)
+    await redis_cache.set(
+        netuids_cache_key(block_hash), json.dumps(netuids), ttl=BLOCK_CACHE_TTL
+    )
+    return netuids
 
-    async with AsyncSubstrateInterface(
-        url="wss://entrypoint-finney.opentensor.ai:443", ss58_format=SS58_FORMAT
-    ) as substrate:
-        if netuid:
-            hotkeys = await get_hotkeys_for_netuid(netuid, substrate)
-            tasks = [process_single_query(netuid, h, trade, substrate) for h in hotkeys]
-            results = await asyncio.gather(*tasks)
-            return results
 
-        netuids = await get_all_netuids()
-        for uid in netuids:
-            hotkeys = await get_hotkeys_for_netuid(uid, substrate)
-            tasks = [process_single_query(uid, h, trade, substrate) for h in hotkeys]
-            results.extend(await asyncio.gather(*tasks))
+async def get_all_netuids(
+    subtensor: AsyncSubtensor, block_hash: Optional[str] = None
+) -> List[int]:
+    """
+    Get all netuids at a block (the chain head by default).
 
-        return results
+    Reads the NetworksAdded map rather than the subnet dynamic info, which also
+    carries pricing and pool state the listing does not need.
+    """
+    with chain_request("get_subnets"):
+        netuids = await subtensor.get_subnets(block_hash=block_hash)
+    logger.info(f"Found netuids: {netuids}")
+    return netuids
 
 
-# Submit staking adjustment
-async def submit_stake_adjustment(netuid: int, hotkey: str, sentiment: int) -> None:
+async def iter_dividends(
+    netuid: Optional[int],
+    hotkey: Optional[str],
+    trade: bool,
+    block_hash: Optional[str] = None,
+    block_number: Optional[int] = None,
+    start_netuid: Optional[int] = None,
+    missing: Optional[List[int]] = None,
+) -> AsyncIterator[List[TaoDividendResponse]]:
     """
-    Submit a stake or unstake extrinsic based on the sentiment score.
+    Yield dividends one subnet at a time, as soon as each subnet is ready.
+
+    The block is resolved once per call, so every row is read at the same block:
+    the requested block hash or number, or the latest block. Latest-block queries
+    are served from the indexer snapshot while it is fresh. Only one subnet's rows
+    are built at a time, so callers that stream them keep memory bounded.
+    Subnets missing from the cache are read from the chain a few at a time ahead
+    of the consumer. One that times out raises SubnetTimeout, or, if a `missing`
+    list is given, is appended to it and left out instead of failing the whole
+    response. When listing every subnet, `start_netuid` skips the subnets before it.
+    Pooled connections are only borrowed around chain reads, never across a yield,
+    so a slow consumer does not hold one for the rest of its stream.
     """
-    if sentiment == 0:
-        logger.info(f"Neutral sentiment (0) for {hotkey}. No stake adjustment.")
-        return
+    if not block_hash and block_number is None:
+        snapshot = await get_fresh_snapshot()
+        # A partial snapshot only covers the watched subnets, so cannot list all.
+        if snapshot and (netuid or not snapshot.get("partial")):
+            netuids = [netuid] if netuid else snapshot["netuids"]
+            netuids = [uid for uid in netuids if uid >= (start_netuid or 0)]
+            subnets = await get_snapshot_subnets(snapshot, netuids)
+            if subnets is not None:
+                single_hotkey = hotkey if netuid else None
+                for uid, cached in zip(netuids, subnets):
+                    yield snapshot_subnet_rows(snapshot, uid, cached, single_hotkey)
+                return
 
-    rao_amount = abs(int(sentiment * 0.01 * 1e9))  # Convert to rao (TAO * 1e9)
-    if rao_amount <= 0:
-        logger.warning(f"Skipping adjustment: Computed rao amount is zero.")
+    block = await resolve_block(block_hash, block_number)
+    if netuid and hotkey:
+        yield [await process_single_query(netuid, hotkey, trade, block=block)]
         return
 
-    amount = Balance.from_rao(rao_amount).set_unit(netuid)
-    wallet = await get_wallet(hotkey)
-    subtensor = AsyncSubtensor()
+    block_hash = block.block_hash
+    netuids = [netuid] if netuid else await load_netuids(block_hash)
+    netuids = [uid for uid in netuids if uid >= (start_netuid or 0)]
 
-    try:
-        if sentiment > 0:
-            logger.info(
-                f"Submitting stake: {amount.tao:.6f} TAO for {hotkey} on netuid {netuid}"
-            )
-            result = await subtensor.add_stake(
-                wallet=wallet,
-                netuid=netuid,
-                hotkey_ss58=hotkey,
-                amount=amount,
-                wait_for_inclusion=True,
-            )
-            action_type = "stake"
-        else:
-            logger.info(
-                f"Submitting unstake: {amount.tao:.6f} TAO for {hotkey} on netuid {netuid}"
-            )
-            stake_info = await subtensor.get_stake_for_hotkey(
-                hotkey_ss58=hotkey, netuid=netuid
-            )
+    cached_subnets = await redis_cache.get_hashes(
+        [subnet_cache_key(block_hash, uid) for uid in netuids]
+    )
+
+    cached_by_netuid = dict(zip(netuids, cached_subnets))
+
+    async def load(uid: int) -> List[Tuple[str, int]]:
+        cached = cached_by_netuid[uid]
+        if cached is not None:
+            return decode_subnet(cached)
+        return await load_subnet_dividends(block_hash, uid)
 
-            if stake_info.tao == 0:
+    subnets = ordered_fanout(
+        netuids, load, settings.subnet_concurrency, settings.subnet_timeout
+    )
+    async with aclosing(subnets):
+        async for uid, pairs in subnets:
+            if pairs is None:
+                if missing is None:
+                    raise SubnetTimeout(uid)
                 logger.warning(
-                    f"No stake to unstake for hotkey {hotkey} on netuid {netuid}. Skipping."
+                    f"Timed out reading netuid {uid} after "
+                    f"{settings.subnet_timeout}s; leaving it out of the response"
                 )
-                return
+                missing.append(uid)
+                continue
+            cached = cached_by_netuid[uid]
+            yield [
+                TaoDividendResponse(
+                    netuid=uid,
+                    hotkey=h,
+                    dividend=dividend,
+                    cached=cached is not None,
+                    stake_tx_triggered=trade and cached is None,
+                    block_number=block.block_number,
+                    block_hash=block.block_hash,
+                    age_seconds=block.age_seconds,
+                )
+                for h, dividend in pairs
+            ]
 
-            unstake_amount = min(amount, stake_info)
-            result = await subtensor.unstake(
-                wallet=wallet,
-                netuid=netuid,
-                hotkey_ss58=hotkey,
-                amount=unstake_amount,
-                wait_for_inclusion=True,
-            )
-            action_type = "unstake"
-
-        logger.info(f"{action_type.capitalize()} result for {hotkey}: {result}")
-        async with async_session() as db:
-            await save_stake_adjustment(
-                db=db,
-                netuid=netuid,
-                hotkey=hotkey,
-                sentiment_score=sentiment,
-                action=action_type,
-                amount_tao=amount.tao,
+
+async def get_dividends(
+    netuid: Optional[int],
+    hotkey: Optional[str],
+    trade: bool,
+    block_hash: Optional[str] = None,
+    block_number: Optional[int] = None,
+    missing: Optional[List[int]] = None,
+) -> List[TaoDividendResponse]:
+    """Get dividends for netuid, collecting every subnet from `iter_dividends`."""
+    results: List[TaoDividendResponse] = []
+    subnets = iter_dividends(
+        netuid, hotkey, trade, block_hash, block_number, missing=missing
+    )
+    async for rows in subnets:
+        results.extend(rows)
+    return results
+
+
+async def resolve_read_block(
+    block_hash: Optional[str] = None, block_number: Optional[int] = None
+) -> BlockRef:
+    """Resolve the block a query reads at, preferring a fresh indexer snapshot."""
+    if not block_hash and block_number is None:
+        snapshot = await get_fresh_snapshot()
+        if snapshot:
+            return BlockRef(
+                snapshot["block_hash"],
+                snapshot["block_number"],
+                time.time() - snapshot["indexed_at"],
             )
+    return await resolve_block(block_hash, block_number)
+
 
-    except Exception as e:
-        logger.exception(
-            f"Error during stake adjustment for {hotkey} on netuid {netuid}: {str(e)}"
+async def get_dividends_page(
+    netuid: Optional[int],
+    hotkey: Optional[str],
+    trade: bool,
+    limit: int,
+    cursor: Optional[DividendCursor] = None,
+    block_hash: Optional[str] = None,
+    block_number: Optional[int] = None,
+) -> Tuple[List[TaoDividendResponse], Optional[DividendCursor]]:
+    """
+    Get one page of dividends and the cursor for the next page.
+
+    The first page pins the block and every later page reads at that same block.
+    Clients can therefore walk the whole network consistently and retry any page.
+    Within a subnet rows are ordered by hotkey. A page never skips a subnet that
+    timed out: it ends before that subnet, so the next page reads it again.
+
+    Args:
+        netuid (Optional[int]): Subnet to list, or None for every subnet.
+        hotkey (Optional[str]): Hotkey to fetch, together with `netuid`.
+        trade (bool): Whether a trade was requested.
+        limit (int): Maximum number of rows in the page.
+        cursor (Optional[DividendCursor]): Cursor returned with the previous page.
+        block_hash (Optional[str]): Block to pin the first page to.
+        block_number (Optional[int]): Block number to pin the first page to.
+
+    Returns:
+        Tuple[List[TaoDividendResponse], Optional[DividendCursor]]: The page rows
+        and the cursor for the next page, or None after the last page.
+
+    Raises:
+        SubnetTimeout: If the first subnet of the page times out.
+    """
+    if cursor is not None:
+        block = BlockRef(cursor.block_hash, cursor.block_number)
+    else:
+        block = await resolve_read_block(block_hash, block_number)
+
+    rows: List[TaoDividendResponse] = []
+    subnets = iter_dividends(
+        netuid,
+        hotkey,
+        trade,
+        block.block_hash,
+        block.block_number,
+        start_netuid=cursor.netuid if cursor else None,
+    )
+    try:
+        async with aclosing(subnets):
+            async for subnet_rows in subnets:
+                # Cached and scanned subnets come back in different orders, so pages
+                # walk each subnet in hotkey order and resume after the cursor's hotkey.
+                subnet_rows = sorted(subnet_rows, key=lambda row: row.hotkey)
+                if cursor is not None and subnet_rows[:1]:
+                    if subnet_rows[0].netuid == cursor.netuid:
+                        subnet_rows = [
+                            row for row in subnet_rows if row.hotkey > cursor.hotkey
+                        ]
+
+                for row in subnet_rows:
+                    rows.append(row)
+                    if len(rows) == limit:
+                        return rows, DividendCursor(
+                            block.block_hash, block.block_number, row.netuid, row.hotkey
+                        )
+    except SubnetTimeout:
+        if not rows:
+            raise
+        last = rows[-1]
+        return rows, DividendCursor(
+            block.block_hash, block.block_number, last.netuid, last.hotkey
         )
+
+    return rows, None
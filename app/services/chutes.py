@@ -2,12 +2,16 @@ import re
 import logging
 from typing import List
 
-import httpx
-
 from app.config import settings
+from app.metrics import timed
+from app.services.http_client import ProviderClient
 
 logger = logging.getLogger(__name__)
 
+chutes_client = ProviderClient(
+    "chutes", "https://llm.chutes.ai", rate_limit=settings.chutes_rate_limit
+)
+
 
 def extract_sentiment_score(text: str) -> int:
     """
@@ -31,7 +35,7 @@ def extract_sentiment_score(text: str) -> int:
     return 0
 
 
-async def query_chutes_sentiment(tweets: List[str]) -> int:
+async def request_chutes_sentiment(tweets: List[str]) -> int:
     """
     Sends a batch of tweets to Chutes.ai's LLaMA model to compute overall sentiment.
 
@@ -40,6 +44,9 @@ async def query_chutes_sentiment(tweets: List[str]) -> int:
 
     Returns:
         int: Calculated sentiment score in the range [-100, 100].
+
+    Raises:
+        httpx.HTTPError: If Chutes cannot be reached or returns an error.
     """
     prompt = (
         "Analyze the sentiment of the following tweets about a subnet in the Bittensor network. "
@@ -61,27 +68,14 @@ async def query_chutes_sentiment(tweets: List[str]) -> int:
         "temperature": 0.7,
     }
 
-    try:
-        async with httpx.AsyncClient(timeout=15) as client:
-            response = await client.post(
-                "https://llm.chutes.ai/v1/chat/completions",
-                headers=headers,
-                json=payload,
-            )
-            response.raise_for_status()
-            data = await response.json()
-
-        content = data["choices"][0]["message"]["content"]
-        sentiment_score = extract_sentiment_score(content)
-        logger.info(f"✅ Extracted sentiment score: {sentiment_score}")
-        return sentiment_score
-
-    except httpx.HTTPStatusError as http_err:
-        logger.error(
-            f"HTTP error from Chutes API: {http_err.response.status_code} {http_err.response.text}",
-            exc_info=True,
+    with timed("chutes_request"):
+        response = await chutes_client.post(
+            "/v1/chat/completions", headers=headers, json=payload
         )
-    except Exception as e:
-        logger.error(f"Unexpected error querying Chutes sentiment: {e}", exc_info=True)
+        response.raise_for_status()
+        data = response.json()
 
-    return 0
+    content = data["choices"][0]["message"]["content"]
+    sentiment_score = extract_sentiment_score(content)
+    logger.info(f"✅ Extracted sentiment score: {sentiment_score}")
+    return sentiment_score
@@ -1,17 +1,22 @@
 from datetime import date
 from typing import List
 
-import httpx
 import logging
 
 from app.config import settings
+from app.metrics import timed
+from app.services.http_client import ProviderClient
 
 logger = logging.getLogger(__name__)
 
-DATURA_API_URL = "https://apis.datura.ai/twitter"
+DATURA_API_URL = "https://apis.datura.ai"
 
+datura_client = ProviderClient(
+    "datura", DATURA_API_URL, rate_limit=settings.datura_rate_limit
+)
 
-async def search_twitter_subnet_mentions(
+
+async def fetch_twitter_subnet_mentions(
     netuid: int,
     start_date: date,
     end_date: date,
@@ -28,6 +33,9 @@ async def search_twitter_subnet_mentions(
 
     Returns:
         List[dict]: A list of tweet objects from the Datura.ai API.
+
+    Raises:
+        httpx.HTTPError: If Datura cannot be reached or returns an error.
     """
     query = f"Bittensor netuid {netuid}"
     date_format = "%Y-%m-%d"
@@ -53,20 +61,9 @@ async def search_twitter_subnet_mentions(
         "Content-Type": "application/json",
     }
 
-    try:
-        async with httpx.AsyncClient(timeout=15) as client:
-            response = await client.get(DATURA_API_URL, params=params, headers=headers)
-            response.raise_for_status()
-            tweets = response.json()
-            logger.info(f"Retrieved {len(tweets)} tweets for netuid {netuid}.")
-            return tweets
-
-    except httpx.HTTPStatusError as http_err:
-        logger.error(
-            f"Datura API HTTP error: {http_err.response.status_code} {http_err.response.text}"
-        )
-        return []
-
-    except Exception as e:
-        logger.error(f"Unexpected error when querying Datura API: {e}", exc_info=True)
-        return []
+    with timed("datura_request"):
+        response = await datura_client.get("/twitter", params=params, headers=headers)
+        response.raise_for_status()
+        tweets = response.json()
+    logger.info(f"Retrieved {len(tweets)} tweets for netuid {netuid}.")
+    return tweets
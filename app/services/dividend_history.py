@@ -0,0 +1,83 @@
+import logging
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from async_substrate_interface.async_substrate import AsyncSubstrateInterface
+from sqlalchemy import insert
+
+from app.cache.redis import redis_cache
+from app.config import settings
+from app.db.models import DividendSample, engine
+from app.metrics import chain_request, timed
+from app.services.bittensor import BLOCK_TIME_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+def history_window_lock(block_number: int) -> str:
+    """Name of the lock held once a snapshot is recorded for a block's window."""
+    return f"dividends:history:{block_number // settings.dividend_history_interval}"
+
+
+async def block_timestamp(
+    substrate: AsyncSubstrateInterface, block_hash: str
+) -> datetime:
+    """Read the on-chain timestamp of a block as naive UTC."""
+    with chain_request("query"):
+        now = await substrate.query("Timestamp", "Now", block_hash=block_hash)
+    return datetime.utcfromtimestamp(now.value / 1000)
+
+
+async def record_dividend_history(
+    substrate: AsyncSubstrateInterface,
+    block_hash: str,
+    block_number: int,
+    subnets: Dict[int, List[Tuple[str, int]]],
+) -> bool:
+    """
+    Append an indexed snapshot to the dividend history, once per window.
+
+    The first block indexed in each `dividend_history_interval` window is
+    recorded, whichever indexer gets there first. If writing fails, the window
+    is released so the next indexed block tries again.
+
+    Args:
+        substrate (AsyncSubstrateInterface): Connection to read the block time with.
+        block_hash (str): The indexed block.
+        block_number (int): Its number.
+        subnets (Dict[int, List[Tuple[str, int]]]): (hotkey, dividend) pairs per netuid.
+
+    Returns:
+        bool: True if the snapshot was recorded.
+    """
+    if not settings.dividend_history_enabled:
+        return False
+    lock = history_window_lock(block_number)
+    ttl = 2 * settings.dividend_history_interval * BLOCK_TIME_SECONDS
+    token = await redis_cache.acquire_lock(lock, ttl)
+    if token is None:
+        return False
+
+    try:
+        recorded_at = await block_timestamp(substrate, block_hash)
+        rows = [
+            {
+                "block_number": block_number,
+                "recorded_at": recorded_at,
+                "netuid": netuid,
+                "hotkey": hotkey,
+                "dividend": dividend,
+            }
+            for netuid, pairs in subnets.items()
+            for hotkey, dividend in pairs
+        ]
+        if rows:
+            with timed("db_write_dividend_history"):
+                async with engine.begin() as conn:
+                    await conn.execute(insert(DividendSample), rows)
+    except Exception:
+        await redis_cache.release_lock(lock, token)
+        raise
+
+    logger.info(f"Recorded {len(rows)} dividends at block {block_number}")
+    return True
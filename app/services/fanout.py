@@ -0,0 +1,65 @@
+import asyncio
+from collections import deque
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+async def ordered_fanout(
+    items: Iterable[K],
+    load: Callable[[K], Awaitable[V]],
+    concurrency: int,
+    timeout: Optional[float] = None,
+) -> AsyncIterator[Tuple[K, Optional[V]]]:
+    """
+    Run `load` over `items` with bounded concurrency, yielding results in input order.
+
+    Up to `concurrency` loads run ahead of the consumer, so slow items overlap with
+    the processing of earlier ones instead of adding up. A load that exceeds
+    `timeout` seconds is yielded as None rather than failing the whole run.
+    Pending loads are cancelled, and waited for, if the consumer stops early.
+
+    Args:
+        items (Iterable[K]): Items to load, in the order results should be yielded.
+        load (Callable[[K], Awaitable[V]]): Coroutine function loading one item.
+        concurrency (int): Maximum number of loads in flight at once.
+        timeout (Optional[float]): Per-item timeout in seconds.
+
+    Yields:
+        Tuple[K, Optional[V]]: Each item with its result, or None if it timed out.
+    """
+    remaining = iter(items)
+    pending: deque = deque()
+
+    def launch_next() -> None:
+        for item in remaining:
+            task = asyncio.create_task(asyncio.wait_for(load(item), timeout))
+            pending.append((item, task))
+            return
+
+    try:
+        for _ in range(max(1, concurrency)):
+            launch_next()
+
+        while pending:
+            item, task = pending.popleft()
+            try:
+                result = await task
+            except asyncio.TimeoutError:
+                result = None
+            launch_next()
+            yield item, result
+    finally:
+        tasks = [task for _, task in pending]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,152 @@
+import asyncio
+import importlib.util
+import logging
+import random
+import time
+from typing import Optional
+
+import httpx
+
+from app.config import settings
+from app.metrics import HTTP_RETRIES
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class RateLimiter:
+    """
+    Client-side rate limiter allowing `rate` requests per second with bursts.
+
+    Implemented as GCRA: each call reserves the next free slot without awaiting
+    in between, so it needs no lock and works from any event loop.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.interval = 1 / rate
+        self.burst = burst
+        self._next_slot = 0.0
+
+    async def acquire(self) -> None:
+        now = time.monotonic()
+        slot = max(self._next_slot, now)
+        self._next_slot = slot + self.interval
+        wait = slot - now - (self.burst - 1) * self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class ProviderClient:
+    """
+    Long-lived HTTP client for one upstream API.
+
+    The underlying httpx client keeps connections alive between calls, speaks
+    HTTP/2 when the `h2` package is installed, and is created lazily so it binds
+    to the event loop that first uses it. Requests are rate limited, and 429/5xx
+    responses and transport errors are retried with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        rate_limit: float,
+        burst: int = 1,
+        timeout: float = settings.http_timeout,
+        max_retries: int = settings.http_max_retries,
+        backoff_base: float = settings.http_backoff_base,
+        backoff_max: float = settings.http_backoff_max,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.name = name
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = RateLimiter(rate_limit, burst)
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=settings.http_max_connections,
+                    max_keepalive_connections=settings.http_max_keepalive_connections,
+                    keepalive_expiry=settings.http_keepalive_expiry,
+                ),
+                transport=self._transport,
+            )
+        return self._client
+
+    @property
+    def max_request_time(self) -> float:
+        """Longest `request` takes if every attempt times out and backs off fully."""
+        return (
+            self.max_retries + 1
+        ) * self.timeout + self.max_retries * self.backoff_max
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a request, retrying throttled, failed and unreachable attempts.
+
+        Returns:
+            httpx.Response: The first non-retryable response, or the last one once
+                retries are exhausted. Callers check the status as usual.
+
+        Raises:
+            httpx.TransportError: If the last attempt could not reach the server.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire()
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(
+                    f"{self.name} request failed: {e!r}. Retrying in {delay:.2f}s"
+                )
+            else:
+                if (
+                    response.status_code not in RETRY_STATUSES
+                    or attempt == self.max_retries
+                ):
+                    return response
+                delay = self._retry_after(response) or self._backoff(attempt)
+                logger.warning(
+                    f"{self.name} returned {response.status_code}. "
+                    f"Retrying in {delay:.2f}s"
+                )
+            HTTP_RETRIES.labels(self.name).inc()
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def close(self) -> None:
+        """Close pooled connections; the next request opens a new client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def _retry_after(self, response: httpx.Response) -> Optional[float]:
+        try:
+            return min(self.backoff_max, float(response.headers["Retry-After"]))
+        except (KeyError, ValueError):
+            return None
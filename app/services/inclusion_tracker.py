@@ -0,0 +1,238 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from async_substrate_interface.async_substrate import AsyncSubstrateInterface
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.models import (
+    STATUS_FAILED,
+    STATUS_FINALIZED,
+    STATUS_INCLUDED,
+    STATUS_PENDING,
+    StakeAdjustment,
+    async_session,
+)
+from app.db.service import get_adjustments_by_status, subtract_from_hourly_totals
+from app.metrics import chain_request
+from app.services.staking import batch_call_errors
+from app.services.substrate_pool import substrate_pool
+
+logger = logging.getLogger(__name__)
+
+# Blocks to look back over on start, so extrinsics that landed while the tracker
+# was down are still found. Matches the default mortality period of extrinsics.
+START_LOOKBACK_BLOCKS = 64
+
+# Recent blocks searched again on every head, since stake adjustments are written
+# in buffered batches and may be recorded after their block was first tracked.
+RESCAN_BLOCKS = 3
+
+
+def group_by_extrinsic(
+    adjustments: List[StakeAdjustment],
+) -> Dict[str, List[StakeAdjustment]]:
+    """Group adjustments by extrinsic hash, keeping each batch in call order."""
+    groups: Dict[str, List[StakeAdjustment]] = defaultdict(list)
+    for adjustment in adjustments:
+        if adjustment.extrinsic_hash:
+            groups[adjustment.extrinsic_hash].append(adjustment)
+    return groups
+
+
+async def scan_block(
+    substrate: AsyncSubstrateInterface,
+    block_hash: str,
+    pending: Dict[str, List[StakeAdjustment]],
+) -> int:
+    """
+    Record the outcome of the pending extrinsics included in a block.
+
+    Found extrinsics are removed from `pending`. Each adjustment becomes included,
+    or failed with the error of its call.
+
+    Returns:
+        int: The number of pending extrinsics found in the block.
+    """
+    with chain_request("get_block"):
+        block = await substrate.get_block(block_hash=block_hash)
+
+    found = 0
+    for extrinsic in block["extrinsics"]:
+        if not extrinsic.extrinsic_hash:
+            continue
+        extrinsic_hash = f"0x{extrinsic.extrinsic_hash.hex()}"
+        adjustments = pending.pop(extrinsic_hash, None)
+        if adjustments is None:
+            continue
+
+        receipt = substrate.retrieve_extrinsic_by_hash(block_hash, extrinsic_hash)
+        errors = await batch_call_errors(
+            receipt, len(adjustments), settings.stake_batch_atomic
+        )
+        for adjustment, error in zip(adjustments, errors):
+            adjustment.block_hash = block_hash
+            adjustment.status = STATUS_FAILED if error else STATUS_INCLUDED
+            adjustment.error = error
+        found += 1
+        logger.info(f"Extrinsic {extrinsic_hash} included in block {block_hash}")
+    return found
+
+
+async def finalize_included(
+    substrate: AsyncSubstrateInterface,
+    adjustments: List[StakeAdjustment],
+    finalized_number: int,
+) -> None:
+    """
+    Finalize included adjustments whose block is at or below the finalized head.
+
+    An adjustment whose block was replaced by a reorg before finalization goes
+    back to pending, so it is looked for again in the new blocks.
+    """
+    by_block: Dict[str, List[StakeAdjustment]] = defaultdict(list)
+    for adjustment in adjustments:
+        if adjustment.block_hash:
+            by_block[adjustment.block_hash].append(adjustment)
+
+    for block_hash, included in by_block.items():
+        with chain_request("get_block_number"):
+            block_number = await substrate.get_block_number(block_hash)
+        if block_number is None or block_number > finalized_number:
+            continue
+        with chain_request("get_block_hash"):
+            canonical = await substrate.get_block_hash(block_number)
+        for adjustment in included:
+            if canonical == block_hash:
+                adjustment.status = STATUS_FINALIZED
+            else:
+                adjustment.status = STATUS_PENDING
+                adjustment.block_hash = None
+
+
+def expire_pending(
+    pending: Dict[str, List[StakeAdjustment]], now: Optional[datetime] = None
+) -> None:
+    """Fail adjustments whose extrinsic stayed pending past its timeout."""
+    now = now or datetime.utcnow()
+    deadline = now - timedelta(seconds=settings.pending_extrinsic_timeout)
+    for extrinsic_hash, adjustments in list(pending.items()):
+        if adjustments[0].created_at > deadline:
+            continue
+        logger.warning(f"Extrinsic {extrinsic_hash} was not included in time")
+        for adjustment in adjustments:
+            adjustment.status = STATUS_FAILED
+            adjustment.error = "Not included before the pending timeout"
+        del pending[extrinsic_hash]
+
+
+async def track_blocks(
+    db: AsyncSession,
+    substrate: AsyncSubstrateInterface,
+    first_block: int,
+    last_block: int,
+) -> None:
+    """
+    Update the status of submitted stake adjustments up to `last_block`.
+
+    Blocks from `first_block` on are searched for pending extrinsics, included
+    ones are finalized against the finalized head and pending ones past their
+    timeout are failed. Block reads are skipped while nothing is pending.
+    Adjustments that fail are taken back out of the hourly stake totals.
+    """
+    submitted = await get_adjustments_by_status(db, STATUS_PENDING)
+    pending = group_by_extrinsic(submitted)
+    for block_number in range(first_block, last_block + 1):
+        if not pending:
+            break
+        with chain_request("get_block_hash"):
+            block_hash = await substrate.get_block_hash(block_number)
+        await scan_block(substrate, block_hash, pending)
+    expire_pending(pending)
+    failed = [
+        adjustment for adjustment in submitted if adjustment.status == STATUS_FAILED
+    ]
+    if failed and settings.stake_rollup_enabled:
+        await subtract_from_hourly_totals(db, failed)
+
+    included = await get_adjustments_by_status(db, STATUS_INCLUDED)
+    if included:
+        with chain_request("get_chain_finalised_head"):
+            finalized_hash = await substrate.get_chain_finalised_head()
+        with chain_request("get_block_number"):
+            finalized_number = await substrate.get_block_number(finalized_hash)
+        await finalize_included(substrate, included, finalized_number)
+
+    await db.commit()
+
+
+async def follow_best_heads(max_backoff: float = 30.0) -> None:
+    """
+    Track submitted extrinsics block by block until cancelled.
+
+    Like the indexer, headers arrive over a subscription on one pooled connection
+    while tracking runs on another. Every block since the last one tracked is
+    searched, so an extrinsic is found even when tracking falls behind.
+    """
+    new_head = asyncio.Event()
+    latest: dict = {}
+
+    async def on_header(block: dict) -> None:
+        latest["number"] = block["header"]["number"]
+        new_head.set()
+
+    async def subscribe() -> None:
+        backoff = 1.0
+        while True:
+            try:
+                async with substrate_pool.connection() as subtensor:
+                    backoff = 1.0
+                    await subtensor.substrate.subscribe_block_headers(
+                        on_header, finalized_only=False
+                    )
+            except Exception as e:
+                logger.warning(
+                    f"Head subscription dropped: {e}. Resubscribing in {backoff:.0f}s"
+                )
+                await asyncio.sleep(backoff)
+                backoff = min(max_backoff, backoff * 2)
+
+    subscriber = asyncio.create_task(subscribe())
+    tracked: Optional[int] = None
+    try:
+        while True:
+            await new_head.wait()
+            new_head.clear()
+            head = latest["number"]
+            if tracked is None:
+                first_block = head - START_LOOKBACK_BLOCKS
+            else:
+                first_block = min(tracked + 1, head - RESCAN_BLOCKS)
+            try:
+                async with substrate_pool.connection() as subtensor:
+                    async with async_session() as db:
+                        await track_blocks(
+                            db, subtensor.substrate, max(first_block, 0), head
+                        )
+                tracked = head
+            except Exception as e:
+                logger.error(f"Failed to track block {head}: {e}", exc_info=True)
+    finally:
+        subscriber.cancel()
+
+
+async def run_tracker() -> None:
+    """Entry point for the standalone inclusion tracker process."""
+    await substrate_pool.start()
+    try:
+        await follow_best_heads()
+    finally:
+        await substrate_pool.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_tracker())
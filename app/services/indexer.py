@@ -0,0 +1,525 @@
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from async_substrate_interface.async_substrate import AsyncSubstrateInterface
+from bittensor import AsyncSubtensor
+
+from app.cache.redis import redis_cache
+from app.config import settings
+from app.metrics import chain_request
+from app.services.bittensor import (
+    BLOCK_TIME_SECONDS,
+    SNAPSHOT_KEY,
+    SUBNET_BLOCK_FIELD,
+    encode_subnet,
+    get_all_netuids,
+    get_subnet_dividends,
+    netuids_cache_key,
+    subnet_cache_key,
+)
+from app.services.dividend_history import record_dividend_history
+from app.services.substrate_pool import substrate_pool
+
+logger = logging.getLogger(__name__)
+
+# Keys written for every indexed block outlive the snapshot freshness window a few
+# times over, so requests still reading them finish, then expire once superseded.
+SNAPSHOT_TTL = 4 * settings.snapshot_max_lag_blocks * BLOCK_TIME_SECONDS
+
+# Set to the block of each subnet's last epoch, when its dividends are paid out
+# (the misspelling is the pallet's).
+EPOCH_STORAGE_FUNCTION = "LastMechansimStepBlock"
+
+
+def snapshot_keys(snapshot: dict) -> List[str]:
+    """List the per-block keys a snapshot pointer refers to."""
+    block_hash = snapshot["block_hash"]
+    return [netuids_cache_key(block_hash)] + [
+        subnet_cache_key(block_hash, uid) for uid in snapshot["netuids"]
+    ]
+
+
+async def index_subnets(
+    subtensor: AsyncSubtensor,
+    block_hash: Optional[str] = None,
+    netuids: Optional[List[int]] = None,
+    max_hotkeys: Optional[int] = None,
+) -> Tuple[dict, Dict[int, List[Tuple[str, int]]]]:
+    """
+    Scan TaoDividendsPerSubnet for every subnet and publish the snapshot to Redis.
+
+    The subnet snapshots and the pointer to them are written in one transaction,
+    so readers either see the previous snapshot or the complete new one. Once per
+    history window the snapshot is also appended to the dividend history.
+
+    Args:
+        subtensor (AsyncSubtensor): Connected subtensor to scan with.
+        block_hash (Optional[str]): Block to index. Defaults to the finalized head.
+        netuids (Optional[List[int]]): Only scan these subnets. The snapshot is then
+            marked partial, so listings of every subnet do not use it.
+        max_hotkeys (Optional[int]): Stop before the first subnet that would take
+            the snapshot past this many hotkeys, also marking it partial.
+
+    Returns:
+        Tuple[dict, Dict[int, List[Tuple[str, int]]]]: The snapshot pointer that
+            was written and the (hotkey, dividend) pairs of each subnet scanned.
+    """
+    substrate = subtensor.substrate
+    if block_hash is None:
+        with chain_request("get_chain_finalised_head"):
+            block_hash = await substrate.get_chain_finalised_head()
+    with chain_request("get_block_number"):
+        block_number = await substrate.get_block_number(block_hash)
+
+    all_netuids = await get_all_netuids(subtensor, block_hash)
+    mapping = {netuids_cache_key(block_hash): json.dumps(all_netuids)}
+    subnets = {}
+    dividends = {}
+    hotkeys = 0
+    for uid in all_netuids:
+        if netuids is not None and uid not in netuids:
+            continue
+        pairs = await get_subnet_dividends(uid, substrate, block_hash)
+        if max_hotkeys is not None and hotkeys + len(pairs) > max_hotkeys:
+            logger.warning(
+                f"Subnet {uid} would exceed {max_hotkeys} hotkeys; "
+                f"leaving it and later subnets out of the snapshot"
+            )
+            break
+        hotkeys += len(pairs)
+        subnets[subnet_cache_key(block_hash, uid)] = encode_subnet(block_hash, pairs)
+        dividends[uid] = pairs
+    scanned = list(dividends)
+
+    snapshot = {
+        "block_hash": block_hash,
+        "block_number": block_number,
+        "indexed_at": time.time(),
+        "netuids": scanned,
+        "partial": len(scanned) < len(all_netuids),
+    }
+    mapping[SNAPSHOT_KEY] = json.dumps(snapshot)
+    await redis_cache.set_many(mapping, ttl=SNAPSHOT_TTL, atomic=True, hashes=subnets)
+    await redis_cache.invalidate([SNAPSHOT_KEY])
+
+    try:
+        await record_dividend_history(substrate, block_hash, block_number, dividends)
+    except Exception as e:
+        logger.error(f"Failed to record dividend history at block {block_number}: {e}")
+
+    logger.info(f"Indexed {len(scanned)} subnets at block {block_number}")
+    return snapshot, dividends
+
+
+async def index_block(
+    subtensor: AsyncSubtensor, block_hash: Optional[str] = None
+) -> dict:
+    """Index every subnet at a block (the finalized head by default), see `index_subnets`."""
+    snapshot, _ = await index_subnets(subtensor, block_hash)
+    return snapshot
+
+
+async def index_finalized_head() -> dict:
+    """Index the current finalized head once using a pooled connection."""
+    async with substrate_pool.connection() as subtensor:
+        return await index_block(subtensor)
+
+
+async def follow_finalized_heads(max_backoff: float = 30.0) -> None:
+    """
+    Index every new finalized head until cancelled.
+
+    Headers arrive over a `chain_subscribeFinalizedHeads` subscription on one pooled
+    connection while indexing runs on another. If indexing falls behind, intermediate
+    blocks are skipped and the newest finalized block is indexed next.
+    """
+    new_head = asyncio.Event()
+    latest: dict = {}
+
+    async def on_header(block: dict) -> None:
+        latest["number"] = block["header"]["number"]
+        new_head.set()
+
+    async def subscribe() -> None:
+        backoff = 1.0
+        while True:
+            try:
+                async with substrate_pool.connection() as subtensor:
+                    backoff = 1.0
+                    await subtensor.substrate.subscribe_block_headers(
+                        on_header, finalized_only=True
+                    )
+            except Exception as e:
+                logger.warning(
+                    f"Head subscription dropped: {e}. Resubscribing in {backoff:.0f}s"
+                )
+                await asyncio.sleep(backoff)
+                backoff = min(max_backoff, backoff * 2)
+
+    subscriber = asyncio.create_task(subscribe())
+    try:
+        while True:
+            await new_head.wait()
+            new_head.clear()
+            try:
+                async with substrate_pool.connection() as subtensor:
+                    block_hash = await subtensor.substrate.get_block_hash(
+                        latest["number"]
+                    )
+                    await index_block(subtensor, block_hash)
+            except Exception as e:
+                logger.error(
+                    f"Failed to index block {latest['number']}: {e}", exc_info=True
+                )
+    finally:
+        subscriber.cancel()
+
+
+@dataclass
+class WatchedDividends:
+    """
+    Dividends kept current by a storage subscription, and the keys it watches.
+
+    `keys` maps the hex storage key of each watched TaoDividendsPerSubnet entry
+    to its (netuid, hotkey). Changes are decoded with the runtime of the scan,
+    so decoding never needs the connection the subscription runs on. `head` is
+    the last block notified, and `synced_at` the block of the last full scan.
+
+    Hotkeys that get their first entry after the scan have no watched key, so
+    `epoch_keys` maps each subnet's epoch block key to its netuid, and a subnet
+    is scanned again once its epoch is newer than `scanned_at`.
+    """
+
+    snapshot: dict
+    dividends: Dict[int, Dict[str, int]]
+    keys: Dict[str, Tuple[int, str]]
+    value_type: Optional[str]
+    number_key: str
+    number_type: str
+    runtime: Any
+    synced_at: int
+    head: Optional[int] = None
+    history_window: Optional[int] = None
+    epoch_keys: Dict[str, int] = field(default_factory=dict)
+    epoch_type: Optional[str] = None
+    scanned_at: Dict[int, int] = field(default_factory=dict)
+
+
+async def watch_subnets(subtensor: AsyncSubtensor) -> WatchedDividends:
+    """
+    Scan the watched subnets at the best head and build their storage keys.
+
+    Publishes the scan as the snapshot. Subnets come from `dividend_watch_netuids`,
+    or are all subnets if it is empty, capped at `dividend_watch_max_hotkeys`
+    hotkeys so a single subscription stays within what the node accepts.
+    """
+    substrate = subtensor.substrate
+    with chain_request("get_chain_head"):
+        head = await substrate.get_chain_head()
+    snapshot, dividends = await index_subnets(
+        subtensor,
+        head,
+        settings.dividend_watch_netuids or None,
+        settings.dividend_watch_max_hotkeys,
+    )
+
+    keys: Dict[str, Tuple[int, str]] = {}
+    epoch_keys: Dict[str, int] = {}
+    value_type = epoch_type = None
+    for uid, pairs in dividends.items():
+        for hotkey, _ in pairs:
+            key = await substrate.create_storage_key(
+                "SubtensorModule", "TaoDividendsPerSubnet", [uid, hotkey], head
+            )
+            keys[key.to_hex()] = (uid, hotkey)
+            value_type = key.value_scale_type
+        key = await substrate.create_storage_key(
+            "SubtensorModule", EPOCH_STORAGE_FUNCTION, [uid], head
+        )
+        epoch_keys[key.to_hex()] = uid
+        epoch_type = key.value_scale_type
+    number_key = await substrate.create_storage_key("System", "Number", block_hash=head)
+
+    return WatchedDividends(
+        snapshot=snapshot,
+        dividends={uid: dict(pairs) for uid, pairs in dividends.items()},
+        keys=keys,
+        value_type=value_type,
+        number_key=number_key.to_hex(),
+        number_type=number_key.value_scale_type,
+        runtime=await substrate.init_runtime(block_hash=head),
+        synced_at=snapshot["block_number"],
+        epoch_keys=epoch_keys,
+        epoch_type=epoch_type,
+        scanned_at={uid: snapshot["block_number"] for uid in dividends},
+    )
+
+
+async def decode_change(
+    substrate: AsyncSubstrateInterface,
+    watched: WatchedDividends,
+    type_string: str,
+    data: Optional[str],
+) -> int:
+    """Decode a changed storage value; a removed entry reads as its default, 0."""
+    if data is None:
+        return 0
+    value = await substrate.decode_scale(
+        type_string, bytes.fromhex(data[2:]), runtime=watched.runtime
+    )
+    return getattr(value, "value", value) or 0
+
+
+async def rescan_subnets(
+    watched: WatchedDividends,
+    block_hash: str,
+    block_number: int,
+    netuids: List[int],
+) -> Dict[int, Dict[str, int]]:
+    """
+    Scan subnets again at a block and return how their dividends changed.
+
+    Hotkeys missing from the new scan read as 0, like a removed entry. Scans run on
+    another pooled connection, since the subscription's is busy delivering.
+    """
+    changed: Dict[int, Dict[str, int]] = {}
+    async with substrate_pool.connection() as subtensor:
+        for uid in netuids:
+            pairs = dict(
+                await get_subnet_dividends(uid, subtensor.substrate, block_hash)
+            )
+            previous = watched.dividends[uid]
+            changed[uid] = {
+                hotkey: pairs.get(hotkey, 0)
+                for hotkey in previous.keys() | pairs.keys()
+                if previous.get(hotkey) != pairs.get(hotkey, 0)
+            }
+            watched.scanned_at[uid] = block_number
+    logger.info(
+        f"Rescanned subnets {netuids} after their epoch at block {block_number}"
+    )
+    return changed
+
+
+async def publish_changes(
+    watched: WatchedDividends,
+    block_hash: str,
+    block_number: int,
+    changed: Dict[int, Dict[str, int]],
+) -> bool:
+    """
+    Publish the snapshot at a block as the previous one plus the changed dividends.
+
+    Each watched subnet's hash is copied from the previous block inside Redis, and
+    only the changed fields are written to the copies. The pointer moves to the new
+    block after its hashes are complete.
+
+    Returns:
+        bool: False if the previous snapshot was evicted, so a full scan is needed.
+    """
+    previous = watched.snapshot["block_hash"]
+    copies = {netuids_cache_key(block_hash): netuids_cache_key(previous)}
+    fields = {}
+    for uid in watched.snapshot["netuids"]:
+        key = subnet_cache_key(block_hash, uid)
+        copies[key] = subnet_cache_key(previous, uid)
+        fields[key] = {SUBNET_BLOCK_FIELD: block_hash}
+        for hotkey, dividend in changed.get(uid, {}).items():
+            fields[key][hotkey] = str(dividend)
+    if not await redis_cache.copy_with_updates(copies, fields, ttl=SNAPSHOT_TTL):
+        logger.warning(f"Snapshot at block {previous} is gone; rescanning")
+        return False
+
+    for uid, hotkeys in changed.items():
+        watched.dividends[uid].update(hotkeys)
+    watched.snapshot = {
+        **watched.snapshot,
+        "block_hash": block_hash,
+        "block_number": block_number,
+        "indexed_at": time.time(),
+    }
+    await redis_cache.set_many(
+        {SNAPSHOT_KEY: json.dumps(watched.snapshot)}, ttl=SNAPSHOT_TTL
+    )
+    await redis_cache.invalidate([SNAPSHOT_KEY])
+    logger.info(
+        f"Published {sum(map(len, changed.values()))} changed dividends "
+        f"in {len(changed)} subnets at block {block_number}"
+    )
+    return True
+
+
+async def confirm_snapshot(watched: WatchedDividends) -> None:
+    """
+    Mark the snapshot as still current after a block that changed no dividends.
+
+    The pointer keeps its block, whose values still hold, and only its indexed
+    time moves, so readers keep treating it as fresh. The TTL of that block's keys
+    is extended with it, so they do not expire while still pointed at. Once the
+    block is `snapshot_max_block_age` old the pointer is moved forward instead.
+    """
+    watched.snapshot = {**watched.snapshot, "indexed_at": time.time()}
+    await redis_cache.set_many(
+        {SNAPSHOT_KEY: json.dumps(watched.snapshot)}, ttl=SNAPSHOT_TTL
+    )
+    await redis_cache.expire_many(snapshot_keys(watched.snapshot), SNAPSHOT_TTL)
+    await redis_cache.invalidate([SNAPSHOT_KEY])
+
+
+async def record_watched_history(watched: WatchedDividends) -> None:
+    """Append the snapshot to the dividend history once per history window."""
+    block_number = watched.snapshot["block_number"]
+    window = block_number // settings.dividend_history_interval
+    if window == watched.history_window:
+        return
+    try:
+        async with substrate_pool.connection() as subtensor:
+            await record_dividend_history(
+                subtensor.substrate,
+                watched.snapshot["block_hash"],
+                block_number,
+                {uid: list(pairs.items()) for uid, pairs in watched.dividends.items()},
+            )
+        watched.history_window = window
+    except Exception as e:
+        logger.error(f"Failed to record dividend history at block {block_number}: {e}")
+
+
+async def apply_storage_changes(
+    substrate: AsyncSubstrateInterface,
+    watched: WatchedDividends,
+    block_hash: str,
+    changes: List[Tuple[str, Optional[str]]],
+) -> bool:
+    """
+    Apply one block's storage notification to the cache.
+
+    System.Number is watched alongside the dividends, so every block notifies.
+    Only dividends that differ from the watched values are written. A subnet whose
+    epoch ran since it was scanned is scanned again, which picks up hotkeys that
+    were paid dividends for the first time.
+
+    Returns:
+        bool: True when the watched subnets must be scanned again: a block was
+            skipped or reorganised, the previous snapshot is gone, or
+            `dividend_resync_blocks` have passed since the last scan.
+    """
+    block_number = None
+    changed: Dict[int, Dict[str, int]] = defaultdict(dict)
+    epochs: List[int] = []
+    for key, data in changes:
+        if key == watched.number_key:
+            block_number = await decode_change(
+                substrate, watched, watched.number_type, data
+            )
+        elif key in watched.epoch_keys:
+            uid = watched.epoch_keys[key]
+            epoch = await decode_change(substrate, watched, watched.epoch_type, data)
+            if epoch > watched.scanned_at[uid]:
+                epochs.append(uid)
+        elif key in watched.keys:
+            uid, hotkey = watched.keys[key]
+            dividend = await decode_change(substrate, watched, watched.value_type, data)
+            if watched.dividends[uid].get(hotkey) != dividend:
+                changed[uid][hotkey] = dividend
+
+    if block_number is None or (
+        watched.head is not None and block_number != watched.head + 1
+    ):
+        logger.info(f"Block {block_number} does not follow {watched.head}; rescanning")
+        return True
+    watched.head = block_number
+
+    if epochs:
+        changed.update(
+            await rescan_subnets(watched, block_hash, block_number, sorted(epochs))
+        )
+    changed = {uid: hotkeys for uid, hotkeys in changed.items() if hotkeys}
+    age = block_number - watched.snapshot["block_number"]
+    if changed or age >= settings.snapshot_max_block_age:
+        if not await publish_changes(watched, block_hash, block_number, changed):
+            return True
+    else:
+        await confirm_snapshot(watched)
+    await record_watched_history(watched)
+    return block_number - watched.synced_at >= settings.dividend_resync_blocks
+
+
+async def subscribe_dividends(
+    substrate: AsyncSubstrateInterface, watched: WatchedDividends
+) -> None:
+    """
+    Follow `state_subscribeStorage` notifications for the watched keys.
+
+    Returns once a full scan is due, after unsubscribing. Raises if the
+    connection drops.
+    """
+    subscription: dict = {}
+
+    async def on_message(message: dict, subscription_id: str) -> tuple[dict, bool]:
+        if "params" not in message:
+            return message, False  # The subscription was accepted
+        subscription["id"] = subscription_id
+        result = message["params"]["result"]
+        done = await apply_storage_changes(
+            substrate, watched, result["block"], result["changes"]
+        )
+        return message, done
+
+    logger.info(f"Subscribing to {len(watched.keys)} dividend storage keys")
+    await substrate.rpc_request(
+        "state_subscribeStorage",
+        [[*watched.keys, *watched.epoch_keys, watched.number_key]],
+        result_handler=on_message,
+    )
+    if "id" in subscription:
+        await substrate.rpc_request("state_unsubscribeStorage", [subscription["id"]])
+
+
+async def follow_storage_changes(max_backoff: float = 30.0) -> None:
+    """
+    Keep the snapshot current from storage change notifications until cancelled.
+
+    Instead of scanning every subnet on every block, the watched subnets are
+    scanned once and then only the dividends that change are written, one block
+    at a time on best blocks. Every (re)subscription starts with a full scan, so
+    changes missed while the connection was down are picked up, and so are
+    hotkeys that appeared since the last scan.
+    """
+    backoff = 1.0
+    while True:
+        try:
+            async with substrate_pool.connection() as subtensor:
+                watched = await watch_subnets(subtensor)
+                backoff = 1.0
+                await subscribe_dividends(subtensor.substrate, watched)
+        except Exception as e:
+            logger.warning(
+                f"Dividend subscription dropped: {e}. Resubscribing in {backoff:.0f}s"
+            )
+            await asyncio.sleep(backoff)
+            backoff = min(max_backoff, backoff * 2)
+
+
+async def run_indexer() -> None:
+    """Entry point for the standalone indexer process."""
+    await redis_cache.connect()
+    await substrate_pool.start()
+    try:
+        if settings.dividend_subscriptions_enabled:
+            await follow_storage_changes()
+        else:
+            await follow_finalized_heads()
+    finally:
+        await substrate_pool.close()
+        await redis_cache.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_indexer())
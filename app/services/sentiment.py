@@ -0,0 +1,86 @@
+import hashlib
+import json
+import logging
+from datetime import date
+from typing import List, Optional
+
+from app.cache.redis import redis_cache
+from app.cache.singleflight import coalesce
+from app.config import settings
+from app.services.chutes import chutes_client, request_chutes_sentiment
+from app.services.datura import datura_client, fetch_twitter_subnet_mentions
+
+logger = logging.getLogger(__name__)
+
+
+def tweets_cache_key(netuid: int, start_date: date, end_date: date) -> str:
+    return f"tweets:{netuid}:{start_date}:{end_date}"
+
+
+def sentiment_cache_key(
+    netuid: int, start_date: date, end_date: date, tweets: List[str]
+) -> str:
+    return f"sentiment:{netuid}:{start_date}:{end_date}:{tweet_set_digest(tweets)}"
+
+
+def tweet_set_digest(tweets: List[str]) -> str:
+    """Hash a set of tweet texts, independent of their order and duplicates."""
+    digest = hashlib.sha256("\n".join(sorted(set(tweets))).encode())
+    return digest.hexdigest()[:16]
+
+
+async def get_subnet_tweets(netuid: int, start_date: date, end_date: date) -> List[str]:
+    """
+    Get the texts of the tweets mentioning a subnet within a date window.
+
+    The list is cached for `tweet_cache_ttl` seconds and loaded once however many
+    trades ask for it at the same time. Datura errors propagate and are not cached.
+    """
+    key = tweets_cache_key(netuid, start_date, end_date)
+    cached = await redis_cache.get(key)
+    if cached is None:
+
+        async def load() -> str:
+            tweets = await fetch_twitter_subnet_mentions(netuid, start_date, end_date)
+            texts = [tweet["text"] for tweet in tweets if tweet.get("text")]
+            value = json.dumps(texts)
+            await redis_cache.set(key, value, ttl=settings.tweet_cache_ttl)
+            return value
+
+        cached = await coalesce(key, load, load_timeout=datura_client.max_request_time)
+    return json.loads(cached)
+
+
+async def get_subnet_sentiment(
+    netuid: int, start_date: date, end_date: date
+) -> Optional[int]:
+    """
+    Get the sentiment score of a subnet's tweets within a date window.
+
+    The score only depends on the subnet, the window and the tweets found, so it is
+    cached under all three and shared by every trade on the subnet: one LLM call
+    serves them all until `sentiment_cache_ttl` expires or the tweets change.
+
+    Returns:
+        Optional[int]: Score in the range [-100, 100], or None if no tweets mention
+            the subnet in the window.
+
+    Raises:
+        httpx.HTTPError: If Datura or Chutes fail; failures are never cached.
+    """
+    tweets = await get_subnet_tweets(netuid, start_date, end_date)
+    if not tweets:
+        return None
+
+    key = sentiment_cache_key(netuid, start_date, end_date, tweets)
+    cached = await redis_cache.get(key)
+    if cached is None:
+
+        async def load() -> str:
+            logger.info(f"Analyzing sentiment for {len(tweets)} tweets on {netuid=}.")
+            value = str(await request_chutes_sentiment(tweets))
+            await redis_cache.set(key, value, ttl=settings.sentiment_cache_ttl)
+            return value
+
+        cached = await coalesce(key, load, load_timeout=chutes_client.max_request_time)
+    return int(cached)
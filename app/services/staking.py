@@ -0,0 +1,215 @@
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from bittensor import AsyncSubtensor
+from bittensor.utils.balance import Balance
+from scalecodec.types import GenericCall
+
+from app.config import settings
+from app.db.models import STATUS_FAILED, STATUS_INCLUDED, STATUS_PENDING
+from app.db.writer import stake_writer
+from app.metrics import chain_request
+from app.services.bittensor import get_wallet
+from app.services.substrate_pool import substrate_pool
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StakeOrder:
+    """One sentiment-driven stake adjustment to submit as part of a batch."""
+
+    netuid: int
+    hotkey: str
+    sentiment: int
+
+
+@dataclass
+class StakeResult:
+    """The outcome of one call in a batched stake submission."""
+
+    netuid: int
+    hotkey: str
+    sentiment: int
+    action: str
+    amount_tao: float
+    submitted: bool = False
+    error: Optional[str] = None
+    status: Optional[str] = None
+    extrinsic_hash: Optional[str] = None
+    block_hash: Optional[str] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.submitted and self.error is None
+
+
+def sentiment_amount(netuid: int, sentiment: int) -> Balance:
+    """Convert a sentiment score to the amount to stake or unstake on a subnet."""
+    rao_amount = abs(int(sentiment * 0.01 * 1e9))  # Convert to rao (TAO * 1e9)
+    return Balance.from_rao(rao_amount).set_unit(netuid)
+
+
+async def build_stake_call(
+    subtensor: AsyncSubtensor, order: StakeOrder
+) -> Tuple[Optional[GenericCall], StakeResult]:
+    """
+    Compose the SubtensorModule call for one order.
+
+    Returns:
+        Tuple[Optional[GenericCall], StakeResult]: The composed call and the result
+            to report for the order. The call is None, and the result's error says
+            why, if the order is skipped.
+    """
+    amount = sentiment_amount(order.netuid, order.sentiment)
+    action = "stake" if order.sentiment > 0 else "unstake"
+    result = StakeResult(
+        order.netuid, order.hotkey, order.sentiment, action, amount.tao
+    )
+    if amount.rao <= 0:
+        result.error = "Neutral sentiment"
+        return None, result
+
+    if action == "stake":
+        call_function = "add_stake"
+        params = {"amount_staked": amount.rao}
+    else:
+        stake_info = await subtensor.get_stake_for_hotkey(
+            hotkey_ss58=order.hotkey, netuid=order.netuid
+        )
+        if stake_info.tao == 0:
+            result.error = "No stake to unstake"
+            return None, result
+        amount = min(amount, stake_info)
+        result.amount_tao = amount.tao
+        call_function = "remove_stake"
+        params = {"amount_unstaked": amount.rao}
+
+    call = await subtensor.substrate.compose_call(
+        call_module="SubtensorModule",
+        call_function=call_function,
+        call_params={"hotkey": order.hotkey, "netuid": order.netuid, **params},
+    )
+    return call, result
+
+
+async def batch_call_errors(receipt, calls: int, atomic: bool) -> List[Optional[str]]:
+    """
+    Read the outcome of each call of an included Utility batch from its events.
+
+    `force_batch` emits one ItemCompleted or ItemFailed event per call, in order.
+    `batch_all` reverts every call if one fails, so they share its error.
+    """
+    if not await receipt.is_success:
+        error = str(await receipt.error_message)
+        return [error] * calls
+
+    errors: List[Optional[str]] = []
+    for event in await receipt.triggered_events:
+        if event["event"]["module_id"] != "Utility":
+            continue
+        if event["event"]["event_id"] == "ItemCompleted":
+            errors.append(None)
+        elif event["event"]["event_id"] == "ItemFailed":
+            errors.append(str(event["event"]["attributes"]))
+    if atomic and not errors:
+        errors = [None] * calls
+    if len(errors) != calls:
+        raise RuntimeError(f"Batch emitted {len(errors)} item events for {calls} calls")
+    return errors
+
+
+async def submit_stake_batch(
+    orders: List[StakeOrder], atomic: bool = settings.stake_batch_atomic
+) -> List[StakeResult]:
+    """
+    Submit several stake adjustments from one wallet in a single extrinsic.
+
+    The calls are wrapped in `Utility.force_batch`, so one failing call does not
+    stop the others, or in `Utility.batch_all` with `atomic=True`, so they succeed
+    or fail together. Orders are submitted `stake_batch_max_calls` at a time and
+    every submitted adjustment is recorded in StakeAdjustment with its outcome.
+
+    With `track_inclusion` enabled, batches are submitted without waiting for a
+    block: adjustments are recorded as pending with their extrinsic hash, and the
+    inclusion tracker records their outcome once the extrinsic lands.
+
+    Returns:
+        List[StakeResult]: The outcome of each order, in order.
+    """
+    if not orders:
+        return []
+
+    # The coldkey signs every call, whichever hotkey it adjusts.
+    wallet = await get_wallet(orders[0].hotkey)
+    batch_function = "batch_all" if atomic else "force_batch"
+    results: List[StakeResult] = []
+
+    wait = not settings.track_inclusion
+    async with substrate_pool.connection() as subtensor:
+        substrate = subtensor.substrate
+        # Batches go out without waiting for each other, so number them ourselves.
+        nonce = await substrate.get_account_next_index(wallet.coldkeypub.ss58_address)
+        for start in range(0, len(orders), settings.stake_batch_max_calls):
+            chunk = orders[start : start + settings.stake_batch_max_calls]
+            built = [await build_stake_call(subtensor, order) for order in chunk]
+            results.extend(result for _, result in built)
+            submitted = [(call, result) for call, result in built if call is not None]
+            if not submitted:
+                continue
+
+            batch = await substrate.compose_call(
+                call_module="Utility",
+                call_function=batch_function,
+                call_params={"calls": [call for call, _ in submitted]},
+            )
+            extrinsic_hash = block_hash = None
+            try:
+                extrinsic = await substrate.create_signed_extrinsic(
+                    call=batch, keypair=wallet.coldkey, nonce=nonce
+                )
+                logger.info(
+                    f"Submitting {batch_function} of {len(submitted)} stake adjustments"
+                )
+                with chain_request(batch_function):
+                    receipt = await substrate.submit_extrinsic(
+                        extrinsic, wait_for_inclusion=wait
+                    )
+                nonce += 1
+                extrinsic_hash, block_hash = receipt.extrinsic_hash, receipt.block_hash
+                if wait:
+                    errors = await batch_call_errors(receipt, len(submitted), atomic)
+                else:
+                    errors = [None] * len(submitted)
+            except Exception as e:
+                logger.exception(f"Stake batch submission failed: {e}")
+                errors = [str(e)] * len(submitted)
+            for (_, result), error in zip(submitted, errors):
+                result.submitted = True
+                result.error = error
+                result.extrinsic_hash = extrinsic_hash
+                result.block_hash = block_hash
+                if error is not None:
+                    result.status = STATUS_FAILED
+                else:
+                    result.status = STATUS_INCLUDED if wait else STATUS_PENDING
+
+    await stake_writer.add_many(
+        [
+            {
+                "netuid": result.netuid,
+                "hotkey": result.hotkey,
+                "sentiment_score": result.sentiment,
+                "action": result.action,
+                "amount_tao": result.amount_tao,
+                "error": result.error,
+                "status": result.status,
+                "extrinsic_hash": result.extrinsic_hash,
+                "block_hash": result.block_hash,
+            }
+            for result in results
+            if result.submitted
+        ]
+    )
+    return results
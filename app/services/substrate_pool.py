@@ -0,0 +1,251 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+
+from bittensor import AsyncSubtensor
+from websockets.exceptions import ConnectionClosed
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Errors that mean the websocket behind a pooled connection is no longer usable.
+CONNECTION_ERRORS = (ConnectionError, ConnectionClosed, OSError, asyncio.TimeoutError)
+
+
+class SubstratePoolTimeout(Exception):
+    """Raised when no pooled connection becomes available within the wait limit."""
+
+
+class PooledConnection:
+    """A single persistent chain connection managed by the pool."""
+
+    def __init__(self, network: str):
+        self.network = network
+        self.subtensor: Optional[AsyncSubtensor] = None
+        self.runtime_version: Optional[int] = None
+        self.failures = 0
+
+    @property
+    def connected(self) -> bool:
+        return self.subtensor is not None
+
+    async def connect(
+        self, max_attempts: int, max_backoff: float, deadline: Optional[float] = None
+    ) -> AsyncSubtensor:
+        """
+        Open the websocket, retrying with exponential backoff.
+
+        With a `deadline` (event loop time), attempts and the backoff between them
+        stop when it passes, raising SubstratePoolTimeout.
+        """
+        loop = asyncio.get_running_loop()
+        for attempt in range(1, max_attempts + 1):
+            subtensor = AsyncSubtensor(
+                network=self.network, websocket_shutdown_timer=None
+            )
+            try:
+                if deadline is None:
+                    await subtensor.initialize()
+                else:
+                    await asyncio.wait_for(
+                        subtensor.initialize(), max(0.0, deadline - loop.time())
+                    )
+                self.subtensor = subtensor
+                self.failures = 0
+                return subtensor
+            except Exception as e:
+                self.failures += 1
+                delay = min(max_backoff, 0.5 * 2 ** (attempt - 1))
+                logger.warning(
+                    f"Substrate connect attempt {attempt}/{max_attempts} failed: {e}. "
+                    f"Retrying in {delay:.1f}s"
+                )
+                await _close_quietly(subtensor)
+                if deadline is not None and loop.time() + delay >= deadline:
+                    raise SubstratePoolTimeout(
+                        f"Unable to connect to {self.network} substrate in time"
+                    )
+                if attempt < max_attempts:
+                    await asyncio.sleep(delay)
+
+        raise ConnectionError(f"Unable to connect to {self.network} substrate")
+
+    async def ping(self) -> None:
+        """Keep the websocket alive and reload metadata after a runtime upgrade."""
+        substrate = self.subtensor.substrate
+        head = await substrate.get_chain_head()
+        runtime_version = await substrate.get_block_runtime_version_for(head)
+
+        if self.runtime_version is not None and runtime_version != self.runtime_version:
+            logger.info(
+                f"Runtime upgraded {self.runtime_version} -> {runtime_version}. "
+                "Refreshing metadata."
+            )
+            await substrate.init_runtime(block_hash=head)
+        self.runtime_version = runtime_version
+
+    async def reset(self) -> None:
+        """Drop the current websocket so the next borrower reconnects."""
+        subtensor, self.subtensor = self.subtensor, None
+        self.runtime_version = None
+        await _close_quietly(subtensor)
+
+
+async def _close_quietly(subtensor: Optional[AsyncSubtensor]) -> None:
+    if subtensor is None:
+        return
+    try:
+        await subtensor.close()
+    except Exception as e:
+        logger.debug(f"Ignoring error while closing substrate connection: {e}")
+
+
+class SubstratePool:
+    """
+    Pool of persistent AsyncSubtensor connections.
+
+    Each pooled connection is an AsyncSubtensor, so callers can use the high-level
+    helpers directly or reach the raw AsyncSubstrateInterface through `.substrate`.
+    Connections are opened lazily on first borrow, pinged in the background to keep
+    the websocket alive, and dropped and reconnected with backoff when they fail.
+    """
+
+    def __init__(
+        self,
+        network: str,
+        size: int,
+        acquire_timeout: float,
+        keepalive_interval: float,
+        max_inflight_rpcs: int = 32,
+        connect_attempts: int = 5,
+        max_backoff: float = 30.0,
+    ):
+        self.network = network
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+        self.keepalive_interval = keepalive_interval
+        self.max_inflight_rpcs = max_inflight_rpcs
+        self.connect_attempts = connect_attempts
+        self.max_backoff = max_backoff
+        self._connections: List[PooledConnection] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self._rpc_slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def started(self) -> bool:
+        return self._idle is not None
+
+    async def start(self) -> None:
+        """Create the pool slots and start the keepalive loop."""
+        if self.started:
+            return
+        self._idle = asyncio.Queue()
+        self._rpc_slots = asyncio.Semaphore(self.max_inflight_rpcs)
+        self._connections = [PooledConnection(self.network) for _ in range(self.size)]
+        for conn in self._connections:
+            self._idle.put_nowait(conn)
+        self._keepalive_task = asyncio.create_task(self._keepalive())
+        logger.info(f"Substrate pool started with {self.size} connections")
+
+    async def close(self) -> None:
+        """Stop the keepalive loop and close every open connection."""
+        if not self.started:
+            return
+        if self._keepalive_task:
+            self._keepalive_task.cancel()
+            try:
+                await self._keepalive_task
+            except asyncio.CancelledError:
+                pass
+        for conn in self._connections:
+            await conn.reset()
+        self._connections = []
+        self._idle = None
+        self._keepalive_task = None
+        self._rpc_slots = None
+
+    @asynccontextmanager
+    async def connection(
+        self, timeout: Optional[float] = None
+    ) -> AsyncIterator[AsyncSubtensor]:
+        """
+        Borrow a connected AsyncSubtensor from the pool.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait for a free, connected
+                connection, including any reconnect. Defaults to the pool's
+                acquire timeout.
+
+        Raises:
+            SubstratePoolTimeout: If no connection is released, or reconnected,
+                in time.
+        """
+        if not self.started:
+            await self.start()
+
+        wait = self.acquire_timeout if timeout is None else timeout
+        deadline = asyncio.get_running_loop().time() + wait
+        try:
+            conn = await asyncio.wait_for(self._idle.get(), wait)
+        except asyncio.TimeoutError:
+            raise SubstratePoolTimeout(
+                f"No substrate connection available after {wait}s"
+            )
+
+        try:
+            if not conn.connected:
+                await conn.connect(self.connect_attempts, self.max_backoff, deadline)
+            yield conn.subtensor
+        except CONNECTION_ERRORS:
+            await conn.reset()
+            raise
+        finally:
+            if self._idle is not None:
+                self._idle.put_nowait(conn)
+
+    async def warm_up(self) -> None:
+        """Start the pool and open every connection that is not open yet."""
+        if not self.started:
+            await self.start()
+        for _ in range(self._idle.qsize()):
+            conn = self._idle.get_nowait()
+            try:
+                if not conn.connected:
+                    await conn.connect(self.connect_attempts, self.max_backoff)
+            finally:
+                self._idle.put_nowait(conn)
+
+    @asynccontextmanager
+    async def rpc_slot(self) -> AsyncIterator[None]:
+        """Hold one of the process-wide slots for an in-flight chain request."""
+        if not self.started:
+            await self.start()
+        async with self._rpc_slots:
+            yield
+
+    async def _keepalive(self) -> None:
+        """Periodically ping idle connections and drop the ones that fail."""
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            for _ in range(self._idle.qsize()):
+                conn = self._idle.get_nowait()
+                try:
+                    if conn.connected:
+                        await conn.ping()
+                except Exception as e:
+                    logger.warning(f"Substrate keepalive failed, reconnecting: {e}")
+                    await conn.reset()
+                finally:
+                    self._idle.put_nowait(conn)
+
+
+substrate_pool = SubstratePool(
+    network=settings.subtensor_network,
+    size=settings.substrate_pool_size,
+    acquire_timeout=settings.substrate_pool_timeout,
+    keepalive_interval=settings.substrate_keepalive_interval,
+    max_inflight_rpcs=settings.substrate_max_inflight_rpcs,
+)
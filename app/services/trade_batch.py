@@ -0,0 +1,60 @@
+import json
+import logging
+from typing import List, Tuple
+
+from app.cache.redis import redis_cache
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Redis list of trade requests waiting for the next flush, oldest first.
+PENDING_TRADES_KEY = "trades:pending"
+
+# Held for one batching window once a flush has been scheduled for it.
+FLUSH_WINDOW_LOCK = "trades:flush_window"
+
+
+async def add_pending_trade(netuid: int, hotkey: str) -> bool:
+    """
+    Queue a trade request for the next batch.
+
+    Returns:
+        bool: True when the batch has reached `trade_batch_size` and should be
+            flushed now rather than at the end of the window.
+    """
+    size = await redis_cache.push(PENDING_TRADES_KEY, json.dumps([netuid, hotkey]))
+    return size >= settings.trade_batch_size
+
+
+async def open_flush_window() -> bool:
+    """
+    Start a batching window unless one is already open.
+
+    Returns:
+        bool: True if the caller opened the window and must schedule its flush.
+    """
+    token = await redis_cache.acquire_lock(
+        FLUSH_WINDOW_LOCK, settings.trade_batch_window
+    )
+    return token is not None
+
+
+async def pop_pending_trades(limit: int) -> Tuple[List[Tuple[int, str]], int]:
+    """
+    Take up to `limit` of the oldest pending trades off the queue.
+
+    Returns:
+        Tuple[List[Tuple[int, str]], int]: The `(netuid, hotkey)` pairs taken and
+            the number of trades still pending.
+    """
+    values = await redis_cache.pop_many(PENDING_TRADES_KEY, limit)
+    remaining = await redis_cache.length(PENDING_TRADES_KEY)
+    return [tuple(json.loads(value)) for value in values], remaining
+
+
+def group_trades(trades: List[Tuple[int, str]]) -> dict[int, List[str]]:
+    """Group trade requests by netuid, keeping each subnet's hotkeys in order."""
+    groups: dict[int, List[str]] = {}
+    for netuid, hotkey in trades:
+        groups.setdefault(netuid, []).append(hotkey)
+    return groups
@@ -1 +1 @@
-from app.tasks import bittensor
+from app.tasks import bittensor, indexer
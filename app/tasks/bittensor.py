@@ -1,16 +1,94 @@
 import asyncio
 import logging
+import time
 from datetime import date, timedelta
+from typing import List, Optional
 
 from celery import shared_task
 
-from app.services.bittensor import submit_stake_adjustment
-from app.services.chutes import query_chutes_sentiment
-from app.services.datura import search_twitter_subnet_mentions
+from app.config import settings
+from app.metrics import TRADE_TASK_SECONDS, TRADE_TASKS
+from app.services.sentiment import get_subnet_sentiment
+from app.services.staking import StakeOrder, submit_stake_batch
+from app.services.trade_batch import (
+    add_pending_trade,
+    group_trades,
+    open_flush_window,
+    pop_pending_trades,
+)
+from app.tasks.worker_loop import worker_loop
 
 logger = logging.getLogger(__name__)
 
 
+async def queue_trade(netuid: Optional[int], hotkey: Optional[str]) -> None:
+    """
+    Queue a trade request for the next per-subnet batch.
+
+    The first request of a batching window schedules a flush at the end of it,
+    and a request that fills the batch flushes it right away.
+    """
+    if netuid is None or not hotkey:
+        logger.warning(
+            f"Trade requires a netuid and a hotkey, got {netuid=}, {hotkey=}"
+        )
+        return
+
+    if await add_pending_trade(netuid, hotkey):
+        await asyncio.to_thread(flush_trade_batch_task.delay)
+    elif await open_flush_window():
+        await asyncio.to_thread(
+            flush_trade_batch_task.apply_async,
+            countdown=settings.trade_batch_window,
+        )
+
+
+async def trade_subnet(netuid: int, hotkeys: List[str]) -> str:
+    """
+    Score a subnet's sentiment once and submit a stake adjustment for each hotkey.
+
+    Returns:
+        str: "skipped" if there is no sentiment to trade on, "succeeded" or "failed".
+    """
+    today = date.today()
+    yesterday = today - timedelta(days=1)
+
+    try:
+        logger.info(f"Getting sentiment for {netuid=} between {yesterday} and {today}.")
+        sentiment_score = await get_subnet_sentiment(netuid, yesterday, today)
+
+        if sentiment_score is None:
+            logger.warning(f"No tweets found for {netuid=}. Skipping stake adjustment.")
+            return "skipped"
+
+        logger.info(
+            f"Sentiment score: {sentiment_score}. Submitting stake/unstake for "
+            f"{len(hotkeys)} hotkeys on {netuid=}."
+        )
+        results = await submit_stake_batch(
+            [StakeOrder(netuid, hotkey, sentiment_score) for hotkey in hotkeys]
+        )
+        failed = [result for result in results if result.submitted and result.error]
+        for result in failed:
+            logger.error(f"Stake adjustment for {result.hotkey} failed: {result.error}")
+        return "failed" if failed else "succeeded"
+
+    except Exception as e:
+        logger.error(
+            f"Failed to perform trades for netuid={netuid}, hotkeys={hotkeys}: {str(e)}",
+            exc_info=True,
+        )
+        return "failed"
+
+
+def run_trades(netuid: int, hotkeys: List[str]) -> None:
+    """Run a subnet's trades on the worker loop and record their outcome."""
+    start = time.perf_counter()
+    outcome = worker_loop.run(trade_subnet(netuid, hotkeys))
+    TRADE_TASKS.labels(outcome).inc(len(hotkeys))
+    TRADE_TASK_SECONDS.labels(outcome).observe(time.perf_counter() - start)
+
+
 @shared_task(name="app.tasks.bittensor.perform_trade_task")
 def perform_trade_task(netuid: int, hotkey: str) -> None:
     """
@@ -21,38 +99,35 @@ def perform_trade_task(netuid: int, hotkey: str) -> None:
         netuid (int): The network UID (subnet).
         hotkey (str): The hotkey SS58 address associated with the user/node.
     """
+    run_trades(netuid, [hotkey])
+
+
+@shared_task(name="app.tasks.bittensor.perform_subnet_trades_task")
+def perform_subnet_trades_task(netuid: int, hotkeys: List[str]) -> None:
+    """
+    Celery task to trade a batch of hotkeys on one subnet.
+
+    Tweets are fetched and scored once for the whole batch.
+
+    Args:
+        netuid (int): The network UID (subnet).
+        hotkeys (List[str]): Hotkey SS58 addresses to adjust stake for, in order.
+    """
+    run_trades(netuid, hotkeys)
+
 
-    async def async_trade():
-        today = date.today()
-        yesterday = today - timedelta(days=1)
-
-        try:
-            logger.info(
-                f"Fetching tweets for {netuid=} between {yesterday} and {today}."
-            )
-            tweets = await search_twitter_subnet_mentions(netuid, yesterday, today)
-            tweet_texts = [
-                tweet.get("text", "") for tweet in tweets if tweet.get("text")
-            ]
-
-            if not tweet_texts:
-                logger.warning(
-                    f"No tweets found for {netuid=}. Skipping stake adjustment."
-                )
-                return
-
-            logger.info(f"Analyzing sentiment for {len(tweet_texts)} tweets.")
-            sentiment_score = await query_chutes_sentiment(tweet_texts)
-
-            logger.info(
-                f"Sentiment score: {sentiment_score}. Submitting stake/unstake for hotkey {hotkey}."
-            )
-            await submit_stake_adjustment(netuid, hotkey, sentiment_score)
-
-        except Exception as e:
-            logger.error(
-                f"Failed to perform trade task for netuid={netuid}, hotkey={hotkey}: {str(e)}",
-                exc_info=True,
-            )
-
-    asyncio.run(async_trade())
+@shared_task(name="app.tasks.bittensor.flush_trade_batch_task")
+def flush_trade_batch_task() -> None:
+    """
+    Celery task that dispatches pending trade requests grouped by subnet.
+
+    Takes up to `trade_batch_size` requests and starts one subnet trade task per
+    netuid among them. If more requests are left, another flush follows right away.
+    """
+    trades, remaining = worker_loop.run(pop_pending_trades(settings.trade_batch_size))
+    groups = group_trades(trades)
+    logger.info(f"Flushing {len(trades)} trades across {len(groups)} subnets.")
+    for netuid, hotkeys in groups.items():
+        perform_subnet_trades_task.delay(netuid, hotkeys)
+    if remaining:
+        flush_trade_batch_task.delay()
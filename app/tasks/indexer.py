@@ -0,0 +1,25 @@
+import logging
+
+from celery import shared_task
+
+from app.services.indexer import index_finalized_head
+from app.tasks.worker_loop import worker_loop
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name="app.tasks.indexer.index_finalized_head_task")
+def index_finalized_head_task() -> None:
+    """
+    Celery beat task that refreshes the dividends snapshot from the finalized head.
+
+    An alternative to running `python -m app.services.indexer` as its own process.
+    """
+
+    async def async_index():
+        try:
+            await index_finalized_head()
+        except Exception as e:
+            logger.error(f"Failed to index finalized head: {str(e)}", exc_info=True)
+
+    worker_loop.run(async_index())
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Coroutine, Optional, TypeVar
+
+from app.cache.redis import redis_cache
+from app.db.writer import stake_writer
+from app.services.chutes import chutes_client
+from app.services.datura import datura_client
+from app.services.substrate_pool import substrate_pool
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class WorkerLoop:
+    """
+    Long-lived event loop shared by every task of a Celery worker process.
+
+    The loop runs in a daemon thread, so the connections tasks open (the substrate
+    pool, Redis and the HTTP clients) stay open between tasks and their keepalives
+    keep running while the worker is idle. Tasks block in `run` until their
+    coroutine completes. The loop is started lazily in the process that first uses
+    it, so a prefork parent never hands a running loop to its children.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    @property
+    def running(self) -> bool:
+        return self._loop is not None and self._pid == os.getpid()
+
+    def start(self) -> None:
+        """Start the loop thread for this process if it is not running."""
+        if self.running:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._pid = os.getpid()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="worker-loop", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Worker event loop started in process {self._pid}")
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        """Run a coroutine on the worker loop and wait for its result."""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def stop(self) -> None:
+        """Close the shared connections, then stop and close the loop."""
+        if not self.running:
+            return
+        try:
+            self.run(close_connections())
+        except Exception as e:
+            logger.warning(f"Error while closing worker connections: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+        self._loop = self._thread = self._pid = None
+
+
+async def warm_up() -> None:
+    """Open Redis and every substrate connection before the first task needs them."""
+    await redis_cache.connect()
+    await substrate_pool.warm_up()
+
+
+async def close_connections() -> None:
+    try:
+        await stake_writer.close()
+    except Exception as e:
+        logger.error(f"Dropped {stake_writer.pending} unwritten stake adjustments: {e}")
+    await substrate_pool.close()
+    await chutes_client.close()
+    await datura_client.close()
+    await redis_cache.close()
+
+
+worker_loop = WorkerLoop()
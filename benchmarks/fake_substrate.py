@@ -0,0 +1,446 @@
+"""
+Offline stand-in for a subtensor node, for load tests that must not touch finney.
+
+Serves the JSON-RPC subset AsyncSubstrateInterface uses to read dividends: chain
+head and headers, runtime version, V14/V15 metadata describing a minimal
+SubtensorModule, and paged storage reads over a synthetic TaoDividendsPerSubnet
+dataset. Every request can be delayed to mimic network latency, and requests are
+counted per method.
+
+Usage:
+    python -m benchmarks.fake_substrate --port 9944 --subnets 64 --hotkeys 256
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import struct
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import xxhash
+from websockets.asyncio.server import ServerConnection, serve
+from websockets.exceptions import ConnectionClosed
+
+logger = logging.getLogger(__name__)
+
+SPEC_VERSION = 1
+
+
+# SCALE encoding, just enough to describe the runtime metadata below.
+def compact(value: int) -> bytes:
+    if value < 1 << 6:
+        return bytes([value << 2])
+    if value < 1 << 14:
+        return struct.pack("<H", (value << 2) | 0b01)
+    if value < 1 << 30:
+        return struct.pack("<I", (value << 2) | 0b10)
+    raw = value.to_bytes((value.bit_length() + 7) // 8, "little")
+    return bytes([((len(raw) - 4) << 2) | 0b11]) + raw
+
+
+def text(value: str) -> bytes:
+    raw = value.encode()
+    return compact(len(raw)) + raw
+
+
+def vec(items: Iterable, encode: Callable = lambda item: item) -> bytes:
+    items = list(items)
+    return compact(len(items)) + b"".join(encode(item) for item in items)
+
+
+def blob(data: bytes) -> bytes:
+    return compact(len(data)) + data
+
+
+def option(value, encode: Callable = lambda item: item) -> bytes:
+    return b"\x00" if value is None else b"\x01" + encode(value)
+
+
+# Type ids of the portable registry; 0 is AccountId32, as on finney.
+ACCOUNT_ID, BYTES32, U8, U16, U64, BOOL, KEY, EMPTY = range(8)
+
+PRIMITIVE_BOOL, PRIMITIVE_U8, PRIMITIVE_U16, PRIMITIVE_U64 = 0, 3, 4, 6
+HASHER_BLAKE2_128_CONCAT, HASHER_IDENTITY = 2, 6
+
+
+def portable_type(type_id: int, path: List[str], type_def: bytes) -> bytes:
+    return compact(type_id) + vec(path, text) + vec([]) + type_def + vec([])
+
+
+def registry() -> bytes:
+    account_field = option(None) + compact(BYTES32) + option("[u8; 32]", text)
+    return vec(
+        [
+            portable_type(
+                ACCOUNT_ID,
+                ["sp_core", "crypto", "AccountId32"],
+                b"\x00" + vec([account_field + vec([])]),
+            ),
+            portable_type(BYTES32, [], b"\x03" + struct.pack("<I", 32) + compact(U8)),
+            portable_type(U8, [], b"\x05" + bytes([PRIMITIVE_U8])),
+            portable_type(U16, [], b"\x05" + bytes([PRIMITIVE_U16])),
+            portable_type(U64, [], b"\x05" + bytes([PRIMITIVE_U64])),
+            portable_type(BOOL, [], b"\x05" + bytes([PRIMITIVE_BOOL])),
+            portable_type(KEY, [], b"\x04" + vec([U16, ACCOUNT_ID], compact)),
+            portable_type(EMPTY, [], b"\x04" + vec([])),
+        ]
+    )
+
+
+def storage_map(
+    name: str, hashers: List[int], key: int, value: int, default: bytes
+) -> bytes:
+    return (
+        text(name)
+        + b"\x01"  # StorageEntryModifier::Default
+        + b"\x01"  # StorageEntryType::Map
+        + vec(hashers, lambda hasher: bytes([hasher]))
+        + compact(key)
+        + compact(value)
+        + blob(default)
+        + vec([])
+    )
+
+
+def subtensor_pallet(version: int) -> bytes:
+    storage = text("SubtensorModule") + vec(
+        [
+            storage_map("NetworksAdded", [HASHER_IDENTITY], U16, BOOL, b"\x00"),
+            storage_map(
+                "TaoDividendsPerSubnet",
+                [HASHER_IDENTITY, HASHER_BLAKE2_128_CONCAT],
+                KEY,
+                U64,
+                bytes(8),
+            ),
+        ]
+    )
+    pallet = (
+        text("SubtensorModule")
+        + option(storage)
+        + option(None)  # calls
+        + option(None)  # event
+        + vec([])  # constants
+        + option(None)  # error
+        + bytes([7])  # pallet index
+    )
+    return pallet + vec([]) if version >= 15 else pallet
+
+
+def build_metadata(version: int) -> bytes:
+    """Encode RuntimeMetadataPrefixed for the minimal runtime, as V14 or V15."""
+    body = registry() + vec([subtensor_pallet(version)])
+    if version >= 15:
+        body += (
+            bytes([4])  # extrinsic version
+            + compact(EMPTY)  # address
+            + compact(EMPTY)  # call
+            + compact(EMPTY)  # signature
+            + compact(EMPTY)  # extra
+            + vec([])  # signed extensions
+            + compact(EMPTY)  # runtime type
+            + vec([])  # runtime apis
+            + compact(EMPTY) * 3  # outer call, event and error enums
+            + vec([])  # custom metadata
+        )
+    else:
+        body += compact(EMPTY) + bytes([4]) + vec([]) + compact(EMPTY)
+    return b"meta" + bytes([version]) + body
+
+
+def twox_128(data: bytes) -> bytes:
+    return xxhash.xxh64(data, seed=0).digest()[::-1] + (
+        xxhash.xxh64(data, seed=1).digest()[::-1]
+    )
+
+
+def blake2_128(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def storage_prefix(pallet: str, item: str) -> bytes:
+    return twox_128(pallet.encode()) + twox_128(item.encode())
+
+
+class FakeChain:
+    """
+    Synthetic chain state: a fixed dividend dataset and a head that advances.
+
+    Args:
+        subnets (int): Number of subnets, numbered from 0.
+        hotkeys (int): Hotkeys with a dividend in each subnet.
+        block_time (float): Seconds per block; 0 keeps the head fixed.
+        seed (int): Seed for the generated hotkeys and dividends.
+
+    Block hashes are salted per instance, so entries cached by an earlier run are
+    never served as hits.
+    """
+
+    def __init__(
+        self, subnets: int, hotkeys: int, block_time: float = 12.0, seed: int = 0
+    ):
+        self.block_time = block_time
+        self.genesis = os.urandom(8)
+        self.started_at = time.monotonic()
+        self.metadata = {14: build_metadata(14), 15: build_metadata(15)}
+        self.dividends: Dict[int, List[Tuple[bytes, int]]] = {}
+
+        rng = random.Random(seed)
+        storage: Dict[bytes, bytes] = {}
+        networks = storage_prefix("SubtensorModule", "NetworksAdded")
+        dividends = storage_prefix("SubtensorModule", "TaoDividendsPerSubnet")
+        for netuid in range(subnets):
+            uid = struct.pack("<H", netuid)
+            storage[networks + uid] = b"\x01"
+            self.dividends[netuid] = []
+            for _ in range(hotkeys):
+                account = rng.randbytes(32)
+                dividend = rng.randrange(1, 2**40)
+                self.dividends[netuid].append((account, dividend))
+                key = dividends + uid + blake2_128(account) + account
+                storage[key] = struct.pack("<Q", dividend)
+
+        self.storage = {
+            "0x" + key.hex(): "0x" + value.hex() for key, value in storage.items()
+        }
+        self.keys = sorted(self.storage)
+
+    @property
+    def head_number(self) -> int:
+        if not self.block_time:
+            return 1
+        return 1 + int((time.monotonic() - self.started_at) / self.block_time)
+
+    def block_hash(self, number: int) -> str:
+        digest = hashlib.blake2b(
+            self.genesis + struct.pack("<Q", number), digest_size=32
+        )
+        return "0x" + digest.hexdigest()
+
+    def block_number(self, block_hash: Optional[str]) -> int:
+        if block_hash is None:
+            return self.head_number
+        for number in range(self.head_number, -1, -1):
+            if self.block_hash(number) == block_hash:
+                return number
+        raise KeyError(block_hash)
+
+    def header(self, block_hash: Optional[str]) -> dict:
+        number = self.block_number(block_hash)
+        return {
+            "parentHash": self.block_hash(max(0, number - 1)),
+            "number": hex(number),
+            "stateRoot": self.block_hash(number),
+            "extrinsicsRoot": self.block_hash(number),
+            "digest": {"logs": []},
+        }
+
+    def keys_paged(
+        self, prefix: str, count: int, start_key: Optional[str]
+    ) -> List[str]:
+        start = bisect_left(self.keys, prefix)
+        if start_key:
+            start = max(start, bisect_right(self.keys, start_key))
+        page = []
+        for key in self.keys[start : start + count]:
+            if not key.startswith(prefix):
+                break
+            page.append(key)
+        return page
+
+    def runtime_version(self) -> dict:
+        return {
+            "specName": "node-subtensor",
+            "implName": "node-subtensor",
+            "authoringVersion": 1,
+            "specVersion": SPEC_VERSION,
+            "implVersion": 1,
+            "apis": [],
+            "transactionVersion": 1,
+            "stateVersion": 1,
+        }
+
+    def handle(self, method: str, params: list):
+        """Answer one JSON-RPC call, raising KeyError for unsupported methods."""
+        if method == "system_chain":
+            return "Bittensor"
+        if method == "rpc_methods":
+            return {"methods": sorted(RPC_METHODS)}
+        if method in (
+            "chain_getHead",
+            "chain_getFinalizedHead",
+            "chain_getFinalisedHead",
+        ):
+            return self.block_hash(self.head_number)
+        if method == "chain_getBlockHash":
+            number = params[0] if params else None
+            return self.block_hash(self.head_number if number is None else number)
+        if method == "chain_getHeader":
+            return self.header(params[0] if params else None)
+        if method in ("state_getRuntimeVersion", "chain_getRuntimeVersion"):
+            return self.runtime_version()
+        if method == "state_getMetadata":
+            return "0x" + self.metadata[14].hex()
+        if method == "state_call" and params[0] == "Metadata_metadata_at_version":
+            opaque = self.metadata[15]
+            return "0x" + (b"\x01" + blob(opaque)).hex()
+        if method == "state_getStorage":
+            return self.storage.get(params[0])
+        if method == "state_getKeysPaged":
+            prefix, count = params[0], params[1]
+            return self.keys_paged(
+                prefix, count, params[2] if len(params) > 2 else None
+            )
+        if method == "state_queryStorageAt":
+            keys, block_hash = params[0], params[1] if len(params) > 1 else None
+            return [
+                {
+                    "block": block_hash or self.block_hash(self.head_number),
+                    "changes": [[key, self.storage.get(key)] for key in keys],
+                }
+            ]
+        raise KeyError(method)
+
+
+RPC_METHODS = {
+    "system_chain",
+    "rpc_methods",
+    "chain_getHead",
+    "chain_getFinalizedHead",
+    "chain_getFinalisedHead",
+    "chain_getBlockHash",
+    "chain_getHeader",
+    "chain_getRuntimeVersion",
+    "state_getRuntimeVersion",
+    "state_getMetadata",
+    "state_call",
+    "state_getStorage",
+    "state_getKeysPaged",
+    "state_queryStorageAt",
+}
+
+
+class FakeSubstrateNode:
+    """
+    JSON-RPC websocket server in front of a `FakeChain`.
+
+    Args:
+        chain (FakeChain): State to serve.
+        host (str): Interface to listen on.
+        port (int): Port to listen on; 0 picks a free one.
+        latency (float): Seconds added before every response.
+    """
+
+    def __init__(
+        self,
+        chain: FakeChain,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+    ):
+        self.chain = chain
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.rpc_counts: Counter = Counter()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    @property
+    def rpc_total(self) -> int:
+        return sum(self.rpc_counts.values())
+
+    async def start(self) -> "FakeSubstrateNode":
+        self._server = await serve(self._serve, self.host, self.port, max_size=None)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Fake substrate node listening on {self.url}")
+        return self
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "FakeSubstrateNode":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    async def _serve(self, websocket: ServerConnection) -> None:
+        responses = set()
+        try:
+            async for message in websocket:
+                request = json.loads(message)
+                task = asyncio.create_task(self._respond(websocket, request))
+                responses.add(task)
+                task.add_done_callback(responses.discard)
+        except ConnectionClosed:
+            pass
+        finally:
+            for task in responses:
+                task.cancel()
+
+    async def _respond(self, websocket: ServerConnection, request: dict) -> None:
+        method, params = request.get("method"), request.get("params") or []
+        self.rpc_counts[method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        response = {"jsonrpc": "2.0", "id": request.get("id")}
+        try:
+            response["result"] = self.chain.handle(method, params)
+        except KeyError:
+            response["error"] = {
+                "code": -32601,
+                "message": f"Method not found: {method}",
+            }
+        try:
+            await websocket.send(json.dumps(response))
+        except ConnectionClosed:
+            pass
+
+
+async def main(
+    host: str, port: int, subnets: int, hotkeys: int, latency: float, block_time: float
+) -> None:
+    chain = FakeChain(subnets, hotkeys, block_time=block_time)
+    async with FakeSubstrateNode(chain, host, port, latency) as node:
+        print(
+            f"Serving {subnets} subnets x {hotkeys} hotkeys on {node.url} "
+            f"with {latency * 1000:.0f} ms latency"
+        )
+        await asyncio.Future()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9944)
+    parser.add_argument("--subnets", type=int, default=64)
+    parser.add_argument("--hotkeys", type=int, default=256)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--block-time", type=float, default=12.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(
+        main(
+            args.host,
+            args.port,
+            args.subnets,
+            args.hotkeys,
+            args.latency_ms / 1000,
+            args.block_time,
+        )
+    )
@@ -0,0 +1,145 @@
+"""
+Load-test /api/v1/tao_dividends against the offline substrate node.
+
+Runs the API in-process against a `FakeSubstrateNode` and a real Redis, drives
+each query shape at a fixed concurrency and reports latency percentiles,
+throughput and the number of chain RPCs each shape caused.
+
+Usage:
+    python -m benchmarks.load_test --redis-url redis://localhost:6379 \\
+        --subnets 64 --hotkeys 256 --latency-ms 20 --requests 500 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List
+
+import httpx
+from scalecodec.utils import ss58
+
+from app.cache.redis import redis_cache
+from app.config import settings
+from app.main import app, lifespan
+from app.services.bittensor import LATEST_BLOCK_KEY, SNAPSHOT_KEY
+from app.services.substrate_pool import substrate_pool
+from benchmarks.fake_substrate import FakeChain, FakeSubstrateNode
+
+ENDPOINT = "/api/v1/tao_dividends"
+
+
+@dataclass
+class ShapeResult:
+    """Latencies and chain traffic of one query shape."""
+
+    name: str
+    latencies: List[float]
+    errors: int
+    wall_seconds: float
+    rpcs: int
+
+    def percentile(self, q: float) -> float:
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    def report(self) -> str:
+        return (
+            f"{self.name:<8} p50 {self.percentile(0.50):8.1f} ms   "
+            f"p95 {self.percentile(0.95):8.1f} ms   "
+            f"p99 {self.percentile(0.99):8.1f} ms   "
+            f"mean {statistics.mean(self.latencies):8.1f} ms   "
+            f"{len(self.latencies) / self.wall_seconds:8.1f} req/s   "
+            f"{self.rpcs:6d} RPCs   {self.errors} errors"
+        )
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    node: FakeSubstrateNode,
+    name: str,
+    params: Callable[[], Dict],
+    requests: int,
+    concurrency: int,
+) -> ShapeResult:
+    """Send `requests` GETs with `concurrency` in flight and time each one."""
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await client.get(ENDPOINT, params=params())
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                errors += 1
+
+    rpcs_before = node.rpc_total
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall_seconds = time.perf_counter() - start
+    return ShapeResult(
+        name, latencies, errors, wall_seconds, node.rpc_total - rpcs_before
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    chain = FakeChain(args.subnets, args.hotkeys, block_time=args.block_time)
+    hotkeys = [
+        (netuid, ss58.ss58_encode(account))
+        for netuid, pairs in chain.dividends.items()
+        for account, _ in pairs
+    ]
+
+    shapes = {
+        "single": lambda: dict(zip(("netuid", "hotkey"), random.choice(hotkeys))),
+        "netuid": lambda: {"netuid": random.randrange(args.subnets)},
+        "all": lambda: {},
+    }
+
+    async with FakeSubstrateNode(chain, latency=args.latency_ms / 1000) as node:
+        substrate_pool.network = node.url
+        redis_cache.redis_url = args.redis_url
+        async with lifespan(app):
+            await redis_cache.redis.delete(SNAPSHOT_KEY, LATEST_BLOCK_KEY)
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport,
+                base_url="http://benchmark",
+                headers={"Authorization": f"Bearer {settings.auth_token}"},
+                timeout=None,
+            ) as client:
+                print(
+                    f"{args.subnets} subnets x {args.hotkeys} hotkeys, "
+                    f"{args.latency_ms:.0f} ms RPC latency, {args.requests} requests "
+                    f"per shape at concurrency {args.concurrency}"
+                )
+                for name in args.shapes:
+                    result = await drive(
+                        client,
+                        node,
+                        name,
+                        shapes[name],
+                        args.requests,
+                        args.concurrency,
+                    )
+                    print(result.report())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--redis-url", default=settings.redis_url)
+    parser.add_argument("--subnets", type=int, default=64)
+    parser.add_argument("--hotkeys", type=int, default=256)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--block-time", type=float, default=12.0)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--shapes", nargs="+", default=["single", "netuid", "all"], metavar="SHAPE"
+    )
+    asyncio.run(main(parser.parse_args()))
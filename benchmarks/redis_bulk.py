@@ -0,0 +1,77 @@
+"""
+Micro-benchmark: per-key GET/SET versus MGET and pipelined SET EX in RedisCache.
+
+Usage:
+    python -m benchmarks.redis_bulk --redis-url redis://localhost:6379 --keys 256
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Awaitable, Callable, List
+
+from app.cache.redis import RedisCache
+
+
+async def measure(rounds: int, fn: Callable[[], Awaitable[None]]) -> List[float]:
+    """Run `fn` `rounds` times and return the wall time of each run in ms."""
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        await fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name: str, timings: List[float]) -> None:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(
+        f"{name:<28} mean {statistics.mean(timings):8.2f} ms   "
+        f"p50 {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms"
+    )
+
+
+async def main(redis_url: str, keys: int, rounds: int) -> None:
+    cache = RedisCache(redis_url, l1_enabled=False)
+    await cache.connect()
+
+    mapping = {
+        f"bench:dividends:0xblock:18:hotkey{i}": json.dumps(i * 1000)
+        for i in range(keys)
+    }
+    names = list(mapping)
+
+    async def set_each():
+        for key, value in mapping.items():
+            await cache.set(key, value)
+
+    async def set_many():
+        await cache.set_many(mapping)
+
+    async def get_each():
+        for key in names:
+            await cache.get(key)
+
+    async def get_many():
+        await cache.get_many(names)
+
+    print(f"{keys} keys, {rounds} rounds against {redis_url}")
+    report("SET per key", await measure(rounds, set_each))
+    report("set_many (pipelined SET EX)", await measure(rounds, set_many))
+    report("GET per key", await measure(rounds, get_each))
+    report("get_many (MGET)", await measure(rounds, get_many))
+
+    await cache.redis.delete(*names)
+    await cache.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--redis-url", default="redis://localhost:6379")
+    parser.add_argument("--keys", type=int, default=256)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.redis_url, args.keys, args.rounds))
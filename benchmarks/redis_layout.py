@@ -0,0 +1,104 @@
+"""
+Measure Redis memory and read latency of the subnet dividend layouts.
+
+Compares the previous layout (one JSON string key per hotkey plus a JSON blob per
+subnet) with the current one (one hash of hotkey -> dividend per subnet).
+
+Usage:
+    python -m benchmarks.redis_layout --redis-url redis://localhost:6379 --subnets 64
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+from typing import Dict, List, Tuple
+
+from scalecodec.utils import ss58
+
+from app.cache.redis import RedisCache
+from app.services.bittensor import decode_subnet, encode_subnet
+from benchmarks.redis_bulk import measure, report
+
+BLOCK_HASH = "0x" + "ab" * 32
+
+
+def fake_subnet(hotkeys: int) -> List[Tuple[str, int]]:
+    """Build (hotkey, dividend) pairs with realistic SS58 hotkeys and u64 values."""
+    return [
+        (ss58.ss58_encode(os.urandom(32), 42), random.randrange(2**40))
+        for _ in range(hotkeys)
+    ]
+
+
+async def memory_usage(cache: RedisCache, keys: List[str]) -> int:
+    """Sum MEMORY USAGE over `keys`, including per-key overhead."""
+    total = 0
+    for key in keys:
+        total += await cache.redis.memory_usage(key, samples=0) or 0
+    return total
+
+
+async def main(redis_url: str, subnets: int, hotkeys: int, rounds: int) -> None:
+    cache = RedisCache(redis_url, l1_enabled=False)
+    await cache.connect()
+
+    data: Dict[int, List[Tuple[str, int]]] = {
+        uid: fake_subnet(hotkeys) for uid in range(subnets)
+    }
+
+    legacy: Dict[str, str] = {}
+    for uid, pairs in data.items():
+        for hotkey, dividend in pairs:
+            legacy[f"bench:legacy:{BLOCK_HASH}:{uid}:{hotkey}"] = json.dumps(dividend)
+        legacy[f"bench:legacy:{BLOCK_HASH}:{uid}"] = json.dumps(dict(pairs))
+    hashes = {
+        f"bench:hash:{BLOCK_HASH}:{uid}": encode_subnet(BLOCK_HASH, pairs)
+        for uid, pairs in data.items()
+    }
+    await cache.set_many(legacy, ttl=None)
+    await cache.set_many({}, ttl=None, hashes=hashes)
+
+    legacy_bytes = await memory_usage(cache, list(legacy))
+    hash_bytes = await memory_usage(cache, list(hashes))
+    print(f"{subnets} subnets x {hotkeys} hotkeys against {redis_url}")
+    print(f"{'legacy keys':<28} {len(legacy):8d} keys {legacy_bytes / 1024:10.1f} KiB")
+    print(f"{'subnet hashes':<28} {len(hashes):8d} keys {hash_bytes / 1024:10.1f} KiB")
+
+    uid = subnets // 2
+    hotkey = data[uid][hotkeys // 2][0]
+    legacy_subnet = f"bench:legacy:{BLOCK_HASH}:{uid}"
+    hash_subnet = f"bench:hash:{BLOCK_HASH}:{uid}"
+
+    async def legacy_hotkey():
+        json.loads(await cache.get(f"{legacy_subnet}:{hotkey}"))
+
+    async def hash_hotkey():
+        value, _ = await cache.get_fields(hash_subnet, [hotkey, "_block"])
+        int(value)
+
+    async def legacy_whole():
+        list(json.loads(await cache.get(legacy_subnet)).items())
+
+    async def hash_whole():
+        (fields,) = await cache.get_hashes([hash_subnet])
+        decode_subnet(fields)
+
+    report("hotkey: GET + json.loads", await measure(rounds, legacy_hotkey))
+    report("hotkey: HMGET", await measure(rounds, hash_hotkey))
+    report("subnet: GET + json.loads", await measure(rounds, legacy_whole))
+    report("subnet: HGETALL + decode", await measure(rounds, hash_whole))
+
+    await cache.redis.delete(*legacy, *hashes)
+    await cache.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--redis-url", default="redis://localhost:6379")
+    parser.add_argument("--subnets", type=int, default=64)
+    parser.add_argument("--hotkeys", type=int, default=256)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.redis_url, args.subnets, args.hotkeys, args.rounds))
@@ -1,4 +1,4 @@
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 import pytest_asyncio
@@ -42,8 +42,20 @@ def override_settings(monkeypatch):
 
 @pytest.fixture
 def mock_httpx_client(mocker):
-    mock_client = mocker.patch("httpx.AsyncClient", autospec=True)
-    mock_instance = mock_client.return_value
-    mock_aenter = AsyncMock()
-    mock_instance.__aenter__.return_value = mock_aenter
-    return mock_aenter
+    mock_client = AsyncMock()
+    mocker.patch("app.services.chutes.chutes_client", mock_client)
+    mocker.patch("app.services.datura.datura_client", mock_client)
+    return mock_client
+
+
+@pytest.fixture
+def conn(mocker):
+    """Capture the statements executed inside engine.begin() by the DB writers."""
+    connection = AsyncMock()
+    begin = MagicMock()
+    begin.__aenter__.return_value = connection
+    engine = MagicMock()
+    engine.begin.return_value = begin
+    mocker.patch("app.db.writer.engine", engine)
+    mocker.patch("app.services.dividend_history.engine", engine)
+    return connection
@@ -1,7 +1,22 @@
+import datetime
+import json
+import types
+
 import pytest
 from fastapi import status
 from unittest.mock import patch
 
+from app.api.v1.schemas import TaoDividendResponse
+from app.db.service import AdjustmentCursor
+from app.services.bittensor import (
+    BlockNotFound,
+    BlockRef,
+    DividendCursor,
+    SubnetTimeout,
+)
+
+BLOCK_HASH = "0x" + "ab" * 32
+
 
 @pytest.mark.asyncio
 async def test_tao_dividends_no_auth(client):
@@ -22,7 +37,7 @@ async def test_tao_dividends_no_auth(client):
         (False, False),
     ],
 )
-@patch("app.tasks.bittensor.perform_trade_task.delay")
+@patch("app.api.v1.routes.queue_trade")
 @patch("app.api.v1.routes.get_dividends", return_value=[])
 async def test_tao_dividends_with_auth(
     mock_get_dividends,
@@ -49,3 +64,318 @@ async def test_tao_dividends_with_auth(
         mock_celery_delay.assert_called_once()
     else:
         mock_celery_delay.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_tao_dividends_rejects_block_hash_and_number(mocker, client):
+    """Test that pinning by both block hash and block number is rejected."""
+    mocker.patch("app.auth.auth.settings.auth_token", "test")
+    mock_get_dividends = mocker.patch("app.api.v1.routes.get_dividends")
+
+    response = client.get(
+        "/api/v1/tao_dividends?block_hash=0xabc&block_number=10",
+        headers={"Authorization": "Bearer test"},
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    mock_get_dividends.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_tao_dividends_rejects_malformed_block_hash(mocker, client):
+    """Test that a block hash that is not 32 bytes of hex never reaches the chain."""
+    mocker.patch("app.auth.auth.settings.auth_token", "test")
+    mock_get_dividends = mocker.patch("app.api.v1.routes.get_dividends")
+
+    response = client.get(
+        "/api/v1/tao_dividends?block_hash=0xabc",
+        headers={"Authorization": "Bearer test"},
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    mock_get_dividends.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_tao_dividends_unknown_block_number_is_404(mocker, client):
+    """Test that a block number past the chain head is not served from the head."""
+    mocker.patch("app.auth.auth.settings.auth_token", "test")
+    mocker.patch(
+        "app.api.v1.routes.resolve_block",
+        side_effect=BlockNotFound("Block 999999999 not found"),
+    )
+    mock_iter = mocker.patch("app.api.v1.routes.iter_dividends")
+
+    response = client.get(
+        "/api/v1/tao_dividends?block_number=999999999&format=ndjson",
+        headers={"Authorization": "Bearer test"},
+    )
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    mock_iter.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_tao_dividends_streams_ndjson(mocker, client):
+    """Test that format=ndjson streams one JSON row per line."""
+    mocker.patch("app.auth.auth.settings.auth_token", "test")
+    row = {
+        "hotkey": "hk1",
+        "dividend": 10,
+        "cached": True,
+        "stake_tx_triggered": False,
+    }
+
+    async def fake_iter_dividends(*args):
+        yield [TaoDividendResponse(netuid=1, **row)]
+        yield [TaoDividendResponse(netuid=2, **row)]
+
+    mocker.patch("app.api.v1.routes.iter_dividends", side_effect=fake_iter_dividends)
+
+    response = client.get(
+        "/api/v1/tao_dividends",
+        headers={"Authorization": "Bearer test", "Accept": "application/x-ndjson"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["netuid"] for line in lines] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_tao_dividends_returns_next_cursor(mocker, client):
+    """Test that a paginated request returns the next page's cursor in a header."""
+    mocker.patch("app.auth.auth.settings.auth_token", "test")
+    next_cursor = DividendCursor(BLOCK_HASH, 100, 1, "hk1")
+    mock_page = mocker.patch(
+        "app.api.v1.routes.get_dividends_page", return_value=([], next_cursor)
+    )
+
+    response = client.get(
+        "/api/v1/tao_dividends?limit=1", headers={"Authorization": "Bearer test"}
+    )
+    follow_up = client.get(
+        f"/api/v1/tao_dividends?limit=1&cursor={response.headers['X-Next-Cursor']}",
+        headers={"Authorization": "Bearer test"},
+    )
+    invalid = client.get(
+        "/api/v1/tao_dividends?cursor=garbage",
+        headers={"Authorization": "Bearer test"},
+    )
+    bad_netuid = DividendCursor(BLOCK_HASH, 100, "1", "hk1").encode()
+    mistyped = client.get(
+        f"/api/v1/tao_dividends?cursor={bad_netuid}",
+        headers={"Authorization": "Bearer test"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert follow_up.status_code == status.HTTP_200_OK
+    assert mock_page.call_args.args[4] == next_cursor
+    assert invalid.status_code == mistyped.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_and_server_timing(mocker, client):
+    """Test that stages show up in /metrics and, on request, in Server-Timing."""
+    mocker.patch("app.auth.auth.settings.auth_token", "test")
+    mocker.patch("app.main.settings.server_timing_enabled", True)
+    mocker.patch("app.api.v1.routes.get_dividends", return_value=[])
+
+    plain = client.get(
+        "/api/v1/tao_dividends", headers={"Authorization": "Bearer test"}
+    )
+    timed = client.get(
+        "/api/v1/tao_dividends",
+        headers={"Authorization": "Bearer test", "X-Server-Timing": "1"},
+    )
+    metrics = client.get("/metrics")
+
+    assert "Server-Timing" not in plain.headers
+    assert "serialize;dur=" in timed.headers["Server-Timing"]
+    assert "request;dur=" in timed.headers["Server-Timing"]
+    assert 'tao_stage_duration_seconds_count{stage="serialize"}' in metrics.text
+    assert "tao_cache_hits_total" in metrics.text
+
+
+@pytest.mark.asyncio
+async def test_trade_status_by_extrinsic_hash(mocker, client):
+    """Test that trade status lists a batch's adjustments and needs a filter."""
+    mocker.patch("app.auth.auth.settings.auth_token", "test")
+    row = types.SimpleNamespace(
+        id=1,
+        created_at=datetime.datetime(2024, 4, 1),
+        netuid=18,
+        hotkey="hk1",
+        sentiment_score=40,
+        action="stake",
+        amount_tao=0.4,
+        status="pending",
+        extrinsic_hash="0xabc",
+        block_hash=None,
+        error=None,
+    )
+    mock_find = mocker.patch(
+        "app.api.v1.routes.find_stake_adjustments", return_value=[row]
+    )
+    headers = {"Authorization": "Bearer test"}
+
+    response = client.get("/api/v1/trade_status?extrinsic_hash=0xabc", headers=headers)
+    unfiltered = client.get("/api/v1/trade_status", headers=headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()[0]["status"] == "pending"
+    assert mock_find.call_args.kwargs["extrinsic_hash"] == "0xabc"
+    assert unfiltered.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_stake_adjustments_returns_next_cursor(mocker, client):
+    """Test that the history endpoint pages with a cursor and rejects bad ones."""
+    mocker.patch("app.auth.auth.settings.auth_token", "test")
+    mock_page = mocker.patch(
+        "app.api.v1.routes.page_stake_adjustments",
+        return_value=([], AdjustmentCursor(datetime.datetime(2024, 4, 1), 7)),
+    )
+    headers = {"Authorization": "Bearer test"}
+
+    response = client.get(
+        "/api/v1/stake_adjustments?netuid=18&action=stake&limit=1", headers=headers
+    )
+    next_page = client.get(
+        f"/api/v1/stake_adjustments?cursor={response.headers['X-Next-Cursor']}",
+        headers=headers,
+    )
+    invalid = client.get("/api/v1/stake_adjustments?cursor=bad", headers=headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert mock_page.call_args_list[0].kwargs["action"] == "stake"
+    assert mock_page.call_args_list[1].kwargs["cursor"].id == 7
+    assert next_page.status_code == status.HTTP_200_OK
+    assert invalid.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_tao_dividends_history_downsamples(mocker, client):
+    """Test that dividend history needs a filter and passes the bucket through."""
+    mocker.patch("app.auth.auth.settings.auth_token", "test")
+    point = {
+        "time": datetime.datetime(2024, 4, 1, 12),
+        "netuid": 18,
+        "hotkey": "hk1",
+        "block_number": 100,
+        "dividend": 42,
+    }
+    mock_history = mocker.patch(
+        "app.api.v1.routes.get_dividend_history", return_value=[point]
+    )
+    headers = {"Authorization": "Bearer test"}
+
+    response = client.get(
+        "/api/v1/tao_dividends/history?hotkey=hk1&resolution=day&aggregate=max",
+        headers=headers,
+    )
+    samples = client.get(
+        "/api/v1/tao_dividends/history?netuid=18&resolution=sample", headers=headers
+    )
+    unfiltered = client.get("/api/v1/tao_dividends/history", headers=headers)
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()[0]["dividend"] == 42
+    assert mock_history.call_args_list[0].kwargs["interval"] == "day"
+    assert mock_history.call_args_list[0].kwargs["aggregate"] == "max"
+    assert mock_history.call_args_list[1].kwargs["interval"] is None
+    assert samples.status_code == status.HTTP_200_OK
+    assert unfiltered.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_tao_dividends_answers_if_none_match_with_304(mocker, client):
+    """Test that a repeat poll at the same block is answered without the rows."""
+    mocker.patch("app.auth.auth.settings.auth_token", "test")
+    row = TaoDividendResponse(
+        netuid=18,
+        hotkey="hk1",
+        dividend=42,
+        cached=True,
+        stake_tx_triggered=False,
+        block_number=100,
+        block_hash="0xh",
+    )
+    mock_get = mocker.patch("app.api.v1.routes.get_dividends", return_value=[row])
+    latest = mocker.patch(
+        "app.api.v1.routes.resolve_read_block", return_value=BlockRef("0xh", 100)
+    )
+    headers = {"Authorization": "Bearer test"}
+    url = "/api/v1/tao_dividends?netuid=18"
+
+    first = client.get(url, headers=headers)
+    etag = first.headers["ETag"]
+    repeat = client.get(url, headers={**headers, "If-None-Match": etag})
+    # A reorg replaces the block at the same height.
+    latest.return_value = BlockRef("0xreorg", 100)
+    changed = client.get(url, headers={**headers, "If-None-Match": etag})
+    other_query = client.get(
+        "/api/v1/tao_dividends?netuid=3", headers={**headers, "If-None-Match": etag}
+    )
+
+    assert first.status_code == status.HTTP_200_OK
+    assert first.headers["Cache-Control"] == "public, max-age=12"
+    assert repeat.status_code == status.HTTP_304_NOT_MODIFIED
+    assert repeat.headers["ETag"] == etag and repeat.content == b""
+    assert changed.status_code == other_query.status_code == status.HTTP_200_OK
+    assert mock_get.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_tao_dividends_cache_headers_for_pinned_and_trade(mocker, client):
+    """Test that pinned reads are immutable and trades are never cached."""
+    mocker.patch("app.auth.auth.settings.auth_token", "test")
+    mocker.patch("app.api.v1.routes.get_dividends", return_value=[])
+    mocker.patch("app.api.v1.routes.queue_trade")
+    latest = mocker.patch("app.api.v1.routes.resolve_read_block")
+    headers = {"Authorization": "Bearer test"}
+
+    pinned = client.get(
+        f"/api/v1/tao_dividends?block_hash={BLOCK_HASH}", headers=headers
+    )
+    repeat = client.get(
+        f"/api/v1/tao_dividends?block_hash={BLOCK_HASH}",
+        headers={**headers, "If-None-Match": f'W/{pinned.headers["ETag"]}'},
+    )
+    trade = client.get(
+        "/api/v1/tao_dividends?trade=true",
+        headers={**headers, "If-None-Match": "*"},
+    )
+
+    assert pinned.headers["Cache-Control"] == "public, max-age=86400, immutable"
+    assert repeat.status_code == status.HTTP_304_NOT_MODIFIED
+    assert trade.status_code == status.HTTP_200_OK
+    assert trade.headers["Cache-Control"] == "no-store"
+    assert "ETag" not in trade.headers
+    latest.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_tao_dividends_reports_timed_out_subnets(mocker, client):
+    """Test that partial listings name the missing subnets and are never cached."""
+    mocker.patch("app.auth.auth.settings.auth_token", "test")
+
+    async def get_dividends(*args, missing):
+        missing.extend([3, 7])
+        return []
+
+    mocker.patch("app.api.v1.routes.get_dividends", side_effect=get_dividends)
+    mocker.patch("app.api.v1.routes.get_dividends_page", side_effect=SubnetTimeout(3))
+    headers = {"Authorization": "Bearer test"}
+
+    partial = client.get(
+        f"/api/v1/tao_dividends?block_hash={BLOCK_HASH}", headers=headers
+    )
+    page = client.get("/api/v1/tao_dividends?limit=10", headers=headers)
+
+    assert partial.status_code == status.HTTP_200_OK
+    assert partial.headers["X-Partial-Netuids"] == "3,7"
+    assert partial.headers["Cache-Control"] == "no-store"
+    assert "ETag" not in partial.headers
+    assert page.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
@@ -1,36 +1,293 @@
+import asyncio
+import json
+import time
 import types
 
 import pytest
 
-from app.services.bittensor import get_hotkeys_for_netuid
+from app.cache.redis import wrap_with_timestamp
+from app.services.bittensor import (
+    BlockNotFound,
+    BlockRef,
+    DividendCursor,
+    SubnetTimeout,
+    get_dividends,
+    get_dividends_page,
+    get_subnet_dividends,
+    get_wallet,
+    iter_dividends,
+    process_single_query,
+    resolve_block,
+)
+
+PINNED_HASH = "0x" + "cd" * 32
 
 
 @pytest.mark.asyncio
 async def test_get_all_netuids(mocker):
-    mock_subtensor = mocker.patch(
-        "app.services.bittensor.AsyncSubtensor", autospec=True
-    )
-    fake_instance = mock_subtensor.return_value
-    fake_instance.all_subnets.return_value = [
-        types.SimpleNamespace(netuid=18),
-        types.SimpleNamespace(netuid=19),
-    ]
+    fake_instance = mocker.Mock()
+    fake_instance.get_subnets = mocker.AsyncMock(return_value=[18, 19])
 
     from app.services.bittensor import get_all_netuids
 
-    netuids = await get_all_netuids()
+    netuids = await get_all_netuids(fake_instance)
 
     assert netuids == [18, 19]
 
 
 @pytest.mark.asyncio
-async def test_get_hotkeys_for_netuid(mocker):
+async def test_get_subnet_dividends(mocker):
     mock_substrate = mocker.Mock()
     mock_substrate.get_chain_head = mocker.AsyncMock(return_value="fake_block")
     mock_substrate.query_map = mocker.AsyncMock()
 
-    fake_result = [([b"\x00" * 32], {"some": "data"})]  # fake 32-byte key
+    fake_result = [
+        ([b"\x00" * 32], types.SimpleNamespace(value=100)),
+        ([b"\x01" * 32], types.SimpleNamespace(value=200)),
+    ]
     mock_substrate.query_map.return_value.__aiter__.return_value = iter(fake_result)
 
-    hotkeys = await get_hotkeys_for_netuid(18, mock_substrate)
-    assert isinstance(hotkeys, list)
+    pairs = await get_subnet_dividends(18, mock_substrate, "pinned_block")
+
+    assert [dividend for _, dividend in pairs] == [100, 200]
+    mock_substrate.get_chain_head.assert_not_called()
+    assert mock_substrate.query_map.call_args.kwargs["block_hash"] == "pinned_block"
+
+
+@pytest.mark.asyncio
+async def test_get_dividends_for_netuid_uses_bulk_scan(mocker):
+    mock_connection = mocker.patch("app.services.bittensor.substrate_pool.connection")
+    mock_substrate = mock_connection.return_value.__aenter__.return_value.substrate
+    mock_substrate.get_chain_head = mocker.AsyncMock(return_value="fake_block")
+    mock_substrate.get_block_number = mocker.AsyncMock(return_value=100)
+    mocker.patch(
+        "app.services.bittensor.get_subnet_dividends",
+        return_value=[("hk1", 10), ("hk2", 20)],
+    )
+    mock_set_many = mocker.patch(
+        "app.services.bittensor.redis_cache.set_many", new_callable=mocker.AsyncMock
+    )
+    mocker.patch("app.services.bittensor.redis_cache.get", return_value=None)
+    mocker.patch("app.services.bittensor.redis_cache.set")
+    mocker.patch("app.services.bittensor.redis_cache.invalidate")
+    mocker.patch("app.services.bittensor.redis_cache.get_hashes", return_value=[None])
+
+    async def load_directly(key, loader, **kwargs):
+        return await loader()
+
+    mocker.patch("app.services.bittensor.coalesce", side_effect=load_directly)
+    mock_single = mocker.patch("app.services.bittensor.process_single_query")
+
+    results = await get_dividends(18, None, False)
+
+    assert [(r.hotkey, r.dividend) for r in results] == [("hk1", 10), ("hk2", 20)]
+    assert {r.block_number for r in results} == {100}
+    mock_single.assert_not_called()
+    mock_set_many.assert_awaited_once_with(
+        {},
+        ttl=3600,
+        hashes={
+            "dividends:fake_block:18": {
+                "hk1": "10",
+                "hk2": "20",
+                "_block": "fake_block",
+            }
+        },
+    )
+
+
+@pytest.mark.asyncio
+async def test_iter_dividends_only_borrows_connections_for_chain_reads(mocker):
+    mock_connection = mocker.patch("app.services.bittensor.substrate_pool.connection")
+    mocker.patch("app.services.bittensor.redis_cache.get", return_value="[1, 2]")
+    mocker.patch(
+        "app.services.bittensor.redis_cache.get_hashes",
+        return_value=[{"hk1": "10", "_block": "0xblock"}, None],
+    )
+    mocker.patch(
+        "app.services.bittensor.load_subnet_dividends", return_value=[("hk2", 20)]
+    )
+
+    subnets = iter_dividends(None, None, False, "0xblock")
+    first = await anext(subnets)
+    rest = [rows async for rows in subnets]
+
+    assert [row.hotkey for row in first] == ["hk1"]
+    assert [row.hotkey for rows in rest for row in rows] == ["hk2"]
+    mock_connection.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_resolve_block_uses_latest_pointer(mocker):
+    pointer = json.dumps({"block_hash": "0xcached_head", "block_number": 100})
+    mocker.patch(
+        "app.services.bittensor.redis_cache.get",
+        return_value=wrap_with_timestamp(pointer),
+    )
+    mock_connection = mocker.patch("app.services.bittensor.substrate_pool.connection")
+    mock_revalidate = mocker.patch("app.services.bittensor.revalidate_in_background")
+
+    latest = await resolve_block()
+    explicit = await resolve_block(block_hash="0xexplicit")
+
+    assert (latest.block_hash, latest.block_number) == ("0xcached_head", 100)
+    assert latest.age_seconds < 1
+    assert explicit == BlockRef("0xexplicit")
+    mock_connection.assert_not_called()
+    mock_revalidate.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_resolve_block_serves_stale_pointer_while_revalidating(mocker):
+    pointer = json.dumps({"block_hash": "0xold_head", "block_number": 90})
+    stored = json.dumps({"value": pointer, "stored_at": time.time() - 60})
+    mocker.patch("app.services.bittensor.redis_cache.get", return_value=stored)
+    mock_revalidate = mocker.patch("app.services.bittensor.revalidate_in_background")
+
+    latest = await resolve_block()
+
+    assert latest.block_hash == "0xold_head"
+    assert latest.age_seconds >= 60
+    mock_revalidate.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_resolve_block_rejects_block_past_head(mocker):
+    mock_substrate = mocker.Mock()
+    mock_substrate.get_block_hash = mocker.AsyncMock(return_value=None)
+
+    with pytest.raises(BlockNotFound):
+        await resolve_block(block_number=10**9, substrate=mock_substrate)
+
+
+@pytest.mark.asyncio
+async def test_process_single_query_reads_block_keyed_cache(mocker):
+    mock_get = mocker.patch(
+        "app.services.bittensor.redis_cache.get_fields", return_value=["42", "0xblock"]
+    )
+
+    result = await process_single_query(
+        18, "hk1", False, block=BlockRef("0xblock", 100, 3.0)
+    )
+
+    assert result.dividend == 42
+    assert result.cached is True
+    assert (result.block_number, result.age_seconds) == (100, 3.0)
+    mock_get.assert_awaited_once_with("dividends:0xblock:18", ["hk1", "_block"])
+
+
+@pytest.mark.asyncio
+async def test_process_single_query_scans_subnet_on_miss(mocker):
+    mocker.patch(
+        "app.services.bittensor.redis_cache.get_fields", return_value=[None, None]
+    )
+    mock_load = mocker.patch(
+        "app.services.bittensor.load_subnet_dividends",
+        return_value=[("hk1", 10), ("hk2", 20)],
+    )
+
+    found = await process_single_query(18, "hk2", True, block=BlockRef("0xblock"))
+    absent = await process_single_query(18, "hk9", False, block=BlockRef("0xblock"))
+
+    assert (found.dividend, found.cached, found.stake_tx_triggered) == (20, False, True)
+    assert absent.dividend == 0
+    mock_load.assert_awaited_with("0xblock", 18, None)
+
+
+@pytest.mark.asyncio
+async def test_get_dividends_page_walks_network_at_pinned_block(mocker):
+    subnets = {1: ["c", "a", "b"], 2: ["e", "d"]}
+    reads = []
+
+    async def get_hashes(keys):
+        reads.append(keys)
+        # HGETALL order is not insertion order, so it may differ on every read.
+        step = -1 if len(reads) % 2 else 1
+        return [
+            {
+                **{h: "1" for h in subnets[int(key.rsplit(":", 1)[1])][::step]},
+                "_block": PINNED_HASH,
+            }
+            for key in keys
+        ]
+
+    mocker.patch("app.services.bittensor.redis_cache.get", return_value="[1, 2]")
+    mocker.patch(
+        "app.services.bittensor.redis_cache.get_hashes", side_effect=get_hashes
+    )
+    mocker.patch(
+        "app.services.bittensor.resolve_read_block",
+        return_value=BlockRef(PINNED_HASH, 100),
+    )
+
+    seen, cursor = [], None
+    while True:
+        rows, cursor = await get_dividends_page(None, None, False, 2, cursor)
+        seen.extend(row.hotkey for row in rows)
+        if cursor is None:
+            break
+        cursor = DividendCursor.decode(cursor.encode())
+
+    assert seen == ["a", "b", "c", "d", "e"]
+    assert {key.split(":")[1] for keys in reads for key in keys} == {PINNED_HASH}
+    assert [len(keys) for keys in reads] == [2, 2, 1]
+
+
+@pytest.mark.asyncio
+async def test_get_dividends_page_ends_before_timed_out_subnet(mocker):
+    mocker.patch("app.services.bittensor.settings.subnet_timeout", 0.01)
+    mocker.patch("app.services.bittensor.redis_cache.get", return_value="[1, 2]")
+    mocker.patch(
+        "app.services.bittensor.redis_cache.get_hashes",
+        return_value=[{"a": "1", "b": "2", "_block": PINNED_HASH}, None],
+    )
+    mocker.patch(
+        "app.services.bittensor.resolve_read_block",
+        return_value=BlockRef(PINNED_HASH, 100),
+    )
+
+    async def hang(block_hash, netuid):
+        await asyncio.sleep(1)
+
+    mocker.patch("app.services.bittensor.load_subnet_dividends", side_effect=hang)
+
+    rows, cursor = await get_dividends_page(None, None, False, 10)
+    missing = []
+    listed = await get_dividends(None, None, False, PINNED_HASH, 100, missing=missing)
+
+    assert [row.hotkey for row in rows] == ["a", "b"]
+    assert (cursor.netuid, cursor.hotkey) == (1, "b")
+    with pytest.raises(SubnetTimeout):
+        await get_dividends_page(None, None, False, 10, cursor)
+    assert len(listed) == 2 and missing == [2]
+
+
+def test_dividend_cursor_rejects_garbage():
+    with pytest.raises(ValueError):
+        DividendCursor.decode("not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_get_wallet_reuses_unlocked_wallet(mocker):
+    mocker.patch.dict("app.services.bittensor._wallets", clear=True)
+    wallet_cls = mocker.patch("app.services.bittensor.Wallet")
+
+    first = await get_wallet("hk1")
+    second = await get_wallet("hk1")
+
+    assert first is second
+    wallet_cls.assert_called_once()
+    first.unlock_coldkey.assert_called_once()
+    first.unlock_hotkey.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_get_wallet_unlocks_again_after_expiry(mocker):
+    mocker.patch.dict("app.services.bittensor._wallets", clear=True)
+    mocker.patch("app.services.bittensor.settings.wallet_cache_ttl", 0)
+    wallet_cls = mocker.patch("app.services.bittensor.Wallet")
+
+    await get_wallet("hk1")
+    await get_wallet("hk1")
+
+    assert wallet_cls.call_count == 2
@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from app.cache.redis import CacheStats, LocalCache, RedisCache
+
+
+def test_local_cache_evicts_least_recently_used():
+    stats = CacheStats()
+    cache = LocalCache(max_entries=2, max_bytes=1024, stats=stats)
+
+    cache.set("a", "1", ttl=60)
+    cache.set("b", "2", ttl=60)
+    cache.get("a")
+    cache.set("c", "3", ttl=60)
+
+    assert cache.get("a") == "1"
+    assert cache.get("b") is None
+    assert stats.evictions == 1
+    assert stats.l1_entries == 2
+
+
+def test_local_cache_respects_byte_cap_and_ttl(mocker):
+    stats = CacheStats()
+    cache = LocalCache(max_entries=100, max_bytes=10, stats=stats)
+
+    cache.set("a", "x" * 6, ttl=60)
+    cache.set("b", "y" * 6, ttl=60)
+    assert cache.get("a") is None
+    assert stats.l1_bytes == 6
+
+    clock = mocker.patch("app.cache.redis.time.monotonic", return_value=1000.0)
+    cache.set("c", "z", ttl=5)
+    clock.return_value = 1006.0
+    assert cache.get("c") is None
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_serves_repeat_reads_from_l1(mocker):
+    cache = RedisCache("redis://localhost:6379", l1_ttl=60)
+    cache.redis = mocker.Mock()
+    cache.redis.get = mocker.AsyncMock(return_value="42")
+    cache.redis.mget = mocker.AsyncMock(return_value=[None])
+
+    assert await cache.get("k") == "42"
+    assert await cache.get("k") == "42"
+    assert await cache.get_many(["k", "missing"]) == ["42", None]
+
+    cache.redis.get.assert_awaited_once_with("k")
+    cache.redis.mget.assert_awaited_once_with(["missing"])
+    stats = cache.get_stats()
+    assert (stats["l1_hits"], stats["l2_hits"], stats["misses"]) == (2, 1, 1)
+
+
+def test_redis_cache_applies_invalidations():
+    cache = RedisCache("redis://localhost:6379", l1_ttl=60)
+    cache.l1.set("a", "1", ttl=60)
+    cache.l1.set("b", "2", ttl=60)
+
+    cache._apply_invalidation(json.dumps(["a"]))
+    assert cache.l1.get("a") is None
+    assert cache.l1.get("b") == "2"
+
+    cache._apply_invalidation(json.dumps("*"))
+    assert cache.l1.get("b") is None
+    assert cache.get_stats()["invalidations"] == 2
+
+
+@pytest.mark.asyncio
+async def test_redis_cache_reads_hashes_through_l1(mocker):
+    cache = RedisCache("redis://localhost:6379", l1_ttl=60)
+    cache.redis = mocker.Mock()
+    pipe = mocker.Mock()
+    pipe.execute = mocker.AsyncMock(return_value=[{"hk1": "10", "_block": "0x"}, {}])
+    cache.redis.pipeline.return_value.__aenter__ = mocker.AsyncMock(return_value=pipe)
+    cache.redis.pipeline.return_value.__aexit__ = mocker.AsyncMock(return_value=None)
+    cache.redis.hmget = mocker.AsyncMock()
+
+    assert await cache.get_hashes(["subnet:1", "subnet:2"]) == [
+        {"hk1": "10", "_block": "0x"},
+        None,
+    ]
+    assert await cache.get_fields("subnet:1", ["hk1", "hk2"]) == ["10", None]
+
+    cache.redis.hmget.assert_not_called()
+    assert cache.get_stats()["l1_bytes"] == len("hk1") + 2 + len("_block") + 2
+
+
+@pytest.mark.asyncio
+async def test_copy_with_updates_drops_incomplete_copies(mocker):
+    cache = RedisCache("redis://localhost:6379", l1_enabled=False)
+    cache.redis = mocker.Mock()
+    pipe = mocker.MagicMock()
+    pipe.__aenter__.return_value = pipe
+    pipe.execute = mocker.AsyncMock(side_effect=[[True, True, 1], [True, False, 1]])
+    cache.redis.pipeline.return_value = pipe
+    cache.redis.delete = mocker.AsyncMock()
+    copies = {"new:1": "old:1", "new:2": "old:2"}
+
+    complete = await cache.copy_with_updates(copies, {"new:1": {"hk1": "5"}}, None)
+    evicted = await cache.copy_with_updates(copies, {"new:1": {"hk1": "5"}}, None)
+
+    assert (complete, evicted) == (True, False)
+    pipe.copy.assert_any_call("old:2", "new:2", replace=True)
+    pipe.hset.assert_called_with("new:1", mapping={"hk1": "5"})
+    cache.redis.delete.assert_awaited_once_with("new:1", "new:2")
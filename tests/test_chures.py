@@ -1,16 +1,16 @@
-from unittest.mock import AsyncMock
+from unittest.mock import Mock
 
 import pytest
 
 from app.config import settings
-from app.services.chutes import query_chutes_sentiment
+from app.services.chutes import request_chutes_sentiment
 
 
 @pytest.mark.asyncio
-async def test_query_chutes_sentiment(mock_httpx_client):
+async def test_request_chutes_sentiment(mock_httpx_client):
     settings.chutes_api_key = "dummy_key"  # <-- ADD THIS LINE ✅
 
-    mock_response = AsyncMock()
+    mock_response = Mock()
     mock_response.json.return_value = {
         "choices": [{"message": {"content": "Sentiment Score: 55"}}]
     }
@@ -19,6 +19,6 @@ async def test_query_chutes_sentiment(mock_httpx_client):
     mock_httpx_client.post.return_value = mock_response
 
     tweets = ["Subnet activity is increasing!"]
-    score = await query_chutes_sentiment(tweets)
+    score = await request_chutes_sentiment(tweets)
 
     assert score == 55
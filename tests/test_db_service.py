@@ -0,0 +1,74 @@
+import datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.db.service import (
+    AdjustmentCursor,
+    add_to_hourly_totals,
+    fold_stake_totals,
+    rollup_deltas,
+)
+
+
+def test_adjustment_cursor_round_trips():
+    cursor = AdjustmentCursor(datetime.datetime(2024, 4, 1, 12, 30, 5), 42)
+
+    assert AdjustmentCursor.decode(cursor.encode()) == cursor
+    with pytest.raises(ValueError):
+        AdjustmentCursor.decode("not-a-cursor")
+
+
+def test_fold_stake_totals_nets_stakes_and_unstakes():
+    noon = datetime.datetime(2024, 4, 1, 12)
+    rows = [
+        (noon, 18, "stake", 2, 1.5),
+        (noon, 18, "unstake", 1, 0.5),
+        (noon, 3, "unstake", 1, 0.25),
+    ]
+
+    totals = fold_stake_totals(rows)
+
+    assert [(t["netuid"], t["adjustments"], t["net_tao"]) for t in totals] == [
+        (3, 1, -0.25),
+        (18, 3, 1.0),
+    ]
+
+
+def test_rollup_deltas_group_by_hour():
+    def row(minute, action="stake"):
+        return {
+            "created_at": datetime.datetime(2024, 4, 1, 12, minute),
+            "netuid": 18,
+            "action": action,
+            "amount_tao": 0.5,
+        }
+
+    deltas = rollup_deltas([row(1), row(59), row(30, "unstake")])
+
+    noon = datetime.datetime(2024, 4, 1, 12)
+    assert deltas == {(noon, 18, "stake"): (2, 1.0), (noon, 18, "unstake"): (1, 0.5)}
+
+
+@pytest.mark.asyncio
+async def test_hourly_totals_upsert_skips_failed_rows(mocker):
+    conn = mocker.AsyncMock()
+    created_at = datetime.datetime(2024, 4, 1, 12, 5)
+    rows = [
+        {
+            "created_at": created_at,
+            "netuid": 18,
+            "action": "stake",
+            "amount_tao": amount,
+            "status": status,
+        }
+        for amount, status in ((0.4, "pending"), (0.6, "failed"))
+    ]
+
+    await add_to_hourly_totals(conn, rows)
+
+    statement = conn.execute.await_args.args[0]
+    compiled = statement.compile(dialect=postgresql.dialect())
+    assert "ON CONFLICT ON CONSTRAINT uq_hourlystaketotal_key" in str(compiled)
+    assert compiled.params["adjustments_m0"] == 1
+    assert compiled.params["amount_tao_m0"] == 0.4
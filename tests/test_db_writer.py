@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from app.db.writer import StakeAdjustmentWriter
+
+
+def row(hotkey):
+    return {
+        "netuid": 1,
+        "hotkey": hotkey,
+        "sentiment_score": 40,
+        "action": "stake",
+        "amount_tao": 0.4,
+    }
+
+
+def inserts(conn):
+    """The row lists of the StakeAdjustment inserts executed, in order."""
+    return [
+        call.args[1]
+        for call in conn.execute.await_args_list
+        if call.args[0].table.name == "stakeadjustment"
+    ]
+
+
+def written_hotkeys(conn):
+    return [[r["hotkey"] for r in rows] for rows in inserts(conn)]
+
+
+@pytest.mark.asyncio
+async def test_flushes_one_insert_when_batch_is_full(conn):
+    writer = StakeAdjustmentWriter(max_rows=3, flush_interval=60)
+
+    await writer.add_many([row("hk1"), row("hk2")])
+    assert conn.execute.await_count == 0
+    await writer.add(**row("hk3"))
+
+    assert written_hotkeys(conn) == [["hk1", "hk2", "hk3"]]
+    assert writer.pending == 0
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_flushes_after_interval(conn):
+    writer = StakeAdjustmentWriter(max_rows=100, flush_interval=0.01)
+
+    await writer.add(**row("hk1"))
+    await asyncio.sleep(0.05)
+
+    assert written_hotkeys(conn) == [["hk1"]]
+    await writer.close()
+
+
+@pytest.mark.asyncio
+async def test_close_writes_remaining_rows(conn):
+    writer = StakeAdjustmentWriter(max_rows=100, flush_interval=60)
+
+    await writer.add(**row("hk1"))
+    await writer.close()
+
+    assert written_hotkeys(conn) == [["hk1"]]
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_rows(conn):
+    conn.execute.side_effect = [ConnectionError("db down"), None, None]
+    writer = StakeAdjustmentWriter(max_rows=1, flush_interval=60)
+
+    await writer.add(**row("hk1"))
+    assert writer.pending == 1
+
+    await writer.close()
+    assert writer.pending == 0
+    assert written_hotkeys(conn) == [["hk1"], ["hk1"]]
+
+
+@pytest.mark.asyncio
+async def test_rows_share_one_column_list(conn):
+    writer = StakeAdjustmentWriter(max_rows=2, flush_interval=60)
+
+    await writer.add(**row("hk1"))
+    await writer.add(**row("hk2"), status="pending", extrinsic_hash="0xabc")
+
+    [(first, second)] = inserts(conn)
+    assert first.keys() == second.keys()
+    assert (first["status"], second["status"]) == ("included", "pending")
+
+
+@pytest.mark.asyncio
+async def test_updates_hourly_totals_in_the_same_transaction(conn, mocker):
+    add_totals = mocker.patch("app.db.writer.add_to_hourly_totals")
+    writer = StakeAdjustmentWriter(max_rows=2, flush_interval=60)
+
+    await writer.add_many([row("hk1"), row("hk2")])
+
+    add_totals.assert_awaited_once_with(conn, inserts(conn)[0])
+    assert all(r["created_at"] for r in inserts(conn)[0])
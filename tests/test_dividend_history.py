@@ -0,0 +1,54 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.services.dividend_history import record_dividend_history
+
+
+@pytest.fixture
+def substrate():
+    substrate = AsyncMock()
+    substrate.query.return_value = SimpleNamespace(value=1_711_972_800_000)
+    return substrate
+
+
+@pytest.mark.asyncio
+async def test_records_snapshot_once_per_window(conn, substrate, mocker):
+    mocker.patch(
+        "app.services.dividend_history.settings.dividend_history_interval", 300
+    )
+    acquire = mocker.patch(
+        "app.services.dividend_history.redis_cache.acquire_lock",
+        side_effect=["token", None],
+    )
+    subnets = {1: [("hk1", 10), ("hk2", 20)], 2: [("hk3", 30)]}
+
+    first = await record_dividend_history(substrate, "0xa", 601, subnets)
+    second = await record_dividend_history(substrate, "0xb", 602, subnets)
+
+    assert (first, second) == (True, False)
+    assert acquire.call_args_list[0].args[0] == "dividends:history:2"
+    rows = conn.execute.await_args.args[1]
+    assert [(r["netuid"], r["hotkey"], r["dividend"]) for r in rows] == [
+        (1, "hk1", 10),
+        (1, "hk2", 20),
+        (2, "hk3", 30),
+    ]
+    assert rows[0]["recorded_at"].isoformat() == "2024-04-01T12:00:00"
+    assert conn.execute.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_write_releases_the_window(conn, substrate, mocker):
+    mocker.patch(
+        "app.services.dividend_history.redis_cache.acquire_lock", return_value="token"
+    )
+    release = mocker.patch("app.services.dividend_history.redis_cache.release_lock")
+    conn.execute.side_effect = ConnectionError("db down")
+
+    with pytest.raises(ConnectionError):
+        await record_dividend_history(substrate, "0xa", 601, {1: [("hk1", 10)]})
+
+    release.assert_awaited_once()
+    assert release.call_args.args[1] == "token"
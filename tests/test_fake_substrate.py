@@ -0,0 +1,27 @@
+import pytest
+from bittensor import AsyncSubtensor
+from scalecodec.utils import ss58
+
+from app.services.bittensor import get_all_netuids, get_subnet_dividends
+from benchmarks.fake_substrate import FakeChain, FakeSubstrateNode
+
+
+@pytest.mark.asyncio
+async def test_subnet_scan_decodes_fake_node_storage():
+    chain = FakeChain(subnets=3, hotkeys=5, block_time=0)
+    async with FakeSubstrateNode(chain) as node:
+        subtensor = AsyncSubtensor(network=node.url, websocket_shutdown_timer=None)
+        await subtensor.initialize()
+        try:
+            head = await subtensor.substrate.get_chain_head()
+            netuids = await get_all_netuids(subtensor, head)
+            pairs = await get_subnet_dividends(1, subtensor.substrate, head)
+        finally:
+            await subtensor.close()
+
+    assert netuids == [0, 1, 2]
+    assert sorted(pairs) == sorted(
+        (ss58.ss58_encode(account), dividend)
+        for account, dividend in chain.dividends[1]
+    )
+    assert node.rpc_counts["state_queryStorageAt"] > 0
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from app.services.fanout import ordered_fanout
+
+
+@pytest.mark.asyncio
+async def test_ordered_fanout_yields_in_input_order():
+    async def load(item):
+        await asyncio.sleep(0.01 * (5 - item))
+        return item * 10
+
+    results = [pair async for pair in ordered_fanout(range(5), load, concurrency=5)]
+
+    assert results == [(0, 0), (1, 10), (2, 20), (3, 30), (4, 40)]
+
+
+@pytest.mark.asyncio
+async def test_ordered_fanout_bounds_concurrency():
+    in_flight = 0
+    peak = 0
+
+    async def load(item):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return item
+
+    results = [item async for item, _ in ordered_fanout(range(10), load, 3)]
+
+    assert results == list(range(10))
+    assert peak <= 3
+
+
+@pytest.mark.asyncio
+async def test_ordered_fanout_yields_none_on_timeout():
+    async def load(item):
+        if item == 1:
+            await asyncio.sleep(1)
+        return item
+
+    results = [pair async for pair in ordered_fanout(range(3), load, 3, timeout=0.05)]
+
+    assert results == [(0, 0), (1, None), (2, 2)]
+
+
+@pytest.mark.asyncio
+async def test_ordered_fanout_waits_for_cancelled_loads_on_early_close():
+    finished = []
+
+    async def load(item):
+        try:
+            await asyncio.sleep(0 if item == 0 else 1)
+            return item
+        finally:
+            finished.append(item)
+
+    results = ordered_fanout(range(4), load, 4)
+    assert await anext(results) == (0, 0)
+    await results.aclose()
+
+    assert sorted(finished) == [0, 1, 2, 3]
@@ -0,0 +1,88 @@
+import httpx
+import pytest
+
+from app.services.http_client import ProviderClient, RateLimiter
+
+
+def provider(handler, **kwargs) -> ProviderClient:
+    return ProviderClient(
+        "test",
+        "https://upstream.test",
+        rate_limit=1000,
+        backoff_base=0,
+        transport=httpx.MockTransport(handler),
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_retries_throttled_and_failed_responses():
+    statuses = iter([429, 503, 200])
+
+    def handler(request):
+        return httpx.Response(next(statuses), json={"ok": True})
+
+    client = provider(handler)
+    response = await client.get("/twitter")
+    await client.close()
+
+    assert response.status_code == 200
+    assert response.json() == {"ok": True}
+
+
+@pytest.mark.asyncio
+async def test_gives_up_after_max_retries():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(502)
+
+    client = provider(handler, max_retries=2)
+    response = await client.post("/v1/chat/completions", json={})
+    await client.close()
+
+    assert response.status_code == 502
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_does_not_retry_client_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(401)
+
+    client = provider(handler)
+    response = await client.get("/twitter")
+    await client.close()
+
+    assert response.status_code == 401
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_honoured(mocker):
+    sleep = mocker.patch("app.services.http_client.asyncio.sleep")
+    statuses = iter(
+        [httpx.Response(429, headers={"Retry-After": "2"}), httpx.Response(200)]
+    )
+
+    client = provider(lambda request: next(statuses))
+    await client.get("/twitter")
+    await client.close()
+
+    sleep.assert_any_await(2.0)
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_spaces_requests_after_burst(mocker):
+    sleep = mocker.patch("app.services.http_client.asyncio.sleep")
+    limiter = RateLimiter(rate=10, burst=2)
+
+    for _ in range(3):
+        await limiter.acquire()
+
+    assert sleep.await_count == 1
+    assert sleep.await_args.args[0] == pytest.approx(0.1, abs=0.01)
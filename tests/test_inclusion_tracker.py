@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.services.inclusion_tracker import track_blocks
+
+
+def adjustment(extrinsic_hash, status="pending", block_hash=None, age=0.0):
+    return SimpleNamespace(
+        extrinsic_hash=extrinsic_hash,
+        status=status,
+        block_hash=block_hash,
+        error=None,
+        created_at=datetime.utcnow() - timedelta(seconds=age),
+        netuid=1,
+        action="stake",
+        amount_tao=0.4,
+    )
+
+
+class FakeReceipt:
+    def __init__(self, events):
+        self.events = events
+
+    @property
+    async def is_success(self):
+        return True
+
+    @property
+    async def triggered_events(self):
+        return self.events
+
+
+def item(event_id):
+    return {"event": {"module_id": "Utility", "event_id": event_id, "attributes": {}}}
+
+
+class FakeSubstrate:
+    """A chain whose block N has hash 0xN and holds the given extrinsics."""
+
+    def __init__(self, blocks, events, finalized):
+        self.blocks = blocks
+        self.events = events
+        self.finalized = finalized
+
+    async def get_block_hash(self, number):
+        return f"0x{number}"
+
+    async def get_block_number(self, block_hash):
+        return int(block_hash[2:])
+
+    async def get_chain_finalised_head(self):
+        return f"0x{self.finalized}"
+
+    async def get_block(self, block_hash):
+        hashes = self.blocks.get(int(block_hash[2:]), [])
+        return {
+            "extrinsics": [
+                SimpleNamespace(extrinsic_hash=bytes.fromhex(h[2:])) for h in hashes
+            ]
+        }
+
+    def retrieve_extrinsic_by_hash(self, block_hash, extrinsic_hash):
+        return FakeReceipt(self.events[extrinsic_hash])
+
+
+@pytest.fixture
+def stored(mocker):
+    rows = []
+
+    async def by_status(db, status):
+        return [row for row in rows if row.status == status]
+
+    mocker.patch(
+        "app.services.inclusion_tracker.get_adjustments_by_status",
+        side_effect=by_status,
+    )
+    return rows
+
+
+@pytest.mark.asyncio
+async def test_pending_batch_is_included_per_call(stored, mocker):
+    subtract = mocker.patch(
+        "app.services.inclusion_tracker.subtract_from_hourly_totals"
+    )
+    first, second = adjustment("0xaa"), adjustment("0xaa")
+    other = adjustment("0xbb")
+    stored.extend([first, second, other])
+    substrate = FakeSubstrate(
+        blocks={11: ["0xcc", "0xaa"]},
+        events={"0xaa": [item("ItemCompleted"), item("ItemFailed")]},
+        finalized=5,
+    )
+    db = AsyncMock()
+
+    await track_blocks(db, substrate, 10, 12)
+
+    assert (first.status, first.block_hash) == ("included", "0x11")
+    assert second.status == "failed" and second.error is not None
+    assert other.status == "pending"
+    subtract.assert_awaited_once_with(db, [second])
+    db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_included_adjustments_are_finalized(stored):
+    final = adjustment("0xaa", status="included", block_hash="0x11")
+    recent = adjustment("0xbb", status="included", block_hash="0x13")
+    stored.extend([final, recent])
+    substrate = FakeSubstrate(blocks={}, events={}, finalized=12)
+
+    await track_blocks(AsyncMock(), substrate, 13, 13)
+
+    assert final.status == "finalized"
+    assert recent.status == "included"
+
+
+@pytest.mark.asyncio
+async def test_reorged_adjustments_go_back_to_pending(stored):
+    orphaned = adjustment("0xaa", status="included", block_hash="0x11-orphan")
+    stored.append(orphaned)
+    substrate = FakeSubstrate(blocks={}, events={}, finalized=12)
+    substrate.get_block_number = AsyncMock(return_value=11)
+
+    await track_blocks(AsyncMock(), substrate, 13, 13)
+
+    assert (orphaned.status, orphaned.block_hash) == ("pending", None)
+
+
+@pytest.mark.asyncio
+async def test_stale_pending_adjustments_fail(stored, mocker):
+    mocker.patch(
+        "app.services.inclusion_tracker.settings.pending_extrinsic_timeout", 60
+    )
+    stale = adjustment("0xaa", age=120)
+    stored.append(stale)
+    substrate = FakeSubstrate(blocks={}, events={}, finalized=12)
+
+    await track_blocks(AsyncMock(), substrate, 13, 13)
+
+    assert stale.status == "failed"
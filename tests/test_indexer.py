@@ -0,0 +1,342 @@
+import asyncio
+import json
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.services.bittensor import BlockRef, get_dividends
+from app.services.indexer import (
+    SNAPSHOT_TTL,
+    WatchedDividends,
+    apply_storage_changes,
+    follow_storage_changes,
+    index_block,
+    index_subnets,
+)
+
+
+@pytest.mark.asyncio
+async def test_index_block_writes_snapshot_atomically(mocker):
+    subtensor = mocker.Mock()
+    subtensor.substrate.get_block_number = mocker.AsyncMock(return_value=100)
+    subtensor.get_subnets = mocker.AsyncMock(return_value=[1, 2])
+    mocker.patch(
+        "app.services.indexer.get_subnet_dividends",
+        side_effect=[[("hk1", 10)], [("hk2", 20)]],
+    )
+    mock_set_many = mocker.patch(
+        "app.services.indexer.redis_cache.set_many", new_callable=mocker.AsyncMock
+    )
+    mock_invalidate = mocker.patch(
+        "app.services.indexer.redis_cache.invalidate", new_callable=mocker.AsyncMock
+    )
+    mock_record = mocker.patch("app.services.indexer.record_dividend_history")
+
+    snapshot = await index_block(subtensor, "0xblock")
+
+    mapping = mock_set_many.call_args.args[0]
+    assert mock_set_many.call_args.kwargs["atomic"] is True
+    assert mock_set_many.call_args.kwargs["ttl"] == SNAPSHOT_TTL
+    hashes = mock_set_many.call_args.kwargs["hashes"]
+    assert hashes["dividends:0xblock:1"] == {"hk1": "10", "_block": "0xblock"}
+    assert hashes["dividends:0xblock:2"] == {"hk2": "20", "_block": "0xblock"}
+    assert json.loads(mapping["dividends:snapshot"]) == snapshot
+    assert snapshot["netuids"] == [1, 2]
+    assert snapshot["block_number"] == 100
+    mock_invalidate.assert_awaited_once_with(["dividends:snapshot"])
+    mock_record.assert_awaited_once_with(
+        subtensor.substrate, "0xblock", 100, {1: [("hk1", 10)], 2: [("hk2", 20)]}
+    )
+
+
+@pytest.mark.asyncio
+async def test_index_subnets_stops_before_exceeding_max_hotkeys(mocker):
+    subtensor = mocker.Mock()
+    subtensor.substrate.get_block_number = mocker.AsyncMock(return_value=100)
+    subtensor.get_subnets = mocker.AsyncMock(return_value=[1, 2, 3])
+    mock_scan = mocker.patch(
+        "app.services.indexer.get_subnet_dividends",
+        side_effect=[[("hk1", 10), ("hk2", 20)], [("hk3", 30), ("hk4", 40)]],
+    )
+    mocker.patch("app.services.indexer.redis_cache.set_many")
+    mocker.patch("app.services.indexer.redis_cache.invalidate")
+    mocker.patch("app.services.indexer.record_dividend_history")
+
+    snapshot, dividends = await index_subnets(subtensor, "0xblock", max_hotkeys=3)
+
+    assert mock_scan.await_count == 2
+    assert list(dividends) == snapshot["netuids"] == [1]
+    assert snapshot["partial"] is True
+
+
+@pytest.mark.asyncio
+async def test_get_dividends_serves_fresh_snapshot_without_chain(mocker):
+    snapshot = {
+        "block_hash": "0xblock",
+        "block_number": 100,
+        "indexed_at": time.time(),
+        "netuids": [1],
+    }
+    store = {
+        "dividends:snapshot": json.dumps(snapshot),
+        "dividends:0xblock:1": {"hk1": "10", "hk2": "20", "_block": "0xblock"},
+    }
+    mocker.patch("app.services.bittensor.redis_cache.get", side_effect=store.get)
+    mocker.patch(
+        "app.services.bittensor.redis_cache.get_hashes",
+        side_effect=lambda keys: [store.get(k) for k in keys],
+    )
+    mock_connection = mocker.patch("app.services.bittensor.substrate_pool.connection")
+
+    everything = await get_dividends(None, None, False)
+    single = await get_dividends(1, "hk2", False)
+
+    assert [(r.hotkey, r.dividend) for r in everything] == [("hk1", 10), ("hk2", 20)]
+    assert [(r.hotkey, r.dividend, r.cached) for r in single] == [("hk2", 20, True)]
+    mock_connection.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_dividends_ignores_stale_snapshot(mocker):
+    snapshot = {
+        "block_hash": "0xold",
+        "block_number": 100,
+        "indexed_at": time.time() - 3600,
+        "netuids": [1],
+    }
+    mocker.patch(
+        "app.services.bittensor.redis_cache.get",
+        side_effect={"dividends:snapshot": json.dumps(snapshot)}.get,
+    )
+    mock_from_snapshot = mocker.patch("app.services.bittensor.get_snapshot_subnets")
+    mock_single = mocker.patch(
+        "app.services.bittensor.process_single_query", return_value="live"
+    )
+    mocker.patch(
+        "app.services.bittensor.resolve_block", return_value=BlockRef("0xhead")
+    )
+
+    assert await get_dividends(1, "hk1", False) == ["live"]
+    mock_from_snapshot.assert_not_called()
+    mock_single.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_get_dividends_lists_all_subnets_past_partial_snapshot(mocker):
+    snapshot = {
+        "block_hash": "0xblock",
+        "block_number": 100,
+        "indexed_at": time.time(),
+        "netuids": [1],
+        "partial": True,
+    }
+    mocker.patch(
+        "app.services.bittensor.redis_cache.get",
+        side_effect={"dividends:snapshot": json.dumps(snapshot)}.get,
+    )
+    mock_from_snapshot = mocker.patch(
+        "app.services.bittensor.get_snapshot_subnets", return_value=[{"hk1": "10"}]
+    )
+    mocker.patch(
+        "app.services.bittensor.resolve_block", side_effect=RuntimeError("chain")
+    )
+
+    assert len(await get_dividends(1, None, False)) == 1
+    with pytest.raises(RuntimeError):
+        await get_dividends(None, None, False)
+    mock_from_snapshot.assert_awaited_once()
+
+
+def encoded(value: int) -> str:
+    return "0x" + value.to_bytes(8, "little").hex()
+
+
+@pytest.fixture
+def watched():
+    return WatchedDividends(
+        snapshot={
+            "block_hash": "0xprev",
+            "block_number": 100,
+            "indexed_at": 0.0,
+            "netuids": [1, 2],
+            "partial": False,
+        },
+        dividends={1: {"hk1": 10, "hk2": 20}, 2: {"hk3": 30}},
+        keys={"0xk1": (1, "hk1"), "0xk2": (1, "hk2"), "0xk3": (2, "hk3")},
+        value_type="u64",
+        number_key="0xnumber",
+        number_type="u32",
+        runtime=None,
+        synced_at=100,
+        head=100,
+        epoch_keys={"0xepoch1": 1, "0xepoch2": 2},
+        epoch_type="u64",
+        scanned_at={1: 100, 2: 100},
+    )
+
+
+@pytest.fixture
+def substrate(mocker):
+    substrate = mocker.Mock()
+    substrate.decode_scale = mocker.AsyncMock(
+        side_effect=lambda type_string, data, runtime: int.from_bytes(data, "little")
+    )
+    return substrate
+
+
+@pytest.fixture
+def cache(mocker):
+    mocker.patch("app.services.indexer.record_watched_history")
+    mocker.patch("app.services.indexer.redis_cache.invalidate")
+    return {
+        "copy": mocker.patch(
+            "app.services.indexer.redis_cache.copy_with_updates", return_value=True
+        ),
+        "set_many": mocker.patch("app.services.indexer.redis_cache.set_many"),
+        "expire": mocker.patch("app.services.indexer.redis_cache.expire_many"),
+    }
+
+
+@pytest.mark.asyncio
+async def test_storage_changes_write_only_changed_dividends(watched, substrate, cache):
+    changes = [("0xnumber", encoded(101)), ("0xk1", encoded(15)), ("0xk3", encoded(30))]
+
+    resync = await apply_storage_changes(substrate, watched, "0xnew", changes)
+
+    copies, fields = cache["copy"].call_args.args
+    assert copies == {
+        "dividends:0xnew:netuids": "dividends:0xprev:netuids",
+        "dividends:0xnew:1": "dividends:0xprev:1",
+        "dividends:0xnew:2": "dividends:0xprev:2",
+    }
+    assert fields == {
+        "dividends:0xnew:1": {"_block": "0xnew", "hk1": "15"},
+        "dividends:0xnew:2": {"_block": "0xnew"},
+    }
+    snapshot = json.loads(cache["set_many"].call_args.args[0]["dividends:snapshot"])
+    assert (snapshot["block_hash"], snapshot["block_number"]) == ("0xnew", 101)
+    assert watched.dividends[1]["hk1"] == 15
+    assert resync is False
+
+
+@pytest.mark.asyncio
+async def test_block_without_changes_only_confirms_snapshot(watched, substrate, cache):
+    await apply_storage_changes(
+        substrate, watched, "0xnew", [("0xnumber", encoded(101))]
+    )
+
+    cache["copy"].assert_not_called()
+    snapshot = json.loads(cache["set_many"].call_args.args[0]["dividends:snapshot"])
+    assert (snapshot["block_hash"], snapshot["block_number"]) == ("0xprev", 100)
+    assert snapshot["indexed_at"] > 0
+    keys, ttl = cache["expire"].call_args.args
+    assert "dividends:0xprev:netuids" in keys and "dividends:0xprev:1" in keys
+    assert ttl == SNAPSHOT_TTL
+
+
+@pytest.mark.asyncio
+async def test_block_without_changes_moves_aged_snapshot_forward(
+    watched, substrate, cache, mocker
+):
+    mocker.patch("app.services.indexer.settings.snapshot_max_block_age", 1)
+
+    await apply_storage_changes(
+        substrate, watched, "0xnew", [("0xnumber", encoded(101))]
+    )
+
+    copies, fields = cache["copy"].call_args.args
+    assert copies["dividends:0xnew:1"] == "dividends:0xprev:1"
+    assert fields["dividends:0xnew:1"] == {"_block": "0xnew"}
+    snapshot = json.loads(cache["set_many"].call_args.args[0]["dividends:snapshot"])
+    assert (snapshot["block_hash"], snapshot["block_number"]) == ("0xnew", 101)
+
+
+@pytest.mark.asyncio
+async def test_skipped_block_or_evicted_snapshot_needs_rescan(
+    watched, substrate, cache
+):
+    skipped = await apply_storage_changes(
+        substrate, watched, "0xnew", [("0xnumber", encoded(103))]
+    )
+    cache["copy"].return_value = False
+    evicted = await apply_storage_changes(
+        substrate,
+        watched,
+        "0xnew",
+        [("0xnumber", encoded(101)), ("0xk2", None)],
+    )
+
+    assert (skipped, evicted) == (True, True)
+    assert watched.dividends[1]["hk2"] == 20
+    assert cache["copy"].call_args.args[1]["dividends:0xnew:1"]["hk2"] == "0"
+
+
+@pytest.mark.asyncio
+async def test_storage_changes_ask_for_rescan_after_resync_interval(
+    watched, substrate, cache, mocker
+):
+    mocker.patch("app.services.indexer.settings.dividend_resync_blocks", 2)
+    first = await apply_storage_changes(
+        substrate, watched, "0xa", [("0xnumber", encoded(101))]
+    )
+    second = await apply_storage_changes(
+        substrate, watched, "0xb", [("0xnumber", encoded(102))]
+    )
+
+    assert (first, second) == (False, True)
+
+
+@pytest.mark.asyncio
+async def test_epoch_rescans_subnet_and_publishes_new_hotkeys(
+    watched, substrate, cache, mocker
+):
+    @asynccontextmanager
+    async def connection():
+        yield mocker.Mock()
+
+    mocker.patch("app.services.indexer.substrate_pool.connection", connection)
+    mock_scan = mocker.patch(
+        "app.services.indexer.get_subnet_dividends",
+        return_value=[("hk1", 11), ("hk4", 40)],
+    )
+    changes = [
+        ("0xnumber", encoded(101)),
+        ("0xepoch1", encoded(101)),
+        ("0xepoch2", encoded(90)),
+    ]
+
+    await apply_storage_changes(substrate, watched, "0xnew", changes)
+
+    assert mock_scan.await_args.args[0] == 1
+    assert mock_scan.await_args.args[2] == "0xnew"
+    fields = cache["copy"].call_args.args[1]
+    assert fields["dividends:0xnew:1"] == {
+        "_block": "0xnew",
+        "hk1": "11",
+        "hk2": "0",
+        "hk4": "40",
+    }
+    assert fields["dividends:0xnew:2"] == {"_block": "0xnew"}
+    assert watched.dividends[1]["hk4"] == 40
+    assert watched.scanned_at == {1: 101, 2: 100}
+
+
+@pytest.mark.asyncio
+async def test_storage_subscription_rescans_after_reconnect(mocker):
+    @asynccontextmanager
+    async def connection():
+        yield mocker.Mock()
+
+    mocker.patch("app.services.indexer.substrate_pool.connection", connection)
+    mocker.patch("app.services.indexer.asyncio.sleep")
+    mock_watch = mocker.patch("app.services.indexer.watch_subnets")
+    mocker.patch(
+        "app.services.indexer.subscribe_dividends",
+        side_effect=[ConnectionError("ws closed"), None, asyncio.CancelledError()],
+    )
+
+    with pytest.raises(asyncio.CancelledError):
+        await follow_storage_changes()
+
+    assert mock_watch.await_count == 3
@@ -0,0 +1,98 @@
+import datetime
+
+import httpx
+import pytest
+
+from app.services.sentiment import get_subnet_sentiment, tweet_set_digest
+
+START = datetime.date(2024, 4, 1)
+END = datetime.date(2024, 4, 2)
+
+
+@pytest.fixture
+def store(mocker):
+    """Back the sentiment module's Redis reads and writes with a dict."""
+    values = {}
+
+    async def get(key):
+        return values.get(key)
+
+    async def set(key, value, ttl=None):
+        values[key] = value
+
+    async def load_directly(key, loader, **kwargs):
+        return await loader()
+
+    mocker.patch("app.services.sentiment.redis_cache.get", side_effect=get)
+    mocker.patch("app.services.sentiment.redis_cache.set", side_effect=set)
+    mocker.patch("app.services.sentiment.coalesce", side_effect=load_directly)
+    return values
+
+
+@pytest.mark.asyncio
+async def test_sentiment_is_shared_across_trades(store, mocker):
+    fetch = mocker.patch(
+        "app.services.sentiment.fetch_twitter_subnet_mentions",
+        return_value=[{"text": "Subnet is booming!"}, {"id": 1}],
+    )
+    score = mocker.patch(
+        "app.services.sentiment.request_chutes_sentiment", return_value=55
+    )
+
+    results = [await get_subnet_sentiment(18, START, END) for _ in range(3)]
+
+    assert results == [55, 55, 55]
+    fetch.assert_awaited_once_with(18, START, END)
+    score.assert_awaited_once_with(["Subnet is booming!"])
+    assert (
+        f"sentiment:18:{START}:{END}:{tweet_set_digest(['Subnet is booming!'])}"
+        in store
+    )
+
+
+@pytest.mark.asyncio
+async def test_new_tweets_get_a_new_score(store, mocker):
+    mocker.patch(
+        "app.services.sentiment.fetch_twitter_subnet_mentions",
+        side_effect=[[{"text": "old"}], [{"text": "old"}, {"text": "new"}]],
+    )
+    score = mocker.patch(
+        "app.services.sentiment.request_chutes_sentiment", side_effect=[10, -20]
+    )
+
+    assert await get_subnet_sentiment(18, START, END) == 10
+    del store[f"tweets:18:{START}:{END}"]
+    assert await get_subnet_sentiment(18, START, END) == -20
+    assert score.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_no_tweets_skips_the_llm(store, mocker):
+    mocker.patch(
+        "app.services.sentiment.fetch_twitter_subnet_mentions", return_value=[]
+    )
+    score = mocker.patch("app.services.sentiment.request_chutes_sentiment")
+
+    assert await get_subnet_sentiment(18, START, END) is None
+    score.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_failed_sentiment_is_not_cached(store, mocker):
+    mocker.patch(
+        "app.services.sentiment.fetch_twitter_subnet_mentions",
+        return_value=[{"text": "Subnet is booming!"}],
+    )
+    mocker.patch(
+        "app.services.sentiment.request_chutes_sentiment",
+        side_effect=httpx.ConnectError("down"),
+    )
+
+    with pytest.raises(httpx.ConnectError):
+        await get_subnet_sentiment(18, START, END)
+    assert not any(key.startswith("sentiment:") for key in store)
+
+
+def test_tweet_set_digest_ignores_order_and_duplicates():
+    assert tweet_set_digest(["a", "b", "a"]) == tweet_set_digest(["b", "a"])
+    assert tweet_set_digest(["a"]) != tweet_set_digest(["a", "b"])
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from app.cache.redis import CacheStats
+from app.cache.singleflight import SingleFlight, coalesce
+
+
+@pytest.mark.asyncio
+async def test_single_flight_runs_concurrent_calls_once():
+    single_flight = SingleFlight(CacheStats())
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    results = await asyncio.gather(*(single_flight.do("key", load) for _ in range(5)))
+
+    assert results == ["value"] * 5
+    assert calls == 1
+    assert single_flight.stats.coalesced == 4
+    assert await single_flight.do("key", load) == "value"
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_coalesce_waits_for_worker_holding_lock(mocker):
+    mocker.patch("app.cache.singleflight.redis_cache.acquire_lock", return_value=None)
+    mocker.patch("app.cache.singleflight.redis_cache.wait_for", return_value="42")
+    loader = mocker.AsyncMock()
+
+    assert await coalesce("dividends:0xblock:18:hk1", loader) == "42"
+    loader.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_coalesce_loads_and_releases_lock(mocker):
+    mocker.patch(
+        "app.cache.singleflight.redis_cache.acquire_lock", return_value="token"
+    )
+    mock_release = mocker.patch("app.cache.singleflight.redis_cache.release_lock")
+    loader = mocker.AsyncMock(return_value="42")
+
+    assert await coalesce("dividends:0xblock:18:hk1", loader) == "42"
+    loader.assert_awaited_once()
+    mock_release.assert_awaited_once_with("dividends:0xblock:18:hk1", "token")
+
+
+@pytest.mark.asyncio
+async def test_coalesce_holds_and_waits_on_lock_past_load_timeout(mocker):
+    mocker.patch("app.cache.singleflight.settings.refresh_lock_ttl", 10.0)
+    mocker.patch("app.cache.singleflight.settings.refresh_lock_wait", 5.0)
+    mock_acquire = mocker.patch(
+        "app.cache.singleflight.redis_cache.acquire_lock", return_value=None
+    )
+    mock_wait = mocker.patch(
+        "app.cache.singleflight.redis_cache.wait_for", return_value="42"
+    )
+
+    await coalesce("subnet:0xblock:18", mocker.AsyncMock(), load_timeout=40.0)
+
+    mock_acquire.assert_awaited_once_with("subnet:0xblock:18", 50.0)
+    assert mock_wait.call_args.args == ("subnet:0xblock:18", 45.0)
@@ -0,0 +1,173 @@
+from contextlib import asynccontextmanager
+from unittest.mock import MagicMock
+
+import pytest
+from bittensor.utils.balance import Balance
+
+from app.services.staking import StakeOrder, submit_stake_batch
+
+
+class FakeReceipt:
+    def __init__(self, events, error=None, extrinsic_hash=None, block_hash=None):
+        self.events = events
+        self.error = error
+        self.extrinsic_hash = extrinsic_hash
+        self.block_hash = block_hash
+
+    @property
+    async def is_success(self):
+        return self.error is None
+
+    @property
+    async def error_message(self):
+        return self.error
+
+    @property
+    async def triggered_events(self):
+        return self.events
+
+
+class FakeSubstrate:
+    """Executes SubtensorModule stake calls wrapped in Utility batches."""
+
+    def __init__(self, stakes, unregistered=()):
+        self.stakes = stakes
+        self.unregistered = set(unregistered)
+        self.submitted = []
+        self.nonces = []
+
+    async def get_account_next_index(self, address):
+        return 7
+
+    async def compose_call(self, call_module, call_function, call_params):
+        return {"module": call_module, "function": call_function, **call_params}
+
+    async def create_signed_extrinsic(self, call, keypair, nonce):
+        return {"call": call, "signer": keypair, "nonce": nonce}
+
+    async def submit_extrinsic(self, extrinsic, wait_for_inclusion):
+        batch = extrinsic["call"]
+        self.submitted.append(batch)
+        self.nonces.append(extrinsic["nonce"])
+        if not wait_for_inclusion:
+            return FakeReceipt([], extrinsic_hash=f"0x{len(self.submitted):064x}")
+        before = dict(self.stakes)
+        events = []
+        for call in batch["calls"]:
+            error = self.execute(call)
+            if error and batch["function"] == "batch_all":
+                self.stakes = before
+                return FakeReceipt([], error={"name": error})
+            if error:
+                events.append(utility_event("ItemFailed", error))
+            else:
+                events.append(utility_event("ItemCompleted"))
+        return FakeReceipt(events + [utility_event("BatchCompleted")])
+
+    def execute(self, call):
+        if call["hotkey"] in self.unregistered:
+            return "HotKeyAccountNotExists"
+        key = (call["hotkey"], call["netuid"])
+        if call["function"] == "add_stake":
+            self.stakes[key] = self.stakes.get(key, 0) + call["amount_staked"]
+        else:
+            self.stakes[key] -= call["amount_unstaked"]
+
+
+def utility_event(event_id, error=None):
+    attributes = {"error": error} if error else {}
+    return {
+        "event": {
+            "module_id": "Utility",
+            "event_id": event_id,
+            "attributes": attributes,
+        }
+    }
+
+
+class FakeSubtensor:
+    def __init__(self, substrate):
+        self.substrate = substrate
+
+    async def get_stake_for_hotkey(self, hotkey_ss58, netuid):
+        rao = self.substrate.stakes.get((hotkey_ss58, netuid), 0)
+        return Balance.from_rao(rao).set_unit(netuid)
+
+
+@pytest.fixture
+def chain(mocker):
+    mocker.patch("app.services.staking.settings.track_inclusion", False)
+    substrate = FakeSubstrate({("hk2", 1): 2 * 10**8}, unregistered={"hk3"})
+
+    @asynccontextmanager
+    async def connection():
+        yield FakeSubtensor(substrate)
+
+    mocker.patch("app.services.staking.substrate_pool.connection", connection)
+    mocker.patch("app.services.staking.get_wallet", return_value=MagicMock())
+    return substrate
+
+
+@pytest.mark.asyncio
+async def test_batch_reports_each_call(chain, mocker):
+    save = mocker.patch("app.services.staking.stake_writer.add_many")
+    orders = [
+        StakeOrder(1, "hk1", 50),
+        StakeOrder(1, "hk2", -40),
+        StakeOrder(1, "hk3", 10),
+        StakeOrder(1, "hk4", 0),
+    ]
+
+    results = await submit_stake_batch(orders, atomic=False)
+
+    assert len(chain.submitted) == 1
+    assert chain.submitted[0]["function"] == "force_batch"
+    assert [r.succeeded for r in results] == [True, True, False, False]
+    assert "HotKeyAccountNotExists" in results[2].error
+    assert not results[3].submitted
+    # The unstake is capped at the stake held.
+    assert results[1].amount_tao == pytest.approx(0.2)
+    assert chain.stakes == {("hk1", 1): 5 * 10**8, ("hk2", 1): 0}
+    rows = save.await_args.args[0]
+    assert [row["hotkey"] for row in rows] == ["hk1", "hk2", "hk3"]
+    assert rows[2]["error"] == results[2].error
+
+
+@pytest.mark.asyncio
+async def test_atomic_batch_fails_together(chain, mocker):
+    mocker.patch("app.services.staking.stake_writer.add_many")
+    orders = [StakeOrder(1, "hk1", 50), StakeOrder(1, "hk3", 10)]
+
+    results = await submit_stake_batch(orders, atomic=True)
+
+    assert chain.submitted[0]["function"] == "batch_all"
+    assert all(r.submitted and not r.succeeded for r in results)
+    assert ("hk1", 1) not in chain.stakes
+
+
+@pytest.mark.asyncio
+async def test_large_batches_are_split(chain, mocker):
+    mocker.patch("app.services.staking.stake_writer.add_many")
+    mocker.patch("app.services.staking.settings.stake_batch_max_calls", 2)
+    orders = [StakeOrder(1, f"new{i}", 10) for i in range(5)]
+
+    results = await submit_stake_batch(orders, atomic=False)
+
+    assert [len(batch["calls"]) for batch in chain.submitted] == [2, 2, 1]
+    assert all(r.succeeded for r in results)
+
+
+@pytest.mark.asyncio
+async def test_tracked_batches_are_recorded_as_pending(chain, mocker):
+    mocker.patch("app.services.staking.settings.track_inclusion", True)
+    mocker.patch("app.services.staking.settings.stake_batch_max_calls", 1)
+    save = mocker.patch("app.services.staking.stake_writer.add_many")
+    orders = [StakeOrder(1, "hk1", 50), StakeOrder(1, "hk3", 10)]
+
+    results = await submit_stake_batch(orders, atomic=False)
+
+    assert chain.nonces == [7, 8]
+    assert [r.status for r in results] == ["pending", "pending"]
+    rows = save.await_args.args[0]
+    assert [row["extrinsic_hash"] for row in rows] == [f"0x{1:064x}", f"0x{2:064x}"]
+    assert all(row["status"] == "pending" for row in rows)
@@ -0,0 +1,84 @@
+import pytest
+
+from app.services.substrate_pool import (
+    PooledConnection,
+    SubstratePool,
+    SubstratePoolTimeout,
+)
+
+
+@pytest.fixture
+def mock_subtensor_cls(mocker):
+    mock_cls = mocker.patch("app.services.substrate_pool.AsyncSubtensor")
+    mock_cls.return_value.initialize = mocker.AsyncMock()
+    mock_cls.return_value.close = mocker.AsyncMock()
+    return mock_cls
+
+
+@pytest.mark.asyncio
+async def test_connection_is_reused(mock_subtensor_cls):
+    pool = SubstratePool("finney", size=1, acquire_timeout=1, keepalive_interval=60)
+
+    async with pool.connection() as first:
+        pass
+    async with pool.connection() as second:
+        pass
+    await pool.close()
+
+    assert first is second
+    mock_subtensor_cls.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_connection_wait_is_bounded(mock_subtensor_cls):
+    pool = SubstratePool("finney", size=1, acquire_timeout=1, keepalive_interval=60)
+
+    async with pool.connection():
+        with pytest.raises(SubstratePoolTimeout):
+            async with pool.connection(timeout=0.01):
+                pass
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_reconnect_counts_toward_wait(mock_subtensor_cls):
+    mock_subtensor_cls.return_value.initialize.side_effect = ConnectionError("down")
+    pool = SubstratePool("finney", size=1, acquire_timeout=0.2, keepalive_interval=60)
+
+    with pytest.raises(SubstratePoolTimeout):
+        async with pool.connection():
+            pass
+    await pool.close()
+
+    assert mock_subtensor_cls.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_connection_error_drops_connection(mock_subtensor_cls):
+    pool = SubstratePool("finney", size=1, acquire_timeout=1, keepalive_interval=60)
+
+    with pytest.raises(ConnectionError):
+        async with pool.connection():
+            raise ConnectionError("socket closed")
+    async with pool.connection():
+        pass
+    await pool.close()
+
+    assert mock_subtensor_cls.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_ping_refreshes_metadata_on_runtime_upgrade(mocker):
+    conn = PooledConnection("finney")
+    substrate = mocker.Mock()
+    substrate.get_chain_head = mocker.AsyncMock(return_value="0xhead")
+    substrate.get_block_runtime_version_for = mocker.AsyncMock(side_effect=[260, 261])
+    substrate.init_runtime = mocker.AsyncMock()
+    conn.subtensor = mocker.Mock(substrate=substrate)
+
+    await conn.ping()
+    substrate.init_runtime.assert_not_called()
+
+    await conn.ping()
+    substrate.init_runtime.assert_awaited_once_with(block_hash="0xhead")
+    assert conn.runtime_version == 261
@@ -0,0 +1,89 @@
+import pytest
+
+from app.services.staking import StakeOrder
+from app.services.trade_batch import group_trades
+from app.tasks.bittensor import flush_trade_batch_task, queue_trade, trade_subnet
+
+
+def test_group_trades_by_netuid():
+    trades = [(1, "hk1"), (2, "hk2"), (1, "hk3"), (1, "hk1")]
+
+    assert group_trades(trades) == {1: ["hk1", "hk3", "hk1"], 2: ["hk2"]}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "batch_full, window_opened, flushed_now, scheduled",
+    [
+        (False, True, False, True),
+        (False, False, False, False),
+        (True, False, True, False),
+    ],
+)
+async def test_queue_trade_schedules_one_flush_per_window(
+    mocker, batch_full, window_opened, flushed_now, scheduled
+):
+    mocker.patch("app.tasks.bittensor.add_pending_trade", return_value=batch_full)
+    mocker.patch("app.tasks.bittensor.open_flush_window", return_value=window_opened)
+    delay = mocker.patch("app.tasks.bittensor.flush_trade_batch_task.delay")
+    apply_async = mocker.patch("app.tasks.bittensor.flush_trade_batch_task.apply_async")
+
+    await queue_trade(18, "hk1")
+
+    assert delay.called == flushed_now
+    assert apply_async.called == scheduled
+
+
+@pytest.mark.asyncio
+async def test_queue_trade_ignores_requests_without_hotkey(mocker):
+    add = mocker.patch("app.tasks.bittensor.add_pending_trade")
+
+    await queue_trade(18, None)
+
+    add.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_trade_subnet_scores_sentiment_once(mocker):
+    sentiment = mocker.patch(
+        "app.tasks.bittensor.get_subnet_sentiment", return_value=40
+    )
+    submit = mocker.patch("app.tasks.bittensor.submit_stake_batch", return_value=[])
+
+    outcome = await trade_subnet(18, ["hk1", "hk2", "hk3"])
+
+    assert outcome == "succeeded"
+    sentiment.assert_awaited_once()
+    submit.assert_awaited_once_with(
+        [
+            StakeOrder(18, "hk1", 40),
+            StakeOrder(18, "hk2", 40),
+            StakeOrder(18, "hk3", 40),
+        ]
+    )
+
+
+@pytest.mark.asyncio
+async def test_trade_subnet_skips_without_tweets(mocker):
+    mocker.patch("app.tasks.bittensor.get_subnet_sentiment", return_value=None)
+    submit = mocker.patch("app.tasks.bittensor.submit_stake_batch")
+
+    assert await trade_subnet(18, ["hk1"]) == "skipped"
+    submit.assert_not_called()
+
+
+def test_flush_dispatches_one_task_per_subnet(mocker):
+    mocker.patch(
+        "app.tasks.bittensor.pop_pending_trades",
+        return_value=([(1, "hk1"), (2, "hk2"), (1, "hk3")], 5),
+    )
+    subnet_delay = mocker.patch("app.tasks.bittensor.perform_subnet_trades_task.delay")
+    flush_delay = mocker.patch("app.tasks.bittensor.flush_trade_batch_task.delay")
+
+    flush_trade_batch_task()
+
+    assert [call.args for call in subnet_delay.call_args_list] == [
+        (1, ["hk1", "hk3"]),
+        (2, ["hk2"]),
+    ]
+    flush_delay.assert_called_once_with()
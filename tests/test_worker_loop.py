@@ -0,0 +1,30 @@
+import asyncio
+
+from app.tasks.worker_loop import WorkerLoop
+
+
+async def current_loop():
+    return asyncio.get_running_loop()
+
+
+def test_tasks_share_one_loop(mocker):
+    mocker.patch("app.tasks.worker_loop.close_connections")
+    worker_loop = WorkerLoop()
+
+    first = worker_loop.run(current_loop())
+    second = worker_loop.run(current_loop())
+    worker_loop.stop()
+
+    assert first is second
+    assert first.is_closed()
+    assert not worker_loop.running
+
+
+def test_stop_closes_connections(mocker):
+    close = mocker.patch("app.tasks.worker_loop.close_connections")
+    worker_loop = WorkerLoop()
+    worker_loop.start()
+
+    worker_loop.stop()
+
+    close.assert_awaited_once()